@@ -46,3 +46,19 @@ def get_comment_config() -> CommentConfig:
     if _config is None:
         _config = CommentConfig()
     return _config
+
+
+def reload_comment_config() -> CommentConfig:
+    """コメント設定を再生成
+
+    Returns:
+        新しいコメント設定
+    """
+    global _config
+    _config = CommentConfig()
+
+    # 設定値をキャッシュしているモジュールも更新する（循環インポート回避のため遅延インポート）
+    from src.data.weather_trend import clear_weather_score_cache
+
+    clear_weather_score_cache()
+    return _config
@@ -5,24 +5,194 @@ Chiten.csvを活用した地点データの管理・検索機能を提供する
 Issue #2の実装: 地点データ管理システム
 """
 
+import array
 import csv
+import functools
+import hashlib
+import heapq
+import itertools
 import os
-import re
+import pickle
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Union, Any
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union, Any
 import logging
 from pathlib import Path
 
+# rapidfuzzが利用可能な場合はレーベンシュタイン距離・あいまい検索をC++実装で処理
+try:
+    from rapidfuzz import process as rapidfuzz_process
+    from rapidfuzz.distance import Levenshtein as RapidfuzzLevenshtein
+
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
 # ログ設定
 logger = logging.getLogger(__name__)
 
+# あいまい検索でマッチとみなす類似度
+FUZZY_SIMILARITY_THRESHOLD = 0.7
+
+# CSV読み込み時のバッファサイズ（1MB）
+CSV_READ_BUFFER_SIZE = 1 << 20
+
+# 地点名の正規化で削除する空白文字（全角スペース等はNFKCで半角スペースになる）
+_WHITESPACE_DELETE_TABLE = str.maketrans("", "", " \t\n\r\f\v\u3000\u00a0\u200b")
+
+# 地点名の正規化を並列実行する件数の閾値（小規模CSVはプロセス起動コストの方が大きい）
+PARALLEL_NORMALIZE_THRESHOLD = 2000
+
+# 解析済み地点データキャッシュの形式バージョン（Locationの構造を変えたら更新）
+LOCATION_CACHE_VERSION = 1
+
+
+def _normalize_location_name(name: str) -> str:
+    """地点名を正規化
+
+    Args:
+        name: 元の地点名
+
+    Returns:
+        正規化された地点名
+    """
+    if not name:
+        return ""
+
+    # ASCIIのみの場合NFKC正規化は恒等変換のため省略
+    if name.isascii():
+        return name.translate(_WHITESPACE_DELETE_TABLE)
+
+    # Unicode正規化（NFKCで全角・半角統一）
+    # 全角英数字（U+FF10〜U+FF5A）もC実装の1パスで半角化されるため、
+    # Pythonレベルの変換表やコードポイント演算による別パスは設けない
+    normalized = unicodedata.normalize("NFKC", name)
+
+    # 空白文字を除去（正規表現を使わず1パスで削除）
+    normalized = normalized.translate(_WHITESPACE_DELETE_TABLE)
+
+    return normalized
+
+
+def _normalize_location_names(names: List[str]) -> List[str]:
+    """複数の地点名をまとめて正規化
+
+    件数が閾値を超える場合はプロセスプールで並列に正規化する
+
+    Args:
+        names: 元の地点名リスト
+
+    Returns:
+        正規化された地点名リスト（入力と同じ順序）
+    """
+    if len(names) <= PARALLEL_NORMALIZE_THRESHOLD:
+        return [_normalize_location_name(name) for name in names]
+
+    workers = os.cpu_count() or 1
+    chunksize = max(64, len(names) // (4 * workers))
+    try:
+        with ProcessPoolExecutor() as executor:
+            return list(executor.map(_normalize_location_name, names, chunksize=chunksize))
+    except Exception as e:
+        logger.warning(f"地点名の並列正規化に失敗したため逐次処理します: {str(e)}")
+        return [_normalize_location_name(name) for name in names]
+
+
+def _levenshtein_distance(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+    """レーベンシュタイン距離を計算
+
+    Args:
+        s1: 文字列1
+        s2: 文字列2
+        max_distance: 打ち切り距離（超えることが確定した時点で max_distance + 1 を返す）
+
+    Returns:
+        レーベンシュタイン距離
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        # 打ち切り時の戻り値（max_distance + 1）も同じ仕様
+        return RapidfuzzLevenshtein.distance(s1, s2, score_cutoff=max_distance)
+
+    if len(s1) < len(s2):
+        return _levenshtein_distance(s2, s1, max_distance)
+
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        # 行の最小値は単調非減少のため、上限を超えたら以降の計算は不要
+        if max_distance is not None and min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+
+    return previous_row[-1]
 
-@dataclass
+
+@functools.lru_cache(maxsize=8192)
+def _fuzzy_similarity(target: str, query: str) -> float:
+    """正規化済みの地点名とクエリの類似度を計算（結果はキャッシュ）
+
+    入力候補の絞り込みなどで同じ組み合わせが繰り返し評価されるためメモ化する
+
+    Args:
+        target: 正規化済みの地点名
+        query: 正規化済みの検索クエリ
+
+    Returns:
+        類似度（0.0〜1.0、閾値未満で打ち切った場合は実際より低い値）
+    """
+    max_length = max(len(target), len(query))
+    if max_length == 0:
+        return 0.0
+
+    # 類似度が閾値に届かない距離に達した時点で計算を打ち切る
+    max_distance = int(max_length * (1.0 - FUZZY_SIMILARITY_THRESHOLD)) + 1
+    distance = _levenshtein_distance(target, query, max_distance)
+    return 1.0 - (distance / max_length)
+
+
+def _get_column(row: List[str], index: Optional[int]) -> str:
+    """CSV行から指定列の値を取得
+
+    Args:
+        row: CSVの1行
+        index: 列番号（Noneの場合は列なし）
+
+    Returns:
+        前後の空白を除去した値、列がない場合は空文字
+    """
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def _bigrams(text: str) -> Set[str]:
+    """文字バイグラムの集合を取得
+
+    Args:
+        text: 対象文字列
+
+    Returns:
+        2文字部分文字列の集合
+    """
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+@dataclass(slots=True)
 class Location:
     """地点データクラス
 
+    大量の地点を保持・走査するため__slots__で定義（インスタンス辞書を持たない）
+
     Attributes:
         name: 地点名（元の名前）
         normalized_name: 正規化された地点名
@@ -68,19 +238,7 @@ class Location:
         Returns:
             正規化された地点名
         """
-        if not name:
-            return ""
-
-        # Unicode正規化（NFKCで全角・半角統一）
-        normalized = unicodedata.normalize("NFKC", name)
-
-        # 前後の空白除去
-        normalized = normalized.strip()
-
-        # ひらがなをカタカナに変換（オプション）
-        # normalized = self._hiragana_to_katakana(normalized)
-
-        return normalized
+        return _normalize_location_name(name)
 
     def _hiragana_to_katakana(self, text: str) -> str:
         """ひらがなをカタカナに変換"""
@@ -288,8 +446,18 @@ class Location:
         if not query:
             return False
 
-        query_normalized = self._normalize_name(query)
+        return self._matches_normalized_query(self._normalize_name(query), fuzzy)
+
+    def _matches_normalized_query(self, query_normalized: str, fuzzy: bool = True) -> bool:
+        """正規化済みの検索クエリにマッチするかチェック
+
+        Args:
+            query_normalized: 正規化済みの検索クエリ
+            fuzzy: あいまい検索を行うか
 
+        Returns:
+            マッチする場合True
+        """
         # 完全一致
         if self.normalized_name == query_normalized:
             return True
@@ -306,40 +474,31 @@ class Location:
             return False
 
         # あいまい検索（レーベンシュタイン距離）
-        distance = self._levenshtein_distance(self.normalized_name, query_normalized)
         max_length = max(len(self.normalized_name), len(query_normalized))
+        if max_length == 0:
+            return False
+
+        # 文字数差は距離の下限のため、それだけで類似度が届かない場合は計算不要
+        length_diff = abs(len(self.normalized_name) - len(query_normalized))
+        if 1.0 - (length_diff / max_length) < FUZZY_SIMILARITY_THRESHOLD:
+            return False
 
         # 類似度が70%以上の場合マッチとみなす
-        similarity = 1.0 - (distance / max_length) if max_length > 0 else 0.0
-        return similarity >= 0.7
+        similarity = _fuzzy_similarity(self.normalized_name, query_normalized)
+        return similarity >= FUZZY_SIMILARITY_THRESHOLD
 
-    def _levenshtein_distance(self, s1: str, s2: str) -> int:
+    def _levenshtein_distance(self, s1: str, s2: str, max_distance: Optional[int] = None) -> int:
         """レーベンシュタイン距離を計算
 
         Args:
             s1: 文字列1
             s2: 文字列2
+            max_distance: 打ち切り距離（超えることが確定した時点で max_distance + 1 を返す）
 
         Returns:
             レーベンシュタイン距離
         """
-        if len(s1) < len(s2):
-            return self._levenshtein_distance(s2, s1)
-
-        if len(s2) == 0:
-            return len(s1)
-
-        previous_row = list(range(len(s2) + 1))
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-
-        return previous_row[-1]
+        return _levenshtein_distance(s1, s2, max_distance)
 
     def to_dict(self) -> Dict[str, Any]:
         """辞書形式に変換
@@ -366,15 +525,22 @@ class LocationManager:
     Chiten.csvからの地点データ読み込み・管理・検索機能を提供
     """
 
-    def __init__(self, csv_path: Optional[str] = None):
+    def __init__(self, csv_path: Optional[str] = None, cache_dir: Optional[str] = None):
         """地点管理システムを初期化
 
         Args:
             csv_path: CSVファイルのパス（Noneの場合はデフォルトパス使用）
+            cache_dir: 解析済み地点データのキャッシュ保存ディレクトリ（Noneの場合はキャッシュしない）
         """
         self.csv_path = csv_path or self._get_default_csv_path()
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         self.locations: List[Location] = []
         self.location_index: Dict[str, List[Location]] = {}
+        self.name_index: Dict[str, Location] = {}
+        self.bigram_index: Dict[str, Set[int]] = {}
+        # 検索ループ用の列指向データ（locationsと同じ並び）
+        self.normalized_names: List[str] = []
+        self.name_lengths: array.array = array.array("i")
         self.loaded_at: Optional[datetime] = None
         
         # 地点の標準順序
@@ -500,21 +666,48 @@ class LocationManager:
             読み込んだ地点数
         """
         try:
-            self.locations.clear()
+            cached_locations = self._load_cached_locations()
+            if cached_locations is not None:
+                self.locations = cached_locations
+                self._build_index()
+                self.loaded_at = datetime.now()
+                logger.info(f"地点データをキャッシュから読み込み: {len(self.locations)}件")
+                return len(self.locations)
 
-            with open(self.csv_path, "r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
+            self.locations.clear()
 
-                for row_num, row in enumerate(reader, 2):  # ヘッダー行を考慮して2から開始
+            with open(
+                self.csv_path, "r", encoding="utf-8", buffering=CSV_READ_BUFFER_SIZE, newline=""
+            ) as file:
+                reader = csv.reader(file)
+                header = next(reader, None)
+                if header is None:
+                    rows: Iterable[List[str]] = ()
+                    start_row = 1
+                elif "地点名" in header:
+                    rows = reader
+                    start_row = 2  # ヘッダー行を考慮して2から開始
+                else:
+                    # ヘッダーなし（1列目が地点名）のCSV
+                    rows = itertools.chain([header], reader)
+                    header = []
+                    start_row = 1
+
+                name_col = header.index("地点名") if "地点名" in header else 0
+                lat_col = header.index("緯度") if "緯度" in header else None
+                lon_col = header.index("経度") if "経度" in header else None
+
+                parsed_rows: List[Tuple[str, Optional[float], Optional[float]]] = []
+                for row_num, row in enumerate(rows, start_row):
                     try:
                         # 地点名の取得
-                        name = row.get("地点名", "").strip()
+                        name = _get_column(row, name_col)
                         if not name:
                             continue
 
                         # 緯度経度の取得と検証
-                        lat_str = row.get("緯度", "").strip()
-                        lon_str = row.get("経度", "").strip()
+                        lat_str = _get_column(row, lat_col)
+                        lon_str = _get_column(row, lon_col)
 
                         latitude = float(lat_str) if lat_str else None
                         longitude = float(lon_str) if lon_str else None
@@ -528,18 +721,29 @@ class LocationManager:
                             logger.warning(f"無効な経度: {row_num}行目 - {name} ({longitude})")
                             longitude = None
 
-                        # 地点データを作成
-                        location = Location(
-                            name=name, normalized_name="", latitude=latitude, longitude=longitude
-                        )
-                        self.locations.append(location)
+                        parsed_rows.append((name, latitude, longitude))
 
                     except (ValueError, KeyError) as e:
                         logger.warning(f"データ解析エラー: {row_num}行目 - {str(e)}")
                         continue
 
+            # 地点データを作成（地点名の正規化は件数が多い場合に並列実行）
+            normalized_names = _normalize_location_names([name for name, _, _ in parsed_rows])
+            self.locations = [
+                Location(
+                    name=name,
+                    normalized_name=normalized_name,
+                    latitude=latitude,
+                    longitude=longitude,
+                )
+                for (name, latitude, longitude), normalized_name in zip(
+                    parsed_rows, normalized_names
+                )
+            ]
+
             self._build_index()
             self.loaded_at = datetime.now()
+            self._save_cached_locations()
 
             logger.info(f"地点データ読み込み完了: {len(self.locations)}件")
             return len(self.locations)
@@ -553,6 +757,81 @@ class LocationManager:
             self._load_default_locations()
             return len(self.locations)
 
+    def _get_cache_file(self) -> Optional[Path]:
+        """解析済み地点データのキャッシュファイルパスを取得
+
+        Returns:
+            キャッシュファイルパス、キャッシュ無効の場合はNone
+        """
+        if self.cache_dir is None:
+            return None
+        path_hash = hashlib.md5(os.path.abspath(self.csv_path).encode("utf-8")).hexdigest()
+        return self.cache_dir / f"locations_{path_hash}.pkl"
+
+    def _get_csv_signature(self) -> Optional[Tuple[int, int]]:
+        """キャッシュの鮮度判定に使うCSVファイルの更新時刻とサイズを取得
+
+        Returns:
+            (更新時刻ナノ秒, ファイルサイズ)、取得できない場合はNone
+        """
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_cached_locations(self) -> Optional[List[Location]]:
+        """CSVが更新されていなければキャッシュから解析済み地点データを読み込み
+
+        Returns:
+            地点データのリスト、キャッシュが無効・古い場合はNone
+        """
+        cache_file = self._get_cache_file()
+        if cache_file is None or not cache_file.exists():
+            return None
+
+        signature = self._get_csv_signature()
+        if signature is None:
+            return None
+
+        try:
+            with open(cache_file, "rb") as file:
+                cached = pickle.load(file)
+        except Exception as e:
+            logger.warning(f"地点キャッシュ読み込みエラー: {cache_file} - {str(e)}")
+            return None
+
+        if (
+            not isinstance(cached, dict)
+            or cached.get("version") != LOCATION_CACHE_VERSION
+            or cached.get("csv_signature") != signature
+        ):
+            return None
+
+        return cached["locations"]
+
+    def _save_cached_locations(self):
+        """解析済み地点データをキャッシュに保存"""
+        cache_file = self._get_cache_file()
+        signature = self._get_csv_signature()
+        if cache_file is None or signature is None:
+            return
+
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, "wb") as file:
+                pickle.dump(
+                    {
+                        "version": LOCATION_CACHE_VERSION,
+                        "csv_signature": signature,
+                        "locations": self.locations,
+                    },
+                    file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+        except Exception as e:
+            logger.warning(f"地点キャッシュ保存エラー: {cache_file} - {str(e)}")
+
     def _load_default_locations(self):
         """デフォルト地点データを読み込み"""
         logger.info("デフォルト地点データを使用します")
@@ -624,10 +903,20 @@ class LocationManager:
     def _build_index(self):
         """検索用インデックスを構築"""
         self.location_index.clear()
+        self.name_index.clear()
+        self.bigram_index.clear()
+        self.normalized_names = [location.normalized_name for location in self.locations]
+        self.name_lengths = array.array("i", map(len, self.normalized_names))
+
+        for idx, location in enumerate(self.locations):
+            # あいまい検索の候補絞り込み用バイグラムインデックス
+            for bigram in _bigrams(location.normalized_name):
+                self.bigram_index.setdefault(bigram, set()).add(idx)
 
-        for location in self.locations:
             # 正規化名でインデックス
             key = location.normalized_name.lower()
+            # 完全一致用インデックス（同名地点は先頭を優先）
+            self.name_index.setdefault(key, location)
             if key not in self.location_index:
                 self.location_index[key] = []
             self.location_index[key].append(location)
@@ -655,26 +944,91 @@ class LocationManager:
         if not query or not self.locations:
             return []
 
+        # クエリの正規化は1回だけ行い、以降の各段階で使い回す
+        query_normalized = _normalize_location_name(query)
+        if not query_normalized:
+            return []
+
         results = []
-        query_normalized = query.strip().lower()
 
         # 1. 完全一致検索
-        if query_normalized in self.location_index:
-            results.extend(self.location_index[query_normalized])
+        index_key = query_normalized.lower()
+        if index_key in self.location_index:
+            results.extend(self.location_index[index_key])
 
         # 2. 部分一致検索
+        # 安価な文字列判定を先に行い、結果リストとの重複確認（全フィールド比較）は一致時のみ
         for location in self.locations:
-            if location not in results and location.matches_query(query, fuzzy=False):
+            if (
+                location._matches_normalized_query(query_normalized, fuzzy=False)
+                and location not in results
+            ):
                 results.append(location)
 
         # 3. あいまい検索（必要に応じて）
         if fuzzy and len(results) < max_results:
-            for location in self.locations:
-                if location not in results and location.matches_query(query, fuzzy=True):
+            candidates = self._fuzzy_candidates(query_normalized)
+            if RAPIDFUZZ_AVAILABLE:
+                candidates = self._rapidfuzz_matches(query_normalized, candidates)
+            for idx in candidates:
+                location = self.locations[idx]
+                if (
+                    location._matches_normalized_query(query_normalized, fuzzy=True)
+                    and location not in results
+                ):
                     results.append(location)
 
         return results[:max_results]
 
+    def _rapidfuzz_matches(self, query_normalized: str, candidates: List[int]) -> List[int]:
+        """rapidfuzzで候補地点の類似度を一括計算し、閾値以上の地点に絞り込む
+
+        Args:
+            query_normalized: 正規化済みの検索クエリ
+            candidates: 候補地点のインデックスリスト
+
+        Returns:
+            類似度が閾値以上の地点インデックスリスト（元の順序）
+        """
+        # 同じ正規化名を持つ地点（表記ゆれの重複行など）は1回だけ評価する
+        unique_names = list(dict.fromkeys(self.normalized_names[idx] for idx in candidates))
+        matches = rapidfuzz_process.extract(
+            query_normalized,
+            unique_names,
+            scorer=RapidfuzzLevenshtein.normalized_similarity,
+            score_cutoff=FUZZY_SIMILARITY_THRESHOLD,
+            limit=None,
+        )
+        matched_names = {name for name, _, _ in matches}
+        return [idx for idx in candidates if self.normalized_names[idx] in matched_names]
+
+    def _fuzzy_candidates(self, query_normalized: str) -> List[int]:
+        """あいまい検索の候補地点をバイグラムインデックスで絞り込む
+
+        類似度70%以上となる文字列同士は必ずバイグラムを共有するため、
+        共通バイグラムを持たない地点はレーベンシュタイン距離の計算対象から除外できる。
+        さらに文字数差だけで類似度が閾値に届かない地点も除外する
+
+        Args:
+            query_normalized: 正規化済みの検索クエリ
+
+        Returns:
+            候補地点のインデックスリスト（元の順序）
+        """
+        query_length = len(query_normalized)
+
+        candidates: Set[int] = set()
+        for bigram in _bigrams(query_normalized):
+            candidates.update(self.bigram_index.get(bigram, ()))
+
+        name_lengths = self.name_lengths
+        return [
+            idx
+            for idx in sorted(candidates)
+            if 1.0 - abs(name_lengths[idx] - query_length) / max(name_lengths[idx], query_length)
+            >= FUZZY_SIMILARITY_THRESHOLD
+        ]
+
     def get_location(self, name: str) -> Optional[Location]:
         """地点名から地点を取得（完全一致）
 
@@ -686,16 +1040,15 @@ class LocationManager:
         """
         name_normalized = name.strip().lower()
 
-        # インデックス検索
-        if name_normalized in self.location_index:
-            candidates = self.location_index[name_normalized]
-            if candidates:
-                return candidates[0]
+        # 地点名インデックス（O(1)）
+        location = self.name_index.get(name_normalized)
+        if location is not None:
+            return location
 
-        # 線形検索
-        for location in self.locations:
-            if location.normalized_name.lower() == name_normalized:
-                return location
+        # 都道府県名などのインデックス
+        candidates = self.location_index.get(name_normalized)
+        if candidates:
+            return candidates[0]
 
         return None
 
@@ -762,9 +1115,8 @@ class LocationManager:
             if distance is not None and distance <= radius_km:
                 nearby.append((location, distance))
 
-        # 距離順でソート
-        nearby.sort(key=lambda x: x[1])
-        return nearby[:max_results]
+        # 距離順で上位max_results件のみ取得（全件ソートを避ける）
+        return heapq.nsmallest(max_results, nearby, key=lambda x: x[1])
 
     def _sort_locations_by_order(self, locations: List[Location]) -> List[Location]:
         """地点リストを指定された順序でソートする
@@ -861,10 +1213,39 @@ def load_locations_from_csv(csv_path: str = "Chiten.csv") -> List[Location]:
     Returns:
         地点データのリスト
     """
-    manager = LocationManager(csv_path)
+    manager = _get_cached_manager(csv_path, _get_mtime_ns(csv_path))
     return manager.get_all_locations()
 
 
+@functools.lru_cache(maxsize=8)
+def _get_cached_manager(csv_path: str, mtime_ns: int) -> LocationManager:
+    """CSVパスと更新時刻ごとにLocationManagerをキャッシュ
+
+    Args:
+        csv_path: CSVファイルのパス
+        mtime_ns: CSVファイルの更新時刻（ナノ秒、ファイル更新時に再読み込みさせるためのキー）
+
+    Returns:
+        LocationManagerインスタンス
+    """
+    return LocationManager(csv_path)
+
+
+def _get_mtime_ns(path: str) -> int:
+    """ファイルの更新時刻を取得
+
+    Args:
+        path: ファイルパス
+
+    Returns:
+        更新時刻（ナノ秒）、ファイルが存在しない場合は0
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
 def search_location(query: str, max_results: int = 10, fuzzy: bool = True) -> List[Location]:
     """地点検索の便利関数
 
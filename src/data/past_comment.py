@@ -4,11 +4,95 @@
 S3から取得する過去コメントデータの構造化と管理を行う
 """
 
+from collections import Counter, defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+import functools
+import heapq
+import operator
+from typing import Dict, FrozenSet, Iterable, List, Optional, Any, Tuple
 from enum import Enum
 import json
+import re
+import sys
+
+import numpy as np
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# 天気状況の類義語（基本天気 → 類義語）
+WEATHER_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "晴れ": ("快晴", "晴天", "clear", "sunny"),
+    "曇り": ("曇天", "cloudy", "曇り空"),
+    "雨": ("降雨", "rain", "rainy", "小雨", "大雨"),
+    "雪": ("降雪", "snow", "snowy", "小雪", "大雪"),
+    "霧": ("fog", "foggy", "かすみ"),
+    "風": ("wind", "windy", "強風", "微風"),
+}
+
+# (語, 基本天気) の一覧（基本天気自身も含む）
+_WEATHER_TERMS: Tuple[Tuple[str, str], ...] = tuple(
+    (term, base) for base, synonyms in WEATHER_SYNONYMS.items() for term in (base, *synonyms)
+)
+
+# 語 → 基本天気
+_WEATHER_TERM_TO_BASE: Dict[str, str] = dict(_WEATHER_TERMS)
+
+# 全ての語を1つの正規表現にまとめ、1回の走査で全出現位置の語を検出する。
+# 先読みにより重なった出現（例: "大雨" と "雨"）も拾い、同じ開始位置では長い語を優先する
+_WEATHER_TERM_PATTERN = re.compile(
+    "(?=("
+    + "|".join(re.escape(term) for term in sorted(_WEATHER_TERM_TO_BASE, key=len, reverse=True))
+    + "))"
+)
+
+
+def _resolve_weather_bases(condition_lower: str) -> FrozenSet[str]:
+    """天気状況に含まれる基本天気を取得
+
+    Args:
+        condition_lower: 小文字化済みの天気状況
+
+    Returns:
+        含まれる基本天気の集合
+    """
+    return frozenset(
+        _WEATHER_TERM_TO_BASE[match.group(1)]
+        for match in _WEATHER_TERM_PATTERN.finditer(condition_lower)
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def _fuzzy_weather_match(condition_lower: str, target_lower: str) -> bool:
+    """天気状況があいまい一致するかチェック
+
+    天気状況の語彙は少なく同じ組み合わせが繰り返し判定されるため、結果をキャッシュする
+
+    Args:
+        condition_lower: 小文字化済みの天気状況
+        target_lower: 小文字化済みの対象天気状況
+
+    Returns:
+        一致する場合True
+    """
+    # 完全一致
+    if condition_lower == target_lower:
+        return True
+
+    # 部分一致
+    if target_lower in condition_lower or condition_lower in target_lower:
+        return True
+
+    # 天気状況の類似度判定（共通の基本天気を含むか）
+    return not _resolve_weather_bases(condition_lower).isdisjoint(
+        _resolve_weather_bases(target_lower)
+    )
 
 
 class CommentType(Enum):
@@ -19,7 +103,11 @@ class CommentType(Enum):
     UNKNOWN = "unknown"  # 不明
 
 
-@dataclass
+# CommentType → 列指向配列で使う整数コード
+_COMMENT_TYPE_CODES: Dict[CommentType, int] = {t: i for i, t in enumerate(CommentType)}
+
+
+@dataclass(slots=True)
 class PastComment:
     """過去コメントデータを表すデータクラス
 
@@ -51,9 +139,39 @@ class PastComment:
     source_file: Optional[str] = None
     raw_data: Dict[str, Any] = field(default_factory=dict)
     usage_count: Optional[int] = None
+    # 小文字化済みの地点名・天気状況（フィルタや類似度計算で毎回小文字化しないよう初期化時に計算）
+    _location_lower: str = field(init=False, repr=False, compare=False)
+    _weather_condition_lower: str = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         """データクラス初期化後の検証処理"""
+        self._validate()
+        self._normalize()
+
+    @classmethod
+    def _unchecked(cls, **kwargs: Any) -> "PastComment":
+        """検証を省略して PastComment を生成（検証済みデータの再構築用）
+
+        正規化（コメントタイプの変換や文字列の共有化）は通常どおり行う
+
+        Args:
+            **kwargs: 全フィールドの値（省略不可）
+
+        Returns:
+            PastComment オブジェクト
+        """
+        comment = cls.__new__(cls)
+        for name, value in kwargs.items():
+            setattr(comment, name, value)
+        comment._normalize()
+        return comment
+
+    def _validate(self) -> None:
+        """フィールド値の妥当性を検証
+
+        Raises:
+            ValueError: 値が不正な場合
+        """
         # コメント本文の検証
         if not self.comment_text or not self.comment_text.strip():
             raise ValueError("コメント本文が空です")
@@ -81,6 +199,23 @@ class PastComment:
             if not 0 <= self.humidity <= 100:
                 raise ValueError(f"異常な湿度値: {self.humidity}%")
 
+    def _normalize(self) -> None:
+        """フィールド値の正規化と派生値の計算"""
+        # コメントタイプの正規化（辞書から復元した文字列などは列挙型に変換しておく）
+        if not isinstance(self.comment_type, CommentType):
+            try:
+                self.comment_type = CommentType(self.comment_type)
+            except ValueError:
+                self.comment_type = CommentType.UNKNOWN
+
+        # 大量のコメントで重複する文字列は1つのオブジェクトを共有する
+        self.location = sys.intern(self.location)
+        self.weather_condition = sys.intern(self.weather_condition)
+        self._location_lower = sys.intern(self.location.lower())
+        self._weather_condition_lower = sys.intern(self.weather_condition.lower())
+        if type(self.weather_code) is str:
+            self.weather_code = sys.intern(self.weather_code)
+
     def to_dict(self) -> Dict[str, Any]:
         """辞書形式に変換
 
@@ -92,11 +227,7 @@ class PastComment:
             "datetime": self.datetime.isoformat(),
             "weather_condition": self.weather_condition,
             "comment_text": self.comment_text,
-            "comment_type": (
-                self.comment_type.value
-                if hasattr(self.comment_type, "value")
-                else str(self.comment_type)
-            ),
+            "comment_type": self.comment_type.value,
             "temperature": self.temperature,
             "weather_code": self.weather_code,
             "humidity": self.humidity,
@@ -107,12 +238,23 @@ class PastComment:
         }
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any], source_file: Optional[str] = None) -> "PastComment":
+    def from_dict(
+        cls,
+        data: Dict[str, Any],
+        source_file: Optional[str] = None,
+        copy_raw: bool = True,
+        validate: bool = True,
+    ) -> "PastComment":
         """辞書から PastComment オブジェクトを作成
 
         Args:
             data: 過去コメントデータの辞書
             source_file: 元ファイル名
+            copy_raw: raw_data に data のコピーを保持するか。False の場合は data をそのまま
+                保持するため、呼び出し側で使い捨てにする辞書を渡すこと（大量読み込み時の
+                辞書コピーを省略できる）
+            validate: 値の妥当性を検証するか。自身の to_dict() の出力など検証済みの
+                データを再構築する場合のみ False を指定する
 
         Returns:
             PastComment オブジェクト
@@ -133,7 +275,8 @@ class PastComment:
         except ValueError:
             comment_type = CommentType.UNKNOWN
 
-        return cls(
+        constructor = cls if validate else cls._unchecked
+        return constructor(
             location=data.get("location", ""),
             datetime=datetime_obj,
             weather_condition=data.get("weather_condition", ""),
@@ -145,7 +288,7 @@ class PastComment:
             wind_speed=data.get("wind_speed"),
             precipitation=data.get("precipitation"),
             source_file=source_file,
-            raw_data=data.copy(),
+            raw_data=data.copy() if copy_raw else data,
             usage_count=data.get("usage_count"),
         )
 
@@ -159,37 +302,14 @@ class PastComment:
         Returns:
             一致する場合True
         """
-        if not fuzzy:
-            return self.weather_condition == target_condition
-
-        # あいまい検索（部分一致）
-        condition_lower = self.weather_condition.lower()
-        target_lower = target_condition.lower()
-
-        # 完全一致
-        if condition_lower == target_lower:
+        # 完全一致（小文字化などの文字列生成を行う前に判定）
+        if self.weather_condition == target_condition:
             return True
 
-        # 部分一致
-        if target_lower in condition_lower or condition_lower in target_lower:
-            return True
-
-        # 天気状況の類似度判定
-        weather_synonyms = {
-            "晴れ": ["快晴", "晴天", "clear", "sunny"],
-            "曇り": ["曇天", "cloudy", "曇り空"],
-            "雨": ["降雨", "rain", "rainy", "小雨", "大雨"],
-            "雪": ["降雪", "snow", "snowy", "小雪", "大雪"],
-            "霧": ["fog", "foggy", "かすみ"],
-            "風": ["wind", "windy", "強風", "微風"],
-        }
-
-        for base_condition, synonyms in weather_synonyms.items():
-            if base_condition in condition_lower or any(syn in condition_lower for syn in synonyms):
-                if base_condition in target_lower or any(syn in target_lower for syn in synonyms):
-                    return True
+        if not fuzzy:
+            return False
 
-        return False
+        return _fuzzy_weather_match(self._weather_condition_lower, target_condition.lower())
 
     def calculate_similarity_score(
         self,
@@ -207,28 +327,60 @@ class PastComment:
         Returns:
             類似度スコア（0.0-1.0）
         """
-        score = 0.0
+        return self._calculate_similarity_score(
+            target_weather_condition.lower(), target_temperature, target_location
+        )
 
-        # 天気状況の類似度（50%の重み）
-        if self.matches_weather_condition(target_weather_condition):
-            score += 0.5
+    def _calculate_similarity_score(
+        self,
+        target_condition_lower: str,
+        target_temperature: Optional[float],
+        target_location: Optional[str],
+        min_score: float = 0.0,
+    ) -> float:
+        """類似度スコアを計算（対象天気状況は小文字化済み）
+
+        気温・地点の安価な判定を先に行い、天気状況が一致しても min_score に
+        届かない場合は天気状況のあいまい判定を省略する（その場合の戻り値は min_score 未満）
+
+        Args:
+            target_condition_lower: 小文字化済みの対象天気状況
+            target_temperature: 対象の気温
+            target_location: 対象の地点
+            min_score: 必要な最小スコア
 
+        Returns:
+            類似度スコア（0.0-1.0）
+        """
         # 気温の類似度（30%の重み）
+        temp_part = 0.0
         if self.temperature is not None and target_temperature is not None:
             temp_diff = abs(self.temperature - target_temperature)
             # 温度差が10度以内なら類似とみなす
             if temp_diff <= 10:
                 temp_score = max(0, (10 - temp_diff) / 10)
-                score += 0.3 * temp_score
+                temp_part = 0.3 * temp_score
 
         # 地点の類似度（20%の重み）
+        location_part = 0.0
         if target_location is not None:
             if self.location == target_location:
-                score += 0.2
+                location_part = 0.2
             elif target_location in self.location or self.location in target_location:
-                score += 0.1
+                location_part = 0.1
+
+        # 天気状況が一致しても最小スコアに届かない場合は判定不要
+        if 0.5 + temp_part + location_part < min_score:
+            return temp_part + location_part
+
+        # 天気状況の類似度（50%の重み）
+        weather_part = 0.0
+        if self.weather_condition == target_condition_lower or _fuzzy_weather_match(
+            self._weather_condition_lower, target_condition_lower
+        ):
+            weather_part = 0.5
 
-        return min(1.0, score)
+        return min(1.0, weather_part + temp_part + location_part)
 
     def get_character_count(self) -> int:
         """コメントの文字数を取得
@@ -280,7 +432,34 @@ class PastComment:
         return True
 
 
-@dataclass
+def _same_items(snapshot: Tuple[Any, ...], items: List[Any]) -> bool:
+    """items が snapshot と同一のオブジェクトを同じ順に持つか
+
+    snapshot が要素への参照を保持するので、id の再利用で別の要素と一致することはない。
+    """
+    return len(snapshot) == len(items) and all(map(operator.is_, snapshot, items))
+
+
+@dataclass(frozen=True)
+class _CommentColumns:
+    """フィルタ用の列指向データ（comments と同じ並び）
+
+    Attributes:
+        locations: 地点名
+        locations_lower: 小文字化済みの地点名
+        weather_conditions: 天気状況
+        weather_conditions_lower: 小文字化済みの天気状況
+        type_codes: コメントタイプの整数コード
+    """
+
+    locations: Tuple[str, ...]
+    locations_lower: Tuple[str, ...]
+    weather_conditions: Tuple[str, ...]
+    weather_conditions_lower: Tuple[str, ...]
+    type_codes: np.ndarray
+
+
+@dataclass(slots=True)
 class PastCommentCollection:
     """過去コメントのコレクションを管理するクラス
 
@@ -293,6 +472,80 @@ class PastCommentCollection:
     comments: List[PastComment]
     source_period: Optional[str] = None
     loaded_at: datetime = field(default_factory=datetime.now)
+    # (構築時の comments のスナップショット, 構築結果)
+    _columns_cache: Optional[Tuple[Tuple[PastComment, ...], _CommentColumns]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _by_condition_cache: Optional[
+        Tuple[Tuple[PastComment, ...], Dict[str, List[PastComment]]]
+    ] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def comments_by_condition(self) -> Dict[str, List[PastComment]]:
+        """天気状況ごとに分類したコメント
+
+        選択のたびに全件を走査しないよう、初回アクセス時に1回だけ構築する。
+        comments の差し替え・追加・要素の入れ替えを検知できるよう、構築時の要素と
+        同一のオブジェクトが同じ順に並んでいなければ再構築する
+
+        Returns:
+            天気状況をキー、コメントのリスト（comments と同じ並び）を値とする辞書
+        """
+        cache = self._by_condition_cache
+        if cache is not None and _same_items(cache[0], self.comments):
+            return cache[1]
+
+        snapshot = tuple(self.comments)
+        buckets: Dict[str, List[PastComment]] = defaultdict(list)
+        for comment in snapshot:
+            buckets[comment.weather_condition].append(comment)
+        by_condition = dict(buckets)
+        self._by_condition_cache = (snapshot, by_condition)
+        return by_condition
+
+    def _get_columns(self) -> _CommentColumns:
+        """フィルタ用の列指向データを取得
+
+        comments の差し替え・追加・要素の入れ替えを検知できるよう、構築時の要素と
+        同一のオブジェクトが同じ順に並んでいなければ再構築する
+
+        Returns:
+            列指向データ
+        """
+        cache = self._columns_cache
+        if cache is not None and _same_items(cache[0], self.comments):
+            return cache[1]
+
+        comments = tuple(self.comments)
+        columns = _CommentColumns(
+            locations=tuple(c.location for c in comments),
+            locations_lower=tuple(c._location_lower for c in comments),
+            weather_conditions=tuple(c.weather_condition for c in comments),
+            weather_conditions_lower=tuple(c._weather_condition_lower for c in comments),
+            type_codes=np.fromiter(
+                (_COMMENT_TYPE_CODES.get(c.comment_type, -1) for c in comments),
+                dtype=np.int8,
+                count=len(comments),
+            ),
+        )
+        self._columns_cache = (comments, columns)
+        return columns
+
+    def _select(self, indices: Iterable[int]) -> "PastCommentCollection":
+        """指定インデックスのコメントだけを持つコレクションを生成
+
+        Args:
+            indices: 残すコメントのインデックス
+
+        Returns:
+            フィルタリングされたコレクション
+        """
+        comments = self.comments
+        return PastCommentCollection(
+            comments=[comments[i] for i in indices],
+            source_period=self.source_period,
+            loaded_at=self.loaded_at,
+        )
 
     def filter_by_location(
         self, location: str, exact_match: bool = False
@@ -306,19 +559,18 @@ class PastCommentCollection:
         Returns:
             フィルタリングされたコレクション
         """
+        columns = self._get_columns()
         if exact_match:
-            filtered_comments = [c for c in self.comments if c.location == location]
+            indices = [i for i, loc in enumerate(columns.locations) if loc == location]
         else:
             location_lower = location.lower()
-            filtered_comments = [
-                c
-                for c in self.comments
-                if location_lower in c.location.lower() or c.location.lower() in location_lower
+            indices = [
+                i
+                for i, loc in enumerate(columns.locations_lower)
+                if location_lower in loc or loc in location_lower
             ]
 
-        return PastCommentCollection(
-            comments=filtered_comments, source_period=self.source_period, loaded_at=self.loaded_at
-        )
+        return self._select(indices)
 
     def filter_by_weather_condition(
         self, condition: str, fuzzy: bool = True
@@ -332,12 +584,21 @@ class PastCommentCollection:
         Returns:
             フィルタリングされたコレクション
         """
-        filtered_comments = [
-            c for c in self.comments if c.matches_weather_condition(condition, fuzzy)
-        ]
+        if fuzzy:
+            columns = self._get_columns()
+            # 対象の天気状況の正規化はループ外で1回だけ行う
+            condition_lower = condition.lower()
+            indices = [
+                i
+                for i, weather in enumerate(columns.weather_conditions_lower)
+                if _fuzzy_weather_match(weather, condition_lower)
+            ]
+            return self._select(indices)
 
         return PastCommentCollection(
-            comments=filtered_comments, source_period=self.source_period, loaded_at=self.loaded_at
+            comments=list(self.comments_by_condition.get(condition, [])),
+            source_period=self.source_period,
+            loaded_at=self.loaded_at,
         )
 
     def filter_by_comment_type(self, comment_type: CommentType) -> "PastCommentCollection":
@@ -349,11 +610,15 @@ class PastCommentCollection:
         Returns:
             フィルタリングされたコレクション
         """
-        filtered_comments = [c for c in self.comments if c.comment_type == comment_type]
+        code = _COMMENT_TYPE_CODES.get(comment_type)
+        if code is None:
+            # CommentType 以外が渡された場合は従来どおり値を直接比較する
+            return self._select(
+                [i for i, c in enumerate(self.comments) if c.comment_type == comment_type]
+            )
 
-        return PastCommentCollection(
-            comments=filtered_comments, source_period=self.source_period, loaded_at=self.loaded_at
-        )
+        mask = self._get_columns().type_codes == code
+        return self._select(np.flatnonzero(mask).tolist())
 
     def filter_by_type(self, comment_type: CommentType) -> "PastCommentCollection":
         """コメントタイプでフィルタリング（エイリアス）
@@ -386,20 +651,22 @@ class PastCommentCollection:
         Returns:
             類似度順にソートされたコメントリスト
         """
-        # 類似度を計算
-        comment_scores = []
-        for comment in self.comments:
-            score = comment.calculate_similarity_score(
-                target_weather_condition, target_temperature, target_location
+        # 類似度を計算（対象天気状況の正規化はループ外で1回だけ行う）
+        target_condition_lower = target_weather_condition.lower()
+        scored = (
+            (
+                comment,
+                comment._calculate_similarity_score(
+                    target_condition_lower, target_temperature, target_location, min_similarity
+                ),
             )
-            if score >= min_similarity:
-                comment_scores.append((comment, score))
-
-        # 類似度でソート（降順）
-        comment_scores.sort(key=lambda x: x[1], reverse=True)
+            for comment in self.comments
+        )
+        candidates = (item for item in scored if item[1] >= min_similarity)
 
-        # 指定数まで返す
-        return [comment for comment, score in comment_scores[:max_results]]
+        # 上位 max_results 件だけをヒープで取り出す（同スコアは元の並び順を維持）
+        top = heapq.nlargest(max_results, candidates, key=operator.itemgetter(1))
+        return [comment for comment, _ in top]
 
     def get_by_type_and_similarity(
         self,
@@ -438,32 +705,35 @@ class PastCommentCollection:
         if not self.comments:
             return {}
 
-        # タイプ別集計
-        type_counts = {}
-        for comment_type in CommentType:
-            type_counts[comment_type.value] = sum(
-                1 for c in self.comments if c.comment_type == comment_type
-            )
+        n = len(self.comments)
+
+        columns = self._get_columns()
+
+        # タイプ別集計（列指向のタイプコードを bincount で1パス集計し、出現しないタイプは0）
+        type_code_counts = np.bincount(columns.type_codes, minlength=len(_COMMENT_TYPE_CODES))
+        type_counts = {
+            comment_type.value: int(type_code_counts[code])
+            for comment_type, code in _COMMENT_TYPE_CODES.items()
+        }
 
-        # 地点別集計
-        location_counts = {}
-        for comment in self.comments:
-            location_counts[comment.location] = location_counts.get(comment.location, 0) + 1
+        # 地点別集計（上位10件のみ必要なので全件ソートせず most_common で取り出す）
+        location_counts = Counter(columns.locations)
 
-        # 文字数統計
-        char_counts = [c.get_character_count() for c in self.comments]
+        # 文字数統計（連続した int32 配列上でベクトル演算）
+        char_counts = np.fromiter(
+            (len(c.comment_text) for c in self.comments), dtype=np.int32, count=n
+        )
 
         return {
-            "total_comments": len(self.comments),
+            "total_comments": n,
             "type_distribution": type_counts,
-            "location_distribution": dict(
-                sorted(location_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-            ),
+            "location_distribution": dict(location_counts.most_common(10)),
             "character_stats": {
-                "min_length": min(char_counts) if char_counts else 0,
-                "max_length": max(char_counts) if char_counts else 0,
-                "avg_length": sum(char_counts) / len(char_counts) if char_counts else 0,
-                "within_15_chars": sum(1 for c in char_counts if c <= 15),
+                # JSON 化できるよう Python のネイティブ型に戻す
+                "min_length": int(char_counts.min()),
+                "max_length": int(char_counts.max()),
+                "avg_length": float(char_counts.mean()),
+                "within_15_chars": int((char_counts <= 15).sum()),
             },
             "source_period": self.source_period,
             "loaded_at": self.loaded_at.isoformat(),
@@ -482,6 +752,19 @@ class PastCommentCollection:
             "statistics": self.get_statistics(),
         }
 
+    def export_json(self) -> bytes:
+        """JSON 形式（UTF-8 バイト列）に変換
+
+        orjson が利用可能な場合はそちらでシリアライズする
+
+        Returns:
+            to_dict() と同じ構造の JSON バイト列
+        """
+        data = self.to_dict()
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(data)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 
 if __name__ == "__main__":
     # テスト用コード
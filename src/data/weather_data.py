@@ -4,10 +4,33 @@
 WxTech APIからの天気予報データを標準化して扱うためのクラス群
 """
 
+import bisect
+import operator
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from enum import Enum
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# 日本標準時（naive な datetime はこのタイムゾーンとして扱う）
+_JST = ZoneInfo("Asia/Tokyo")
+
+
+def _to_epoch(dt: datetime) -> float:
+    """datetime を比較用の POSIX タイムスタンプに変換
+
+    Args:
+        dt: 対象日時（naive な場合は JST として扱う）
+
+    Returns:
+        POSIX タイムスタンプ（秒）
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=_JST)
+    return dt.timestamp()
 
 
 class WeatherCondition(Enum):
@@ -71,7 +94,7 @@ class WindDirection(Enum):
     UNKNOWN = "unknown"  # 不明
 
 
-@dataclass
+@dataclass(slots=True)
 class WeatherForecast:
     """天気予報データを表すデータクラス
 
@@ -110,6 +133,8 @@ class WeatherForecast:
     uv_index: Optional[int] = None
     confidence: Optional[float] = None
     raw_data: Dict[str, Any] = field(default_factory=dict)
+    # 予報日時の POSIX タイムスタンプ（時刻比較用に初期化時に計算）
+    _epoch: float = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         """データクラス初期化後の検証処理"""
@@ -133,6 +158,14 @@ class WeatherForecast:
         if not 0 <= self.wind_direction_degrees <= 360:
             raise ValueError(f"異常な風向き度数: {self.wind_direction_degrees}度")
 
+        self._epoch = _to_epoch(self.datetime)
+
+        # 多数の予報で重複する文字列は1つのオブジェクトを共有する
+        if type(self.location) is str:
+            self.location = sys.intern(self.location)
+        if type(self.weather_code) is str:
+            self.weather_code = sys.intern(self.weather_code)
+
     def to_dict(self) -> Dict[str, Any]:
         """辞書形式に変換
 
@@ -250,7 +283,26 @@ class WeatherForecast:
             return "moderate"
 
 
-@dataclass
+@dataclass(frozen=True)
+class _ForecastColumns:
+    """集計・時刻検索用の列指向データ
+
+    Attributes:
+        temperatures: 気温（forecasts と同じ並び）
+        precipitations: 降水量（forecasts と同じ並び）
+        epochs: 昇順に並べた予報日時のタイムスタンプ
+        order: epochs の各要素に対応する forecasts のインデックス
+        by_hour: 時 → その時刻の最初の予報
+    """
+
+    temperatures: np.ndarray
+    precipitations: np.ndarray
+    epochs: List[float]
+    order: List[int]
+    by_hour: Dict[int, WeatherForecast]
+
+
+@dataclass(slots=True)
 class WeatherForecastCollection:
     """複数の天気予報データを管理するコレクション
 
@@ -263,6 +315,53 @@ class WeatherForecastCollection:
     location: str
     forecasts: List[WeatherForecast]
     generated_at: datetime = field(default_factory=datetime.now)
+    # (構築時の forecasts のスナップショット, 構築結果)
+    _columns_cache: Optional[Tuple[Tuple[WeatherForecast, ...], _ForecastColumns]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def _get_columns(self) -> _ForecastColumns:
+        """集計・時刻検索用の列指向データを取得
+
+        forecasts の差し替え・追加・要素の入れ替えを検知できるよう、構築時の要素と
+        同一のオブジェクトが同じ順に並んでいなければ再構築する
+        （スナップショットが要素を参照し続けるので、id の再利用で誤って一致しない）
+
+        Returns:
+            列指向データ
+        """
+        cache = self._columns_cache
+        forecasts = self.forecasts
+        if (
+            cache is not None
+            and len(cache[0]) == len(forecasts)
+            and all(map(operator.is_, cache[0], forecasts))
+        ):
+            return cache[1]
+        snapshot = tuple(forecasts)
+
+        # 予報リストを1回だけ走査して各列を作る
+        temperatures: List[float] = []
+        precipitations: List[float] = []
+        raw_epochs: List[float] = []
+        by_hour: Dict[int, WeatherForecast] = {}
+        for forecast in snapshot:
+            temperatures.append(forecast.temperature)
+            precipitations.append(forecast.precipitation)
+            raw_epochs.append(forecast._epoch)
+            by_hour.setdefault(forecast.datetime.hour, forecast)
+
+        # 安定ソートなので、同時刻の予報は元の並び順を保つ
+        order = sorted(range(len(raw_epochs)), key=raw_epochs.__getitem__)
+        columns = _ForecastColumns(
+            temperatures=np.array(temperatures, dtype=np.float64),
+            precipitations=np.array(precipitations, dtype=np.float64),
+            epochs=[raw_epochs[i] for i in order],
+            order=order,
+            by_hour=by_hour,
+        )
+        self._columns_cache = (snapshot, columns)
+        return columns
 
     def get_current_forecast(self) -> Optional[WeatherForecast]:
         """現在時刻に最も近い予報を取得
@@ -273,10 +372,7 @@ class WeatherForecastCollection:
         if not self.forecasts:
             return None
 
-        import pytz
-
-        jst = pytz.timezone("Asia/Tokyo")
-        now = datetime.now(jst)
+        now = datetime.now(_JST)
 
         return self.get_nearest_forecast(now)
 
@@ -292,26 +388,22 @@ class WeatherForecastCollection:
         if not self.forecasts:
             return None
 
-        # タイムゾーン対応: target_datetimeとforecast.datetimeの両方を比較可能にする
-        def get_comparable_datetime(dt: datetime) -> datetime:
-            """datetimeオブジェクトを比較可能な形式に変換"""
-            if dt.tzinfo is None:
-                # naiveな場合はJSTとして扱う
-                import pytz
-
-                jst = pytz.timezone("Asia/Tokyo")
-                return jst.localize(dt)
-            return dt
+        columns = self._get_columns()
+        epochs, order = columns.epochs, columns.order
+        target = _to_epoch(target_datetime)
 
-        target_dt_aware = get_comparable_datetime(target_datetime)
+        # 二分探索で前後の候補だけを比較する
+        idx = bisect.bisect_left(epochs, target)
+        candidates = []
+        if idx < len(epochs):
+            candidates.append(idx)
+        if idx > 0:
+            # 同時刻の予報が複数ある場合は元の並びで先頭のものを候補にする
+            candidates.append(bisect.bisect_left(epochs, epochs[idx - 1]))
 
-        closest_forecast = min(
-            self.forecasts,
-            key=lambda f: abs(
-                (get_comparable_datetime(f.datetime) - target_dt_aware).total_seconds()
-            ),
-        )
-        return closest_forecast
+        # 等距離の場合は元の並びで先にある予報を優先する（従来の min と同じ挙動）
+        best = min(candidates, key=lambda i: (abs(epochs[i] - target), order[i]))
+        return self.forecasts[order[best]]
 
     def get_forecast_by_hour(self, target_hour: int) -> Optional[WeatherForecast]:
         """指定時刻の予報を取得
@@ -322,10 +414,7 @@ class WeatherForecastCollection:
         Returns:
             指定時刻の天気予報（なければNone）
         """
-        for forecast in self.forecasts:
-            if forecast.datetime.hour == target_hour:
-                return forecast
-        return None
+        return self._get_columns().by_hour.get(target_hour)
 
     def get_daily_summary(self) -> Dict[str, Any]:
         """日次サマリーを取得
@@ -336,15 +425,16 @@ class WeatherForecastCollection:
         if not self.forecasts:
             return {}
 
-        temperatures = [f.temperature for f in self.forecasts]
-        precipitations = [f.precipitation for f in self.forecasts]
+        columns = self._get_columns()
+        temperatures, precipitations = columns.temperatures, columns.precipitations
 
+        # JSON 化できるよう Python のネイティブ型に戻す
         return {
-            "max_temperature": max(temperatures),
-            "min_temperature": min(temperatures),
-            "avg_temperature": sum(temperatures) / len(temperatures),
-            "total_precipitation": sum(precipitations),
-            "max_precipitation": max(precipitations),
+            "max_temperature": float(temperatures.max()),
+            "min_temperature": float(temperatures.min()),
+            "avg_temperature": float(temperatures.mean()),
+            "total_precipitation": float(precipitations.sum()),
+            "max_precipitation": float(precipitations.max()),
             "forecast_count": len(self.forecasts),
         }
 
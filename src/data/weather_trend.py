@@ -1,14 +1,30 @@
 """気象変化の傾向を表現するデータクラス"""
 
+import functools
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from enum import Enum
 
 from src.data.weather_data import WeatherForecast, WeatherCondition
 from src.config.comment_config import get_comment_config
 
 
+@functools.lru_cache(maxsize=1)
+def _get_weather_scores() -> Dict[WeatherCondition, int]:
+    """設定から天気スコアを取得（初回のみ設定を参照してキャッシュ）
+
+    Returns:
+        天気状況 → スコアの辞書
+    """
+    return get_comment_config().weather_scores
+
+
+def clear_weather_score_cache() -> None:
+    """キャッシュした天気スコアを破棄（設定の再読み込み時に使用）"""
+    _get_weather_scores.cache_clear()
+
+
 class TrendDirection(Enum):
     """変化の方向"""
     IMPROVING = "improving"  # 改善
@@ -17,7 +33,7 @@ class TrendDirection(Enum):
     FLUCTUATING = "fluctuating"  # 変動
 
 
-@dataclass
+@dataclass(slots=True)
 class WeatherTrend:
     """気象変化の傾向を表すデータクラス
     
@@ -65,40 +81,44 @@ class WeatherTrend:
         
         # 気温変化の計算
         temperature_change = end.temperature - start.temperature
-        temperatures = [f.temperature for f in forecasts]
-        max_temp = max(temperatures)
-        min_temp = min(temperatures)
-        
-        # 気温傾向の判定
-        if abs(temperature_change) < 2.0:
-            temp_trend = TrendDirection.STABLE
-        elif temperature_change > 0:
-            temp_trend = TrendDirection.IMPROVING if start.temperature < 25 else TrendDirection.WORSENING
-        else:
-            temp_trend = TrendDirection.WORSENING if start.temperature > 15 else TrendDirection.IMPROVING
-            
-        # 天気変化の検出
+
+        # 最高・最低気温、天気変化、総降水量を1回の走査でまとめて集計
+        max_temp = min_temp = start.temperature
+        precipitation_total = start.precipitation
         weather_changes = []
-        prev_condition = forecasts[0].weather_condition
-        
-        for i in range(1, len(forecasts)):
-            curr_condition = forecasts[i].weather_condition
+        prev_condition = start.weather_condition
+
+        for forecast in forecasts[1:]:
+            temperature = forecast.temperature
+            if temperature > max_temp:
+                max_temp = temperature
+            elif temperature < min_temp:
+                min_temp = temperature
+
+            precipitation_total += forecast.precipitation
+
+            curr_condition = forecast.weather_condition
             if curr_condition != prev_condition:
                 weather_changes.append((
-                    forecasts[i].datetime,
+                    forecast.datetime,
                     prev_condition.value,
                     curr_condition.value
                 ))
                 prev_condition = curr_condition
-                
+
+        # 気温傾向の判定
+        if abs(temperature_change) < 2.0:
+            temp_trend = TrendDirection.STABLE
+        elif temperature_change > 0:
+            temp_trend = TrendDirection.IMPROVING if start.temperature < 25 else TrendDirection.WORSENING
+        else:
+            temp_trend = TrendDirection.WORSENING if start.temperature > 15 else TrendDirection.IMPROVING
+
         has_weather_change = len(weather_changes) > 0
         
         # 天気傾向の判定
         weather_trend = cls._determine_weather_trend(forecasts, weather_changes)
         
-        # 総降水量の計算
-        precipitation_total = sum(f.precipitation for f in forecasts)
-        
         return cls(
             start_forecast=start,
             end_forecast=end,
@@ -128,8 +148,7 @@ class WeatherTrend:
         end_condition = forecasts[-1].weather_condition
         
         # 設定から天気スコアを取得
-        config = get_comment_config()
-        condition_scores = config.weather_scores
+        condition_scores = _get_weather_scores()
         
         start_score = condition_scores.get(start_condition, 2)
         end_score = condition_scores.get(end_condition, 2)
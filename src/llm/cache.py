@@ -0,0 +1,603 @@
+"""LLMレスポンスキャッシュ
+
+同一の入力（プロバイダー・モデル・プロンプトに使う値）に対する生成結果を再利用し、
+外部APIの呼び出し回数とレイテンシを削減する。
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Set, Tuple
+
+import numpy as np
+
+try:
+    import redis
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# キャッシュのデフォルト設定
+DEFAULT_CACHE_MAX_ENTRIES = 4096
+DEFAULT_CACHE_TTL_SECONDS = 3600.0
+# 共有キャッシュ（Redis 等）の手前に置くプロセス内キャッシュの設定
+DEFAULT_LOCAL_CACHE_MAX_ENTRIES = 1024
+DEFAULT_LOCAL_CACHE_TTL_SECONDS = 60.0
+# SQLite キャッシュでまとめて書き込む件数
+DEFAULT_SQLITE_WRITE_BATCH_SIZE = 32
+# セマンティックキャッシュで同一とみなすコサイン類似度の下限
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+# セマンティックキャッシュの最大件数（超えた場合は古いものから上書き）
+DEFAULT_SEMANTIC_CACHE_MAX_ENTRIES = 10000
+# セマンティックキャッシュの検索範囲を分ける気温の幅（℃）
+DEFAULT_TEMPERATURE_BUCKET = 5.0
+
+
+class CacheBackend(Protocol):
+    """キャッシュの保存先インターフェース"""
+
+    def get(self, key: str) -> Optional[str]:
+        """キーに対応する値を取得（なければNone）"""
+        ...
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        """値を有効期限付きで保存"""
+        ...
+
+    def clear(self) -> None:
+        """全ての値を削除"""
+        ...
+
+
+class MemoryCacheBackend:
+    """プロセス内メモリのキャッシュ（LRU + 有効期限）"""
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES):
+        """
+        Args:
+            max_entries: 保持する最大件数（超えた場合は最も古く使われたものから削除）
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Redis を使用したキャッシュ（複数プロセス間で共有）"""
+
+    def __init__(self, url: str, prefix: str = "llm:cache:"):
+        """
+        Args:
+            url: Redis の接続URL
+            prefix: キーの接頭辞
+
+        Raises:
+            ImportError: redis パッケージがインストールされていない場合
+        """
+        if not REDIS_AVAILABLE:
+            raise ImportError("RedisCacheBackend を使用するには redis パッケージが必要です")
+
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self._client.set(self.prefix + key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class SQLiteCacheBackend:
+    """SQLite を使用したキャッシュ（プロセスの再起動後も保持）
+
+    書き込みはバッファに溜め、write_batch_size 件ごと（およびプロセス終了時）に
+    executemany でまとめて反映する。接続は最初の利用時に1度だけ開く。
+    """
+
+    def __init__(self, path: str, write_batch_size: int = DEFAULT_SQLITE_WRITE_BATCH_SIZE):
+        """
+        Args:
+            path: データベースファイルのパス
+            write_batch_size: まとめて書き込む件数
+        """
+        self.path = path
+        self.write_batch_size = max(1, write_batch_size)
+        self._conn: Optional[sqlite3.Connection] = None
+        # key -> (有効期限のUNIX時刻, 値)
+        self._pending: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _connection(self) -> sqlite3.Connection:
+        """接続を取得（初回のみ開いてテーブルを作成）"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS comments"
+                " (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is not None:
+                return entry[1] if entry[0] > now else None
+
+            row = (
+                self._connection()
+                .execute("SELECT value, expires_at FROM comments WHERE key = ?", (key,))
+                .fetchone()
+            )
+        if row is None or row[1] <= now:
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        with self._lock:
+            self._pending[key] = (time.time() + ttl_seconds, value)
+            if len(self._pending) >= self.write_batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """バッファの書き込みを反映"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO comments (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, value, expires_at) for key, (expires_at, value) in self._pending.items()],
+            )
+            conn.execute("DELETE FROM comments WHERE expires_at <= ?", (time.time(),))
+        self._pending.clear()
+
+    def recent(self, limit: int) -> List[Tuple[str, str, float]]:
+        """有効期限の遅い順にエントリを取得（プロセス内キャッシュの事前読み込み用）
+
+        Args:
+            limit: 最大件数
+
+        Returns:
+            (キー, 値, 残りの有効期限（秒）) のリスト
+        """
+        now = time.time()
+        with self._lock:
+            self._flush_locked()
+            rows = (
+                self._connection()
+                .execute(
+                    "SELECT key, value, expires_at FROM comments WHERE expires_at > ?"
+                    " ORDER BY expires_at DESC LIMIT ?",
+                    (now, limit),
+                )
+                .fetchall()
+            )
+        return [(key, value, expires_at - now) for key, value, expires_at in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM comments")
+
+    def close(self) -> None:
+        """バッファを反映して接続を閉じる"""
+        with self._lock:
+            if self._conn is None and not self._pending:
+                return
+            try:
+                self._flush_locked()
+            except sqlite3.Error as e:
+                logger.warning(f"SQLiteキャッシュの書き込みに失敗: {str(e)}")
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class LLMCache:
+    """LLM生成結果の完全一致キャッシュ
+
+    サンプリングを伴う生成（temperature > 0）は呼び出しごとに結果が変わるのが
+    本来の挙動なので、既定ではキャッシュしない。
+
+    保存先がプロセス外（Redis 等）の場合は、手前に小さなプロセス内 LRU を置き、
+    同じプロセスでの再取得ではネットワークを経由しない。
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+        cache_sampled: bool = False,
+        local_max_entries: int = DEFAULT_LOCAL_CACHE_MAX_ENTRIES,
+        local_ttl_seconds: float = DEFAULT_LOCAL_CACHE_TTL_SECONDS,
+    ):
+        """
+        Args:
+            backend: 保存先（省略時はプロセス内メモリ）
+            ttl_seconds: 有効期限（秒）
+            cache_sampled: temperature > 0 の生成結果もキャッシュするか
+            local_max_entries: プロセス内 LRU の最大件数（0 で無効）
+            local_ttl_seconds: プロセス内 LRU の有効期限（秒）
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.cache_sampled = cache_sampled
+        self.hits = 0
+        self.misses = 0
+
+        # 保存先自体がプロセス内メモリなら二重に持つ必要はない
+        self._local: Optional[MemoryCacheBackend] = None
+        if local_max_entries > 0 and not isinstance(self.backend, MemoryCacheBackend):
+            self._local = MemoryCacheBackend(max_entries=local_max_entries)
+        self.local_ttl_seconds = min(local_ttl_seconds, ttl_seconds)
+
+    def cache_key(
+        self, provider: str, model: str, temperature: float, prompt_payload: Dict[str, Any]
+    ) -> Optional[str]:
+        """キャッシュキーを生成
+
+        Args:
+            provider: プロバイダー名
+            model: モデル名
+            temperature: 生成時の temperature
+            prompt_payload: プロンプトの生成に使う値
+
+        Returns:
+            正規化した入力の SHA-256（キャッシュ対象外の場合はNone）
+        """
+        if temperature > 0 and not self.cache_sampled:
+            return None
+
+        canonical = json.dumps(
+            [provider, model, temperature, prompt_payload],
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """キャッシュ済みの生成結果を取得
+
+        Args:
+            key: cache_key() で生成したキー
+
+        Returns:
+            生成結果（なければNone）
+        """
+        if self._local is not None:
+            value = self._local.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # キャッシュ障害で生成自体を止めない
+            logger.warning(f"LLMキャッシュの読み込みに失敗: {str(e)}")
+            value = None
+
+        if value is not None and self._local is not None:
+            self._local.set(key, value, self.local_ttl_seconds)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """生成結果を保存
+
+        Args:
+            key: cache_key() で生成したキー
+            value: 生成結果
+        """
+        if self._local is not None:
+            self._local.set(key, value, self.local_ttl_seconds)
+
+        try:
+            self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"LLMキャッシュの書き込みに失敗: {str(e)}")
+
+    def clear(self) -> None:
+        """キャッシュを全て削除"""
+        if self._local is not None:
+            self._local.clear()
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+@dataclass
+class CacheConfig:
+    """セマンティックキャッシュの設定"""
+
+    similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD
+    ttl: float = DEFAULT_CACHE_TTL_SECONDS
+    max_entries: int = DEFAULT_SEMANTIC_CACHE_MAX_ENTRIES
+    # 検索範囲（scope_key）を分ける気温の幅（℃）
+    temperature_bucket: float = DEFAULT_TEMPERATURE_BUCKET
+    # 保存先のファイル（.npz）。指定時は起動時に読み込み、プロセス終了時に書き出す
+    path: Optional[str] = None
+
+
+class SemanticCache:
+    """プロンプトの埋め込みベクトルによる類似一致キャッシュ
+
+    気温の小数点以下など、生成結果に影響しない程度の違いしかないプロンプトを
+    同一とみなし、過去の生成結果を再利用する。正規化したベクトルを行列に保持し、
+    内積（= コサイン類似度）の最大値が閾値以上なら対応する生成結果を返す。
+
+    地点名や気温だけが異なるプロンプトは埋め込みがほぼ同じになるため、
+    地点・天気・気温帯などの scope ごとにエントリを分け、同じ scope の中だけを検索する。
+
+    埋め込みモデル・生成モデルごとに別のインスタンス（保存先）を使うこと。
+    """
+
+    def __init__(self, config: Optional[CacheConfig] = None):
+        """
+        Args:
+            config: キャッシュの設定（省略時は既定値）
+        """
+        self.config = config or CacheConfig()
+        self.hits = 0
+        self.misses = 0
+        # (容量, 次元) の行列。最初の add で次元が決まるまでは None
+        self._vectors: Optional[np.ndarray] = None
+        # 各行の有効期限（UNIX時刻）・scope・生成結果
+        self._expires_at = np.empty(0)
+        self._scopes: List[str] = []
+        self._responses: List[str] = []
+        # scope ごとの行番号（検索時に同じ scope の行だけを取り出す）
+        self._rows_by_scope: Dict[str, Set[int]] = {}
+        self._size = 0
+        # 満杯になった後に次に上書きする行
+        self._next = 0
+        self._lock = threading.Lock()
+
+        if self.config.path:
+            if os.path.exists(self.config.path):
+                self.load(self.config.path)
+            atexit.register(self.save, self.config.path)
+
+    def scope_key(self, location: str, weather_condition: Any, temperature: float) -> str:
+        """地点・天気・気温帯から検索範囲のキーを生成
+
+        Args:
+            location: 地点名
+            weather_condition: 天気状況（Enum の場合は値を使う）
+            temperature: 気温（℃）。temperature_bucket 単位にまとめる
+
+        Returns:
+            lookup / add に渡す scope
+        """
+        condition = getattr(weather_condition, "value", weather_condition)
+        bucket = int(temperature // self.config.temperature_bucket)
+        return f"{location}|{condition}|{bucket}"
+
+    def lookup(self, embedding: Sequence[float], scope: str = "") -> Optional[str]:
+        """同じ scope の中から類似度が閾値以上のキャッシュ済み生成結果を取得
+
+        Args:
+            embedding: プロンプトの埋め込みベクトル
+            scope: 検索範囲（scope_key で生成する）
+
+        Returns:
+            最も類似した生成結果（閾値未満・期限切れの場合はNone）
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            rows = list(self._rows_by_scope.get(scope, ()))
+            if rows:
+                scores = self._vectors[rows] @ query
+                scores[self._expires_at[rows] <= time.time()] = -np.inf
+                best = int(np.argmax(scores))
+                if scores[best] >= self.config.similarity_threshold:
+                    self.hits += 1
+                    return self._responses[rows[best]]
+
+            self.misses += 1
+            return None
+
+    def add(self, embedding: Sequence[float], response: str, scope: str = "") -> None:
+        """生成結果を埋め込みベクトルと共に保存
+
+        Args:
+            embedding: プロンプトの埋め込みベクトル
+            response: 生成結果
+            scope: 検索範囲（scope_key で生成する）
+        """
+        with self._lock:
+            self._add_locked(
+                self._normalize(embedding), response, scope, time.time() + self.config.ttl
+            )
+
+    def _add_locked(self, vector: np.ndarray, response: str, scope: str, expires_at: float) -> None:
+        max_entries = max(1, self.config.max_entries)
+        if self._vectors is None:
+            self._vectors = np.empty((min(64, max_entries), vector.shape[0]), dtype=np.float32)
+            self._expires_at = np.empty(len(self._vectors))
+        elif self._size == len(self._vectors) < max_entries:
+            # 容量を倍にして拡張（上限は max_entries）
+            capacity = min(2 * len(self._vectors), max_entries)
+            vectors = np.empty((capacity, self._vectors.shape[1]), dtype=np.float32)
+            vectors[: self._size] = self._vectors
+            expires = np.empty(capacity)
+            expires[: self._size] = self._expires_at
+            self._vectors, self._expires_at = vectors, expires
+
+        if self._size < len(self._vectors):
+            index = self._size
+            self._size += 1
+            self._responses.append(response)
+            self._scopes.append(scope)
+        else:
+            # 満杯なら最も古い行から上書き
+            index = self._next
+            self._next = (self._next + 1) % self._size
+            old_rows = self._rows_by_scope[self._scopes[index]]
+            old_rows.discard(index)
+            if not old_rows:
+                del self._rows_by_scope[self._scopes[index]]
+            self._responses[index] = response
+            self._scopes[index] = scope
+
+        self._rows_by_scope.setdefault(scope, set()).add(index)
+        self._vectors[index] = vector
+        self._expires_at[index] = expires_at
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        """単位ベクトルに正規化"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def save(self, path: str) -> None:
+        """有効期限内のエントリをファイルに書き出す
+
+        Args:
+            path: 保存先のファイル（.npz）
+        """
+        with self._lock:
+            if not self._size:
+                return
+            # 古い順に並べて保存する
+            order = np.roll(np.arange(self._size), -self._next)
+            order = order[self._expires_at[order] > time.time()]
+            try:
+                with open(path, "wb") as f:
+                    np.savez(
+                        f,
+                        vectors=self._vectors[order],
+                        expires_at=self._expires_at[order],
+                        scopes=np.array([self._scopes[i] for i in order], dtype=str),
+                        responses=np.array([self._responses[i] for i in order], dtype=str),
+                    )
+            except OSError as e:
+                logger.warning(f"セマンティックキャッシュの保存に失敗: {str(e)}")
+
+    def load(self, path: str) -> None:
+        """ファイルからエントリを読み込む（期限切れのものは除く）
+
+        Args:
+            path: 保存先のファイル（.npz）
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                vectors = data["vectors"]
+                expires_at = data["expires_at"]
+                scopes = data["scopes"].tolist()
+                responses = data["responses"].tolist()
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"セマンティックキャッシュの読み込みに失敗: {str(e)}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for vector, expires, scope, response in zip(vectors, expires_at, scopes, responses):
+                if expires > now:
+                    self._add_locked(vector, response, scope, float(expires))
+
+    def clear(self) -> None:
+        """キャッシュを全て削除"""
+        with self._lock:
+            self._vectors = None
+            self._expires_at = np.empty(0)
+            self._scopes = []
+            self._responses = []
+            self._rows_by_scope = {}
+            self._size = 0
+            self._next = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+
+# プロセス全体で共有するキャッシュ（LLMManager はノード実行ごとに生成されるため）
+_default_cache: Optional[LLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_llm_cache() -> LLMCache:
+    """プロセス共有のLLMキャッシュを取得"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = LLMCache()
+    return _default_cache
+
+
+# エクスポート
+__all__ = [
+    "CacheBackend",
+    "MemoryCacheBackend",
+    "RedisCacheBackend",
+    "SQLiteCacheBackend",
+    "LLMCache",
+    "CacheConfig",
+    "SemanticCache",
+    "get_default_llm_cache",
+]
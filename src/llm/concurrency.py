@@ -0,0 +1,309 @@
+"""LLM呼び出しの同時実行数制御
+
+プロセス内の同時実行数に加え、Redis を使って複数ワーカープロセス全体での
+同時実行数を制限し、組織単位のレート制限（429）に達しないようにする。
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from src.exceptions import RateLimitError
+
+try:
+    import redis
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# プロセス内の同時実行数の上限
+DEFAULT_INFLIGHT_LIMIT = 16
+# スロットの取得を諦めるまでの時間（秒）
+DEFAULT_ACQUIRE_TIMEOUT = 30.0
+# 全体カウンタの有効期限（秒）。ワーカーが異常終了しても減算漏れがこの時間で解消する
+DEFAULT_SLOT_TTL_SECONDS = 60
+# 全体の上限に達している場合の再試行間隔（秒）
+GLOBAL_POLL_INTERVAL = 0.05
+# 非同期呼び出しの同時実行数の上限
+DEFAULT_ASYNC_MAX_CONCURRENCY = 16
+
+
+class LLMConcurrencyLimiter:
+    """プロセス内・プロセス間の同時実行数を制限するリミッター"""
+
+    def __init__(
+        self,
+        inflight_limit: int = DEFAULT_INFLIGHT_LIMIT,
+        global_limit: Optional[int] = None,
+        redis_url: Optional[str] = None,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
+        slot_ttl_seconds: int = DEFAULT_SLOT_TTL_SECONDS,
+        key_prefix: str = "llm:inflight:",
+    ):
+        """
+        Args:
+            inflight_limit: プロセス内の同時実行数の上限
+            global_limit: 全プロセス合計の同時実行数の上限（None で無効）
+            redis_url: 全体の同時実行数を数える Redis の接続URL
+            acquire_timeout: スロットの取得を諦めるまでの時間（秒）
+            slot_ttl_seconds: 全体カウンタの有効期限（秒）
+            key_prefix: Redis のキーの接頭辞（後ろにプロバイダー名が付く）
+
+        Raises:
+            ImportError: global_limit を指定したが redis パッケージがない場合
+        """
+        self.inflight_limit = inflight_limit
+        self.global_limit = global_limit
+        self.acquire_timeout = acquire_timeout
+        self.slot_ttl_seconds = slot_ttl_seconds
+        self.key_prefix = key_prefix
+        self._local = threading.BoundedSemaphore(inflight_limit)
+
+        self._redis = None
+        if global_limit is not None:
+            if not REDIS_AVAILABLE:
+                raise ImportError("全体の同時実行数制限を使用するには redis パッケージが必要です")
+            self._redis = redis.Redis.from_url(redis_url or "redis://localhost:6379/0")
+
+    @contextmanager
+    def slot(self, provider: str) -> Iterator[None]:
+        """LLM呼び出し1回分のスロットを確保する
+
+        Args:
+            provider: プロバイダー名（全体の同時実行数はプロバイダーごとに数える）
+
+        Raises:
+            RateLimitError: acquire_timeout 以内にスロットを確保できなかった場合
+        """
+        requested_at = time.monotonic()
+        deadline = requested_at + self.acquire_timeout
+
+        if not self._local.acquire(timeout=self.acquire_timeout):
+            raise RateLimitError(f"{provider}: プロセス内の同時実行数の上限に達しています")
+
+        try:
+            global_acquired = self._acquire_global(provider, deadline)
+            started_at = time.monotonic()
+            try:
+                yield
+            finally:
+                if global_acquired:
+                    self._release_global(provider)
+                logger.debug(
+                    f"LLM call on {provider}: waited {started_at - requested_at:.3f}s, "
+                    f"took {time.monotonic() - started_at:.3f}s"
+                )
+        finally:
+            self._local.release()
+
+    def _acquire_global(self, provider: str, deadline: float) -> bool:
+        """全体のスロットを確保
+
+        Returns:
+            確保した場合は True（全体の制限が無効、または Redis 障害時は False）
+        """
+        if self._redis is None:
+            return False
+
+        key = self.key_prefix + provider
+        while True:
+            try:
+                count = self._redis.incr(key)
+                self._redis.expire(key, self.slot_ttl_seconds)
+                if count <= self.global_limit:
+                    return True
+                self._redis.decr(key)
+            except Exception as e:
+                # Redis 障害で生成自体を止めない（プロセス内の制限のみで続行）
+                logger.warning(f"全体の同時実行数の取得に失敗: {str(e)}")
+                return False
+
+            if time.monotonic() >= deadline:
+                raise RateLimitError(f"{provider}: 全体の同時実行数の上限に達しています")
+            time.sleep(GLOBAL_POLL_INTERVAL)
+
+    def _release_global(self, provider: str) -> None:
+        """全体のスロットを解放"""
+        try:
+            self._redis.decr(self.key_prefix + provider)
+        except Exception as e:
+            logger.warning(f"全体の同時実行数の解放に失敗: {str(e)}")
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限
+
+    rate（トークン/秒）で補充され、最大 capacity 個まで貯められる。
+    トークンは取得時に予約するため、同時に呼ばれても待ち時間が正しく積み上がる。
+    不足分は前借りとして残高をマイナスにするので、待っている呼び出し同士も順に間隔が空き、
+    同時に解放されて一斉に送信されることはない。
+    同期（スレッド）・非同期（asyncio）のどちらの呼び出し元からも使用できる。
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Args:
+            rate: 1秒あたりの補充トークン数
+            capacity: バケットの容量（連続で即時取得できる量）
+        """
+        if rate <= 0:
+            raise ValueError(f"rate は正の値である必要があります: {rate}")
+        if capacity < 1:
+            raise ValueError(f"capacity は1以上である必要があります: {capacity}")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: int) -> "TokenBucket":
+        """1分あたりの上限から、1分分まで貯められるバケットを作成"""
+        return cls(rate=limit / 60.0, capacity=limit)
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """トークンを予約し、使用可能になるまでの待ち時間（秒）を返す
+
+        Args:
+            amount: 予約するトークン数（容量を超える分は容量に切り詰める）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # 容量を超える要求でも満杯からの回復で送信できるようにする
+            self._tokens -= min(amount, self.capacity)
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """トークンを取得（必要な場合はスレッドをスリープ）"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """トークンを取得（必要な場合はイベントループをブロックせずに待機）"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AsyncRateLimiter:
+    """非同期の LLM 呼び出しの同時実行数・RPM・TPM を制限するリミッター
+
+    asyncio.gather で多数の地点を並行生成する際に、プロバイダーのレート制限（429）に
+    達しないよう送信を平滑化する。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_concurrency: 同時に実行する呼び出しの上限
+            requests_per_minute: 1分あたりのリクエスト数の上限（None で無制限）
+            tokens_per_minute: 1分あたりのトークン数の上限（None で無制限）
+        """
+        self.max_concurrency = max_concurrency
+        self._requests = (
+            TokenBucket.per_minute(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = TokenBucket.per_minute(tokens_per_minute) if tokens_per_minute else None
+        # asyncio.Semaphore はイベントループに紐づくため、ループごとに作成する
+        self._semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """LLM呼び出し1回分のスロットを確保する
+
+        Args:
+            tokens: 呼び出しで消費する見込みのトークン数（プロンプト + 最大出力）
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+
+        async with semaphore:
+            delay = 0.0
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1))
+            if self._tokens is not None and tokens:
+                delay = max(delay, self._tokens.reserve(tokens))
+            if delay > 0:
+                logger.debug(f"Rate limit reached, delaying LLM call by {delay:.2f}s")
+                await asyncio.sleep(delay)
+            yield
+
+
+# プロセス全体で共有するリミッター
+_default_limiter: Optional[LLMConcurrencyLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_llm_limiter() -> LLMConcurrencyLimiter:
+    """プロセス共有のリミッターを取得
+
+    環境変数 LLM_INFLIGHT_LIMIT・LLM_GLOBAL_LIMIT・LLM_LIMITER_REDIS_URL で設定する。
+    """
+    global _default_limiter
+    if _default_limiter is None:
+        with _default_limiter_lock:
+            if _default_limiter is None:
+                global_limit = os.getenv("LLM_GLOBAL_LIMIT")
+                _default_limiter = LLMConcurrencyLimiter(
+                    inflight_limit=int(os.getenv("LLM_INFLIGHT_LIMIT", DEFAULT_INFLIGHT_LIMIT)),
+                    global_limit=int(global_limit) if global_limit else None,
+                    redis_url=os.getenv("LLM_LIMITER_REDIS_URL"),
+                )
+    return _default_limiter
+
+
+_default_async_limiter: Optional[AsyncRateLimiter] = None
+
+
+def get_default_async_rate_limiter() -> AsyncRateLimiter:
+    """プロセス共有の非同期リミッターを取得
+
+    環境変数 LLM_ASYNC_MAX_CONCURRENCY・LLM_RPM_LIMIT・LLM_TPM_LIMIT で設定する。
+    """
+    global _default_async_limiter
+    if _default_async_limiter is None:
+        with _default_limiter_lock:
+            if _default_async_limiter is None:
+                rpm = os.getenv("LLM_RPM_LIMIT")
+                tpm = os.getenv("LLM_TPM_LIMIT")
+                _default_async_limiter = AsyncRateLimiter(
+                    max_concurrency=int(
+                        os.getenv("LLM_ASYNC_MAX_CONCURRENCY", DEFAULT_ASYNC_MAX_CONCURRENCY)
+                    ),
+                    requests_per_minute=int(rpm) if rpm else None,
+                    tokens_per_minute=int(tpm) if tpm else None,
+                )
+    return _default_async_limiter
+
+
+# エクスポート
+__all__ = [
+    "TokenBucket",
+    "LLMConcurrencyLimiter",
+    "AsyncRateLimiter",
+    "get_default_llm_limiter",
+    "get_default_async_rate_limiter",
+]
@@ -5,31 +5,103 @@ LLMクライアント - マルチプロバイダー対応のLLMクライアン
 統一インターフェースでのLLMクライアントを提供します。
 """
 
+import asyncio
+import functools
+import inspect
 import os
 import logging
+import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+from typing import Callable, Dict, Any, Optional, List
+from dataclasses import dataclass, field
 import json
 
+import requests
+from openai import OpenAI
+from requests.adapters import HTTPAdapter
+
+from src.llm.concurrency import TokenBucket
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# レスポンスから除去する制御文字
+_STRIP_TABLE = str.maketrans("", "", "\n\r\t")
+
+# HTTP コネクションプールの設定
+HTTP_POOL_CONNECTIONS = 20
+HTTP_POOL_MAXSIZE = 100
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class LLMConfig:
-    """LLM設定データクラス"""
+    """LLM設定データクラス
+
+    変更不可のためクライアント間で共有でき、ハッシュ可能なのでキャッシュのキーにも使える
+    （additional_params はハッシュ計算の対象外）。
+    """
 
     model: str
     temperature: float = 0.7
     max_tokens: int = 50
     timeout: int = 30
     api_key: Optional[str] = None
-    additional_params: Dict[str, Any] = None
+    additional_params: Dict[str, Any] = field(default_factory=dict, hash=False)
+
+
+def _dumps_json(data: Any) -> bytes:
+    """リクエストボディを JSON にシリアライズ（orjson が利用可能な場合はそちらを使用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+# リクエストボディ中のプロンプトの位置を示す値（実際のプロンプトには現れない）
+_PROMPT_PLACEHOLDER = "\x00prompt\x00"
+
+
+def _compile_json_body(data: Dict[str, Any]) -> Callable[[str], bytes]:
+    """プロンプト以外が固定のリクエストボディを事前にシリアライズ
+
+    Args:
+        data: プロンプトの位置に _PROMPT_PLACEHOLDER を置いたリクエストボディ
+
+    Returns:
+        プロンプトを受け取り、シリアライズ済みの固定部分と連結したボディを返す関数
+    """
+    prefix, suffix = _dumps_json(data).split(_dumps_json(_PROMPT_PLACEHOLDER), 1)
+
+    def render(prompt: str) -> bytes:
+        return b"".join((prefix, _dumps_json(prompt), suffix))
+
+    return render
 
-    def __post_init__(self):
-        if self.additional_params is None:
-            self.additional_params = {}
+
+def _loads_json(content: bytes) -> Dict[str, Any]:
+    """レスポンスボディの JSON をパース（orjson が利用可能な場合はそちらを使用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _create_http_session() -> requests.Session:
+    """コネクションを再利用する HTTP セッションを作成
+
+    リクエストごとに TCP/TLS 接続を確立し直さないよう、keep-alive の
+    コネクションプールを持つセッションをクライアント単位で使い回す。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 class LLMClient(ABC):
@@ -62,18 +134,20 @@ class LLMClient(ABC):
         # 15文字制限チェック
         if len(response_text) > 15:
             logger.warning(f"生成コメントが15文字を超過: {len(response_text)}文字")
-            # 最初の15文字を取得
-            response_text = response_text[:15]
 
-        # 改行文字除去
-        response_text = response_text.replace("\n", "").replace("\r", "")
-
-        return response_text.strip()
+        # 最初の15文字を取得し、改行・タブ文字を1パスで除去
+        return response_text[:15].translate(_STRIP_TABLE).strip()
 
 
 class OpenAIClient(LLMClient):
     """OpenAI GPT クライアント"""
 
+    def __init__(self, config: LLMConfig):
+        super().__init__(config)
+        # モジュールのグローバル状態（openai.api_key）を書き換えずに済むよう
+        # クライアントインスタンスを保持する
+        self._client = OpenAI(api_key=self.api_key, timeout=config.timeout)
+
     def _get_api_key(self) -> str:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -84,25 +158,20 @@ class OpenAIClient(LLMClient):
         """OpenAI APIでコメント生成"""
         try:
             response = self._make_api_request(prompt)
-            generated_text = response["choices"][0]["message"]["content"]
+            generated_text = response.choices[0].message.content
             return self._validate_response(generated_text)
         except Exception as e:
             logger.error(f"OpenAI API エラー: {str(e)}")
             raise
 
-    def _make_api_request(self, prompt: str) -> Dict[str, Any]:
+    def _make_api_request(self, prompt: str) -> Any:
         """OpenAI API リクエスト"""
-        import openai
-
-        openai.api_key = self.api_key
-
         try:
-            response = openai.ChatCompletion.create(
+            response = self._client.chat.completions.create(
                 model=self.config.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=self.config.temperature,
                 max_tokens=self.config.max_tokens,
-                timeout=self.config.timeout,
             )
             return response
         except Exception as e:
@@ -113,6 +182,26 @@ class OpenAIClient(LLMClient):
 class GeminiClient(LLMClient):
     """Google Gemini クライアント"""
 
+    def __init__(self, config: LLMConfig):
+        super().__init__(config)
+        self._session = _create_http_session()
+        # 設定は変更不可なので、リクエストごとに変わらない値は先に組み立てておく
+        self._url = (
+            "https://generativelanguage.googleapis.com/v1beta/models/"
+            f"{config.model}:generateContent"
+        )
+        self._headers = {"Content-Type": "application/json"}
+        self._params = {"key": self.api_key}
+        self._render_body = _compile_json_body(
+            {
+                "contents": [{"parts": [{"text": _PROMPT_PLACEHOLDER}]}],
+                "generationConfig": {
+                    "temperature": config.temperature,
+                    "maxOutputTokens": config.max_tokens,
+                },
+            }
+        )
+
     def _get_api_key(self) -> str:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -131,31 +220,16 @@ class GeminiClient(LLMClient):
 
     def _make_api_request(self, prompt: str) -> Dict[str, Any]:
         """Gemini API リクエスト"""
-        import requests
-
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.config.model}:generateContent"
-        headers = {
-            "Content-Type": "application/json",
-        }
-
-        data = {
-            "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {
-                "temperature": self.config.temperature,
-                "maxOutputTokens": self.config.max_tokens,
-            },
-        }
-
         try:
-            response = requests.post(
-                url,
-                headers=headers,
-                json=data,
-                params={"key": self.api_key},
+            response = self._session.post(
+                self._url,
+                headers=self._headers,
+                data=self._render_body(prompt),
+                params=self._params,
                 timeout=self.config.timeout,
             )
             response.raise_for_status()
-            return response.json()
+            return _loads_json(response.content)
         except Exception as e:
             logger.error(f"Gemini API リクエストエラー: {str(e)}")
             raise
@@ -164,6 +238,26 @@ class GeminiClient(LLMClient):
 class AnthropicClient(LLMClient):
     """Anthropic Claude クライアント"""
 
+    API_URL = "https://api.anthropic.com/v1/messages"
+    API_VERSION = "2023-06-01"
+
+    def __init__(self, config: LLMConfig):
+        super().__init__(config)
+        self._session = _create_http_session()
+        self._headers = {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "anthropic-version": self.API_VERSION,
+        }
+        self._render_body = _compile_json_body(
+            {
+                "model": config.model,
+                "max_tokens": config.max_tokens,
+                "temperature": config.temperature,
+                "messages": [{"role": "user", "content": _PROMPT_PLACEHOLDER}],
+            }
+        )
+
     def _get_api_key(self) -> str:
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
@@ -182,26 +276,15 @@ class AnthropicClient(LLMClient):
 
     def _make_api_request(self, prompt: str) -> Dict[str, Any]:
         """Anthropic API リクエスト"""
-        import requests
-
-        url = "https://api.anthropic.com/v1/messages"
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": self.api_key,
-            "anthropic-version": "2023-06-01",
-        }
-
-        data = {
-            "model": self.config.model,
-            "max_tokens": self.config.max_tokens,
-            "temperature": self.config.temperature,
-            "messages": [{"role": "user", "content": prompt}],
-        }
-
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=self.config.timeout)
+            response = self._session.post(
+                self.API_URL,
+                headers=self._headers,
+                data=self._render_body(prompt),
+                timeout=self.config.timeout,
+            )
             response.raise_for_status()
-            return response.json()
+            return _loads_json(response.content)
         except Exception as e:
             logger.error(f"Anthropic API リクエストエラー: {str(e)}")
             raise
@@ -269,24 +352,69 @@ def create_test_client(provider: str = "openai") -> LLMClient:
     return LLMClientFactory.create_client(provider)
 
 
+# プロバイダーごとのデフォルトのレート制限（リクエスト/分）
+DEFAULT_RATE_LIMITS = {
+    "openai": 3500,
+    "gemini": 60,
+    "anthropic": 50,
+}
+
+
+# プロバイダー単位で共有するトークンバケット
+_rate_limit_buckets: Dict[str, TokenBucket] = {}
+_rate_limit_buckets_lock = threading.Lock()
+
+
+def get_rate_limit_bucket(provider: str, calls_per_minute: Optional[int] = None) -> TokenBucket:
+    """プロバイダー共有のトークンバケットを取得（なければ作成）
+
+    Args:
+        provider: プロバイダー名
+        calls_per_minute: 1分あたりの呼び出し上限（省略時は DEFAULT_RATE_LIMITS）
+
+    Returns:
+        TokenBucket: プロバイダーのトークンバケット
+    """
+    with _rate_limit_buckets_lock:
+        bucket = _rate_limit_buckets.get(provider)
+        if bucket is None:
+            rpm = calls_per_minute or DEFAULT_RATE_LIMITS.get(provider, 60)
+            bucket = TokenBucket(rate=rpm / 60.0)
+            _rate_limit_buckets[provider] = bucket
+        return bucket
+
+
 # レート制限対応の装飾子
-def rate_limit(calls_per_minute: int = 60):
-    """レート制限装飾子"""
+def rate_limit(calls_per_minute: Optional[int] = None, provider: Optional[str] = None):
+    """レート制限装飾子
+
+    同期関数・コルーチン関数のどちらにも適用できる。provider を指定した場合は
+    同じプロバイダーを指定した全ての関数で1つのトークンバケットを共有する。
+
+    Args:
+        calls_per_minute: 1分あたりの呼び出し上限
+        provider: レート制限を共有するプロバイダー名
+    """
 
     def decorator(func):
-        last_called = [0.0]
+        if provider is not None:
+            bucket = get_rate_limit_bucket(provider, calls_per_minute)
+        else:
+            bucket = TokenBucket(rate=(calls_per_minute or 60) / 60.0)
 
-        def wrapper(*args, **kwargs):
-            elapsed = time.time() - last_called[0]
-            min_interval = 60.0 / calls_per_minute
+        if inspect.iscoroutinefunction(func):
 
-            if elapsed < min_interval:
-                sleep_time = min_interval - elapsed
-                time.sleep(sleep_time)
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await bucket.acquire_async()
+                return await func(*args, **kwargs)
 
-            result = func(*args, **kwargs)
-            last_called[0] = time.time()
-            return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bucket.acquire()
+            return func(*args, **kwargs)
 
         return wrapper
 
@@ -3,47 +3,184 @@
 複数のLLMプロバイダーを統一的に管理するマネージャークラス。
 """
 
+import asyncio
+import functools
+import importlib
 import os
-from typing import Dict, Any, Optional, List
+import sys
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Deque, Dict, Any, Optional, List, Tuple, Type, Union
 import logging
 
 from src.data.weather_data import WeatherForecast
 from src.data.comment_pair import CommentPair
-from src.llm.providers.base_provider import LLMProvider
-from src.llm.providers.openai_provider import OpenAIProvider
-from src.llm.providers.gemini_provider import GeminiProvider
-from src.llm.providers.anthropic_provider import AnthropicProvider
+from src.llm.cache import LLMCache, get_default_llm_cache
+from src.llm.concurrency import (
+    LLMConcurrencyLimiter,
+    get_default_async_rate_limiter,
+    get_default_llm_limiter,
+)
+from src.llm.providers.base_provider import (
+    BULK_MAX_TOKENS_PER_PROMPT,
+    DEFAULT_COMMENT_TEMPERATURE,
+    LLMProvider,
+    request_deadline,
+)
 
 logger = logging.getLogger(__name__)
 
+# 一括生成時の同時実行数の上限
+DEFAULT_MAX_CONCURRENCY = 8
+
+# 1リクエストあたりのタイムアウト（秒）の上限
+DEFAULT_REQUEST_TIMEOUT = 30.0
+# 適応的タイムアウトの下限（秒）と、p99 に掛ける係数
+MIN_ADAPTIVE_TIMEOUT = 5.0
+ADAPTIVE_TIMEOUT_FACTOR = 1.2
+# 適応的タイムアウトを使い始めるまでに必要なレイテンシのサンプル数
+MIN_LATENCY_SAMPLES = 20
+# プロバイダーごとに保持するレイテンシのサンプル数
+LATENCY_WINDOW = 100
+
+# プロバイダー名 -> (モジュール, クラス名)
+# SDK の読み込みは重いため、使用するプロバイダーのモジュールだけを初期化時に読み込む
+_PROVIDER_CLASSES = {
+    "openai": ("src.llm.providers.openai_provider", "OpenAIProvider"),
+    "gemini": ("src.llm.providers.gemini_provider", "GeminiProvider"),
+    "anthropic": ("src.llm.providers.anthropic_provider", "AnthropicProvider"),
+}
+
+# 次のプロバイダーにフェイルオーバーする例外（タイムアウト・通信エラー）
+# SDK 固有の例外は、その SDK が読み込み済みの場合だけ対象にする
+_FAILOVER_EXCEPTION_NAMES = {
+    "httpx": ("TimeoutException", "NetworkError"),
+    "requests.exceptions": ("Timeout", "ConnectionError"),
+    "openai": ("APIConnectionError",),
+    "anthropic": ("APIConnectionError",),
+}
+
+# タイムアウト付きで API を呼び出すためのスレッドプール（全マネージャーで共有）
+_request_executor: Optional[ThreadPoolExecutor] = None
+_request_executor_lock = threading.Lock()
+
+# コメントを切り詰める際の自然な区切り（句読点や助詞）
+_NATURAL_BREAK_RE = re.compile("。|、|です|ます|ね|よ|を|に|で|は|が")
+
+
+def _get_request_executor() -> ThreadPoolExecutor:
+    """API 呼び出し用の共有スレッドプールを取得"""
+    global _request_executor
+    if _request_executor is None:
+        with _request_executor_lock:
+            if _request_executor is None:
+                _request_executor = ThreadPoolExecutor(
+                    max_workers=32, thread_name_prefix="llm-request"
+                )
+    return _request_executor
+
+
+def _load_provider_class(provider_name: str) -> Type[LLMProvider]:
+    """プロバイダーのクラスを読み込む（初回のみモジュールを import）"""
+    module_name, class_name = _PROVIDER_CLASSES[provider_name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _get_failover_exceptions() -> Tuple[Type[BaseException], ...]:
+    """フェイルオーバー対象の例外クラスを取得"""
+    exceptions: List[Type[BaseException]] = [TimeoutError, ConnectionError]
+    for module_name, names in _FAILOVER_EXCEPTION_NAMES.items():
+        module = sys.modules.get(module_name)
+        if module is not None:
+            exceptions.extend(getattr(module, name) for name in names)
+    return tuple(exceptions)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_dummy_weather() -> WeatherForecast:
+    """generate を持たないプロバイダー向けのダミー天気予報（1度だけ生成）"""
+    from src.data.weather_data import WeatherCondition, WindDirection
+
+    return WeatherForecast(
+        location="",
+        datetime=datetime(2000, 1, 1),
+        temperature=20.0,
+        weather_code="100",
+        weather_condition=WeatherCondition.CLEAR,
+        weather_description="晴れ",
+        precipitation=0.0,
+        humidity=50.0,
+        wind_speed=0.0,
+        wind_direction=WindDirection.CALM,
+        wind_direction_degrees=0,
+        confidence=1.0,
+    )
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """ソート済みの値から q（0〜1）分位点を取得"""
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
 
 class LLMManager:
     """LLMプロバイダーを管理するマネージャークラス"""
 
-    def __init__(self, provider: str = "openai"):
+    def __init__(
+        self,
+        provider: str = "openai",
+        cache: Optional[LLMCache] = None,
+        use_cache: bool = True,
+        fallback_providers: Optional[List[str]] = None,
+        request_timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+        limiter: Optional[LLMConcurrencyLimiter] = None,
+    ):
         """
         LLMマネージャーの初期化。
 
         Args:
             provider: 使用するプロバイダー名 ("openai", "gemini", "anthropic")
+            cache: 生成結果のキャッシュ（省略時はプロセス共有のキャッシュ）
+            use_cache: キャッシュを使用するか
+            fallback_providers: タイムアウト・通信エラー時に順に試すプロバイダー名
+            request_timeout: 1リクエストあたりのタイムアウト（秒）の上限（None で無制限）
+            limiter: 同時実行数のリミッター（省略時はプロセス共有のリミッター）
         """
         self.provider_name = provider
         self.provider = self._initialize_provider(provider)
-
-    def _initialize_provider(self, provider_name: str) -> LLMProvider:
-        """プロバイダーを初期化"""
-        providers = {
+        self._has_generate = hasattr(self.provider, "generate")
+        self.cache = (cache or get_default_llm_cache()) if use_cache else None
+        self.fallback_providers = list(fallback_providers or [])
+        self.request_timeout = request_timeout
+        self.limiter = limiter or get_default_llm_limiter()
+        self._latencies: Dict[str, Deque[float]] = {}
+
+        # 他のプロバイダーは切り替え・フェイルオーバーで初めて使うときに初期化し、
+        # 以降は再初期化（接続プールの破棄）せずに使い回す
+        self._providers: Dict[str, LLMProvider] = {provider: self.provider}
+
+    def _provider_initializers(self) -> Dict[str, Callable[[], LLMProvider]]:
+        """プロバイダー名と初期化メソッドの対応"""
+        return {
             "openai": self._init_openai,
             "gemini": self._init_gemini,
             "anthropic": self._init_anthropic,
         }
 
+    def _initialize_provider(self, provider_name: str) -> LLMProvider:
+        """プロバイダーを初期化"""
+        providers = self._provider_initializers()
+
         if provider_name not in providers:
             raise ValueError(f"Unknown provider: {provider_name}")
 
         return providers[provider_name]()
 
-    def _init_openai(self) -> OpenAIProvider:
+    def _init_openai(self) -> LLMProvider:
         """OpenAIプロバイダーを初期化"""
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
@@ -56,9 +193,11 @@ class LLMManager:
         logger.info(f"Using OpenAI API key: {api_key[:20]}...")
 
         model = os.getenv("OPENAI_MODEL", "gpt-4")
-        return OpenAIProvider(api_key=api_key, model=model)
+        return _load_provider_class("openai")(
+            api_key=api_key, model=model, rate_limiter=get_default_async_rate_limiter()
+        )
 
-    def _init_gemini(self) -> GeminiProvider:
+    def _init_gemini(self) -> LLMProvider:
         """Geminiプロバイダーを初期化"""
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -68,9 +207,9 @@ class LLMManager:
             )
 
         model = os.getenv("GEMINI_MODEL", "gemini-pro")
-        return GeminiProvider(api_key=api_key, model=model)
+        return _load_provider_class("gemini")(api_key=api_key, model=model)
 
-    def _init_anthropic(self) -> AnthropicProvider:
+    def _init_anthropic(self) -> LLMProvider:
         """Anthropicプロバイダーを初期化"""
         api_key = os.getenv("ANTHROPIC_API_KEY")
         if not api_key:
@@ -80,14 +219,18 @@ class LLMManager:
             )
 
         model = os.getenv("ANTHROPIC_MODEL", "claude-3-opus-20240229")
-        return AnthropicProvider(api_key=api_key, model=model)
+        return _load_provider_class("anthropic")(api_key=api_key, model=model)
 
-    def generate(self, prompt: str) -> str:
+    def generate(
+        self, prompt: str, max_tokens: Optional[int] = None, stop: Optional[List[str]] = None
+    ) -> str:
         """
         汎用的なテキスト生成を行う。
 
         Args:
             prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数（None の場合はプロバイダーのデフォルト）
+            stop: 生成を止める文字列のリスト
 
         Returns:
             生成されたテキスト
@@ -96,42 +239,44 @@ class LLMManager:
             logger.info(f"Generating text using {self.provider_name}")
 
             # プロバイダーの汎用生成メソッドを呼び出す
-            if hasattr(self.provider, "generate"):
-                return self.provider.generate(prompt)
+            if self._has_generate:
+                options: Dict[str, Any] = {}
+                if max_tokens is not None:
+                    options["max_tokens"] = max_tokens
+                if stop:
+                    options["stop"] = stop
+                return self.provider.generate(prompt, **options)
             else:
                 # generateメソッドがない場合は、generate_commentを使う
-                # ダミーのweather_dataとpast_commentsを作成
-                from src.data.weather_data import WeatherForecast, WeatherCondition
-                from datetime import datetime
-
-                dummy_weather = WeatherForecast(
-                    datetime=datetime.now(),
-                    weather_condition=WeatherCondition.CLEAR,
-                    weather_code=100,
-                    weather_description="晴れ",
-                    temperature=20.0,
-                    feels_like=20.0,
-                    humidity=50.0,
-                    pressure=1013.0,
-                    wind_speed=0.0,
-                    wind_direction=0,
-                    precipitation=0.0,
-                    cloud_cover=0,
-                    visibility=10.0,
-                    confidence=1.0,
-                )
-
                 # プロンプトをそのまま使用
                 constraints = {"custom_prompt": prompt}
 
                 return self.provider.generate_comment(
-                    weather_data=dummy_weather, past_comments=None, constraints=constraints
+                    weather_data=_get_dummy_weather(), past_comments=None, constraints=constraints
                 )
 
         except Exception as e:
             logger.error(f"Error generating text: {str(e)}")
             raise
 
+    def generate_bulk(self, prompts: List[str]) -> List[str]:
+        """
+        複数のプロンプトで汎用的なテキスト生成を行う。
+
+        プロバイダーが一括生成に対応している場合は1回のAPI呼び出しにまとめる。
+
+        Args:
+            prompts: プロンプト文字列のリスト
+
+        Returns:
+            prompts と同じ順序の生成テキスト
+        """
+        if hasattr(self.provider, "generate_bulk"):
+            logger.info(f"Generating {len(prompts)} texts in bulk using {self.provider_name}")
+            return self.provider.generate_bulk(prompts)
+
+        return [self.generate(prompt, max_tokens=BULK_MAX_TOKENS_PER_PROMPT) for prompt in prompts]
+
     def generate_comment(
         self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
     ) -> str:
@@ -147,11 +292,17 @@ class LLMManager:
             生成されたコメント
         """
         try:
-            logger.info(f"Generating comment using {self.provider_name}")
-
-            # プロバイダーを使用してコメント生成
-            comment = self.provider.generate_comment(
-                weather_data=weather_data, past_comments=past_comments, constraints=constraints
+            # 同一入力の生成結果がキャッシュにあれば API を呼ばずに返す
+            cache_key = self._comment_cache_key(weather_data, past_comments, constraints)
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Using cached comment for {self.provider_name}")
+                    return cached
+
+            # プロバイダーを使用してコメント生成（タイムアウト時は次のプロバイダーへ）
+            provider_name, comment = self._generate_with_failover(
+                weather_data, past_comments, constraints
             )
 
             # コメント長の検証と調整
@@ -164,36 +315,351 @@ class LLMManager:
                 comment = self._truncate_naturally(comment, max_length)
                 logger.info(f"Truncated comment to: {comment}")
 
+            # キーはプライマリのプロバイダー・モデルで作っているため、
+            # フォールバック先の生成結果は保存しない
+            if cache_key is not None and provider_name == self.provider_name:
+                self.cache.set(cache_key, comment)
+
             return comment
 
         except Exception as e:
             logger.error(f"Error generating comment: {str(e)}")
             raise
 
+    def generate_comment_from_prompt(
+        self, prompt: str, constraints: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        構築済みのプロンプトから天気コメントを生成する。
+
+        CommentPromptBuilder などで組み立てたプロンプトを、プロバイダー側で
+        テンプレートから再度組み立てずにそのまま使う。
+
+        Args:
+            prompt: 構築済みのプロンプト
+            constraints: 制約条件（max_length, temperature等）
+
+        Returns:
+            生成されたコメント
+        """
+        constraints = constraints or {}
+        try:
+            comment = self._call_with_timeout(
+                self.provider_name,
+                functools.partial(self.provider.generate_comment_from_prompt, prompt, constraints),
+            )
+
+            max_length = constraints.get("max_length", 15)
+            if len(comment) > max_length:
+                comment = self._truncate_naturally(comment, max_length)
+            return comment
+
+        except Exception as e:
+            logger.error(f"Error generating comment from prompt: {str(e)}")
+            raise
+
+    def _generate_with_failover(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> Tuple[str, str]:
+        """現在のプロバイダーから順にフォールバック先を試してコメントを生成
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            (生成に使用したプロバイダー名, 生成されたコメント)
+
+        Raises:
+            Exception: 全てのプロバイダーで失敗した場合は最後のエラー
+        """
+        provider_names = [self.provider_name] + [
+            name for name in self.fallback_providers if name != self.provider_name
+        ]
+        for index, provider_name in enumerate(provider_names):
+            is_last = index == len(provider_names) - 1
+            try:
+                provider = self._get_provider(provider_name)
+            except ValueError as e:
+                # APIキー未設定などで使えないフォールバック先は飛ばす
+                if is_last:
+                    raise
+                logger.warning(f"Skipping provider {provider_name}: {str(e)}")
+                continue
+
+            logger.info(f"Generating comment using {provider_name}")
+            try:
+                comment = self._call_with_timeout(
+                    provider_name,
+                    functools.partial(
+                        provider.generate_comment,
+                        weather_data=weather_data,
+                        past_comments=past_comments,
+                        constraints=constraints,
+                    ),
+                )
+                return provider_name, comment
+            except _get_failover_exceptions() as e:
+                if is_last:
+                    raise
+                logger.warning(
+                    f"{provider_name} failed ({type(e).__name__}: {str(e)}), "
+                    f"falling back to {provider_names[index + 1]}"
+                )
+
+        # provider_names は空にならないため到達しない
+        raise RuntimeError("No provider available")
+
+    def _get_provider(self, provider_name: str) -> LLMProvider:
+        """プロバイダー名に対応するインスタンスを取得（未初期化なら初期化）"""
+        provider = self._providers.get(provider_name)
+        if provider is None:
+            provider = self._initialize_provider(provider_name)
+            self._providers[provider_name] = provider
+        return provider
+
+    def _call_with_timeout(self, provider_name: str, func: functools.partial) -> str:
+        """同時実行数の枠内・タイムアウト付きでプロバイダーを呼び出し、レイテンシを記録
+
+        Args:
+            provider_name: プロバイダー名
+            func: 呼び出す関数
+
+        Returns:
+            生成されたテキスト
+
+        Raises:
+            TimeoutError: タイムアウトした場合
+            RateLimitError: 同時実行数の枠を確保できなかった場合
+        """
+        latencies = self._latencies.setdefault(provider_name, deque(maxlen=LATENCY_WINDOW))
+
+        # 枠は呼び出し元のスレッドで確保し、確保してからタイムアウトを数え始める
+        # （枠待ちをプロバイダーの遅延とみなしてフェイルオーバーしないように）
+        slot = ExitStack()
+        slot.enter_context(self.limiter.slot(provider_name))
+
+        timeout = self.get_request_timeout(provider_name)
+        # プロバイダー側の再試行もこの期限を超えて続けない
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def run() -> str:
+            # 枠は実際の API 呼び出しが終わるまで保持し、枠待ちの時間はレイテンシに含めない
+            with slot, request_deadline(deadline):
+                start = time.monotonic()
+                try:
+                    return func()
+                finally:
+                    latencies.append(time.monotonic() - start)
+
+        if timeout is None:
+            return run()
+
+        try:
+            future = _get_request_executor().submit(run)
+        except BaseException:
+            slot.close()
+            raise
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 実行中のリクエストは中断できないため結果を待たずに切り捨てる。
+            # 実行前に取り消せた場合は run() が呼ばれないので、ここで枠を返す
+            if future.cancel():
+                slot.close()
+            raise TimeoutError(f"{provider_name} did not respond within {timeout:.1f}s")
+
+    def get_request_timeout(self, provider_name: str) -> Optional[float]:
+        """プロバイダーのタイムアウト（秒）を取得
+
+        十分なサンプルがある場合は直近のレイテンシの p99 に余裕を持たせた値を使い、
+        request_timeout を上限とする。
+
+        Args:
+            provider_name: プロバイダー名
+
+        Returns:
+            タイムアウト（秒）。request_timeout が None の場合は None
+        """
+        if self.request_timeout is None:
+            return None
+
+        latencies = self._latencies.get(provider_name)
+        if not latencies or len(latencies) < MIN_LATENCY_SAMPLES:
+            return self.request_timeout
+
+        p99 = _percentile(sorted(latencies), 0.99)
+        adaptive = max(MIN_ADAPTIVE_TIMEOUT, p99 * ADAPTIVE_TIMEOUT_FACTOR)
+        return min(self.request_timeout, adaptive)
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """プロバイダーごとの直近のレイテンシ統計を取得
+
+        Returns:
+            プロバイダー名 -> {"count", "p50", "p99"} の辞書
+        """
+        stats = {}
+        for provider_name, latencies in self._latencies.items():
+            values = sorted(latencies)
+            if not values:
+                continue
+            stats[provider_name] = {
+                "count": len(values),
+                "p50": _percentile(values, 0.5),
+                "p99": _percentile(values, 0.99),
+            }
+        return stats
+
+    async def agenerate(
+        self, prompt: str, max_tokens: Optional[int] = None, stop: Optional[List[str]] = None
+    ) -> str:
+        """
+        汎用的なテキスト生成を非同期で行う。
+
+        generate() をスレッドプールで実行し、イベントループをブロックしないようにする。
+
+        Args:
+            prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数（None の場合はプロバイダーのデフォルト）
+            stop: 生成を止める文字列のリスト
+
+        Returns:
+            生成されたテキスト
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.generate, prompt, max_tokens=max_tokens, stop=stop)
+        )
+
+    async def agenerate_comment(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        """
+        天気コメントを非同期で生成する。
+
+        プロバイダーの SDK は同期 API のため、スレッドプールで実行してイベントループを
+        ブロックしないようにする。
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            生成されたコメント
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                self.generate_comment,
+                weather_data=weather_data,
+                past_comments=past_comments,
+                constraints=constraints,
+            ),
+        )
+
+    async def agenerate_batch(
+        self, items: List[Dict[str, Any]], max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> List[Union[str, BaseException]]:
+        """
+        複数のコメントを並行して生成する。
+
+        Args:
+            items: generate_comment の引数（weather_data, past_comments, constraints）の辞書のリスト
+            max_concurrency: 同時に実行する API 呼び出しの上限
+
+        Returns:
+            items と同じ順序の生成結果（失敗した要素は例外オブジェクト）
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(item: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.agenerate_comment(**item)
+
+        return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+    def generate_comment_batch(
+        self, items: List[Dict[str, Any]], max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> List[Union[str, BaseException]]:
+        """
+        複数のコメントを並行して生成する（同期版）。
+
+        実行中のイベントループ内からは agenerate_batch を使用すること。
+
+        Args:
+            items: generate_comment の引数（weather_data, past_comments, constraints）の辞書のリスト
+            max_concurrency: 同時に実行する API 呼び出しの上限
+
+        Returns:
+            items と同じ順序の生成結果（失敗した要素は例外オブジェクト）
+        """
+        return asyncio.run(self.agenerate_batch(items, max_concurrency))
+
+    def _comment_cache_key(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> Optional[str]:
+        """コメント生成結果のキャッシュキーを生成
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            キャッシュキー（キャッシュ対象外の場合はNone）
+        """
+        if self.cache is None:
+            return None
+
+        # プロンプトの生成に使われる値だけをキーに含める
+        weather_comment = getattr(past_comments, "weather_comment", None)
+        advice_comment = getattr(past_comments, "advice_comment", None)
+        payload = {
+            "location": weather_data.location,
+            "weather_description": weather_data.weather_description,
+            "temperature": weather_data.temperature,
+            "weather_comment": getattr(weather_comment, "comment_text", None),
+            "advice_comment": getattr(advice_comment, "comment_text", None),
+            "constraints": constraints,
+        }
+        return self.cache.cache_key(
+            self.provider_name,
+            self._get_model_name(),
+            constraints.get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+            payload,
+        )
+
+    def _get_model_name(self) -> str:
+        """現在のプロバイダーのモデル名を取得"""
+        model_name = getattr(self.provider, "model_name", None) or getattr(
+            self.provider, "model", ""
+        )
+        return model_name if isinstance(model_name, str) else ""
+
     def switch_provider(self, provider_name: str):
-        """プロバイダーを切り替える"""
+        """プロバイダーを切り替える（初期化済みのインスタンスを再利用）"""
         logger.info(f"Switching provider from {self.provider_name} to {provider_name}")
+        self.provider = self._get_provider(provider_name)
+        self._has_generate = hasattr(self.provider, "generate")
         self.provider_name = provider_name
-        self.provider = self._initialize_provider(provider_name)
 
     def _truncate_naturally(self, text: str, max_length: int) -> str:
         """コメントを自然な位置で切り詰める"""
         if len(text) <= max_length:
             return text
 
-        # 句読点や助詞の位置を探す
-        natural_breaks = ["。", "、", "です", "ます", "ね", "よ", "を", "に", "で", "は", "が"]
-
         # max_length以内で最も後ろにある自然な区切り位置を探す
-        best_pos = max_length
-        for i in range(max_length, 0, -1):
-            for break_str in natural_breaks:
-                # 区切り文字列の開始位置を確認
-                if i + len(break_str) <= len(text):
-                    if text[i : i + len(break_str)] == break_str:
-                        # 区切り文字列の後で切る
-                        best_pos = i + len(break_str)
-                        return text[:best_pos]
+        # （endpos を max_length にすることで区切り文字列ごと max_length 以内に収まるものに限る）
+        best_pos = None
+        for match in _NATURAL_BREAK_RE.finditer(text, 1, max_length):
+            best_pos = match.end()
+
+        if best_pos is not None:
+            # 区切り文字列の後で切る
+            return text[:best_pos]
 
         # 自然な区切りが見つからない場合は単純に切り詰め
         return text[:max_length]
@@ -5,22 +5,156 @@
 効果的な天気コメント生成用プロンプトを構築します。
 """
 
+import functools
 import logging
-from typing import List, Optional, Dict, Any
+import re
+import time
+from collections import OrderedDict
+from operator import attrgetter
+from string import Formatter
+from typing import FrozenSet, List, Literal, Optional, Dict, Any, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 
+from src.llm.prompt_templates import compile_template
+
+# pyahocorasick が利用可能な場合は天気名が多いときの判定を Aho-Corasick 法で処理
+try:
+    import ahocorasick
+
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# 天気名がこの件数以上あれば（pyahocorasick がある場合）Aho-Corasick 法で判定する
+AHOCORASICK_MIN_PATTERNS = 16
+
+# 月（1〜12）から季節へ（インデックス0は未使用）
+_SEASON_BY_MONTH = (None, "冬", "冬", "春", "春", "春", "夏", "夏", "夏", "秋", "秋", "秋", "冬")
+# 時（0〜23）から時間帯へ
+_PERIOD_BY_HOUR = ("夜",) * 5 + ("朝",) * 6 + ("昼",) * 6 + ("夕方",) * 4 + ("夜",) * 3
+
+# プロンプトに含める追加指示の量
+# minimal: 追加指示なし（季節・時間帯の語のみ時刻に添える）
+# standard: 天気別の留意点のみ
+# rich: 天気・季節・時間帯の追加指示をすべて含める
+PromptVerbosity = Literal["minimal", "standard", "rich"]
+
+# 過去コメントのフォーマット結果を再利用する件数と有効期限（秒）
+FORMAT_CACHE_MAX_ENTRIES = 64
+FORMAT_CACHE_TTL_SECONDS = 60.0
+
+_get_comment_fields = attrgetter("comment_text", "location", "comment_type")
+_get_weather_fields = attrgetter(
+    "location", "weather_description", "temperature", "humidity", "wind_speed", "datetime"
+)
+
+
+def _comment_fields(comment) -> Tuple[Any, Any, Any]:
+    """過去コメントから (本文, 地点, 種別) を取得
+
+    PastComment なら attrgetter 1回で取り出し、属性が欠けたオブジェクトのみ
+    個別に既定値を補う。
+    """
+    try:
+        return _get_comment_fields(comment)
+    except AttributeError:
+        return (
+            getattr(comment, "comment_text", str(comment)),
+            getattr(comment, "location", "不明"),
+            getattr(comment, "comment_type", None),
+        )
+
+
+# 地点名の差し込み位置を示す値（地点名以外の部分を地点間で使い回すため）。
+# str.format を使わないので、地点名に "{}" が含まれていても解釈されない
+_LOCATION_SENTINEL = "\x00location\x00"
+
+
+class _IdentityMemo:
+    """入力オブジェクトの同一性をキーに結果を再利用する LRU（有効期限付き）
+
+    キーに id() を含めても、入力オブジェクトへの参照を保持して取得時に同一か確認するので、
+    エントリがある間に id が再利用されて別の入力に一致することはない。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = FORMAT_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = FORMAT_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # キー -> (有効期限, 入力オブジェクト, 結果)
+        self._entries: "OrderedDict[Any, Tuple[float, Tuple[Any, ...], str]]" = OrderedDict()
+
+    def get(self, key: Any, refs: Tuple[Any, ...]) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        if len(entry[1]) != len(refs) or any(a is not b for a, b in zip(entry[1], refs)):
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def set(self, key: Any, refs: Tuple[Any, ...], value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, refs, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@functools.lru_cache(maxsize=128)
+def _template_fields(template: str) -> FrozenSet[str]:
+    """str.format 形式のテンプレートが参照する変数名を取得（"{a.b}" や "{a[0]}" は "a"）"""
+    return frozenset(
+        re.split(r"[.\[]", field_name, maxsplit=1)[0]
+        for _, field_name, _, _ in Formatter().parse(template)
+        if field_name
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_month_hour(current_time: str) -> Optional[Tuple[int, int]]:
+    """"%Y-%m-%d %H:%M" 形式の文字列から月と時を取得
+
+    同じ時刻の複数地点を処理する場合に備え、結果を時刻ごとに再利用する。
+
+    Returns:
+        (月, 時)。形式が不正な場合はNone
+    """
+    try:
+        month, hour = int(current_time[5:7]), int(current_time[11:13])
+    except (TypeError, ValueError):
+        return None
+    if not (1 <= month <= 12 and 0 <= hour <= 23):
+        return None
+    return month, hour
+
 
 @dataclass
 class PromptTemplate:
-    """プロンプトテンプレート"""
+    """プロンプトテンプレート
+
+    base_template は static_prefix（入力によらない指示）と dynamic_template
+    （気象データ・過去コメント）を連結したもの。プロンプトキャッシュが効くよう、
+    固定部分を常に先頭に置く。
+    """
 
     base_template: str
     weather_specific: Dict[str, str]
     seasonal_adjustments: Dict[str, str]
     time_specific: Dict[str, str]
+    static_prefix: str = ""
+    dynamic_template: str = ""
 
 
 class CommentPromptBuilder:
@@ -28,26 +162,36 @@ class CommentPromptBuilder:
 
     def __init__(self):
         self.templates = self._load_templates()
+        # 可変部分のテンプレートは1度だけ解析しておく
+        self._render_dynamic = compile_template(self.templates.dynamic_template)
+        # 天気条件の判定用（いずれかの天気名に一致する正規表現）
+        self._weather_re = re.compile(
+            "|".join(map(re.escape, self.templates.weather_specific.keys()))
+        )
+        self._weather_automaton = None
+        weather_specific = self.templates.weather_specific
+        if AHOCORASICK_AVAILABLE and len(weather_specific) >= AHOCORASICK_MIN_PATTERNS:
+            self._weather_automaton = ahocorasick.Automaton()
+            for order, (name, guidance) in enumerate(weather_specific.items()):
+                self._weather_automaton.add_word(name, (order, len(name), guidance))
+            self._weather_automaton.make_automaton()
+        # 過去コメントの整形結果と、地点名を差し込む前の可変部分
+        self._format_cache = _IdentityMemo()
+        self._suffix_cache = _IdentityMemo()
+
+    def clear_format_cache(self) -> None:
+        """過去コメントの整形結果・構築済みの可変部分を破棄（パイプラインの実行ごとに呼ぶ）"""
+        self._format_cache.clear()
+        self._suffix_cache.clear()
 
     def _load_templates(self) -> PromptTemplate:
         """プロンプトテンプレートを読み込み"""
-        base_template = """あなたは天気コメント生成の専門家です。
+        # 入力によらない指示（プレースホルダーを含めない）
+        static_prefix = """あなたは天気コメント生成の専門家です。
 
 ## タスク
 現在の気象データと過去のコメント例を分析し、最も適切な天気コメントを選択または生成してください。
 
-## 現在の気象データ
-- 地点: {location}
-- 天気: {weather_description}
-- 気温: {temperature}°C
-- 湿度: {humidity}%
-- 風速: {wind_speed}m/s
-- 時刻: {current_time}
-
-## 過去のコメントデータベース
-以下は様々な気象条件での過去のコメント例です。現在の気象データに最も適した表現を見つけてください：
-{past_comments_examples}
-
 ## 判断基準
 1. 天気、気温、湿度、風速を総合的に分析し、体感を推測する
 2. 過去のコメントから、現在の状況に最も適したものを参考にする
@@ -62,7 +206,20 @@ class CommentPromptBuilder:
 ## 出力
 最も適切なコメント本文のみを出力してください。
 
-天気コメント:"""
+"""
+
+        # リクエストごとに変わる気象データと過去コメント
+        dynamic_template = """## 現在の気象データ
+- 地点: {location}
+- 天気: {weather_description}
+- 気温: {temperature}°C
+- 湿度: {humidity}%
+- 風速: {wind_speed}m/s
+- 時刻: {current_time}
+
+## 過去のコメントデータベース
+以下は様々な気象条件での過去のコメント例です。現在の気象データに最も適した表現を見つけてください：
+{past_comments_examples}"""
 
         weather_specific = {
             "晴れ": """
@@ -98,14 +255,21 @@ class CommentPromptBuilder:
         }
 
         return PromptTemplate(
-            base_template=base_template,
+            base_template=static_prefix + dynamic_template,
             weather_specific=weather_specific,
             seasonal_adjustments=seasonal_adjustments,
             time_specific=time_specific,
+            static_prefix=static_prefix,
+            dynamic_template=dynamic_template,
         )
 
     def build_prompt(
-        self, weather_data, past_comments: List = None, location: str = "", selected_pair=None
+        self,
+        weather_data,
+        past_comments: List = None,
+        location: str = "",
+        selected_pair=None,
+        verbosity: PromptVerbosity = "minimal",
     ) -> str:
         """
         コメント生成用プロンプトを構築
@@ -115,51 +279,171 @@ class CommentPromptBuilder:
             past_comments: 過去コメントリスト
             location: 地点名
             selected_pair: 選択されたコメントペア
+            verbosity: 追加指示の量（"minimal" / "standard" / "rich"）
 
         Returns:
             str: 構築されたプロンプト
         """
+        static_prefix, dynamic_suffix = self.build_prompt_parts(
+            weather_data, past_comments, location, selected_pair, verbosity
+        )
+        return static_prefix + dynamic_suffix
+
+    def build_prompts_batch(
+        self,
+        weather_list: List,
+        past_comments: List = None,
+        selected_pair=None,
+        verbosity: PromptVerbosity = "minimal",
+    ) -> List[str]:
+        """
+        同じ過去コメントを使う複数地点のプロンプトをまとめて構築
+
+        気象データ・時刻が同じ地点同士では地点名以外の部分を1度だけ構築し、
+        地点名だけを差し込む。
+
+        Args:
+            weather_list: 地点ごとの天気予報データのリスト
+            past_comments: 過去コメントリスト
+            selected_pair: 選択されたコメントペア
+            verbosity: 追加指示の量（"minimal" / "standard" / "rich"）
+
+        Returns:
+            weather_list と同じ順序のプロンプト
+        """
+        return [
+            self.build_prompt(
+                weather_data, past_comments, selected_pair=selected_pair, verbosity=verbosity
+            )
+            for weather_data in weather_list
+        ]
+
+    def build_prompt_parts(
+        self,
+        weather_data,
+        past_comments: List = None,
+        location: str = "",
+        selected_pair=None,
+        verbosity: PromptVerbosity = "minimal",
+    ) -> Tuple[str, str]:
+        """
+        コメント生成用プロンプトを固定部分と可変部分に分けて構築
+
+        固定部分はシステムプロンプトなどプロンプトキャッシュの対象に、
+        可変部分はユーザーメッセージに使う。
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去コメントリスト
+            location: 地点名
+            selected_pair: 選択されたコメントペア
+            verbosity: 追加指示の量（"minimal" / "standard" / "rich"）
+
+        Returns:
+            Tuple[str, str]: (入力によらない固定部分, 気象データなどの可変部分)
+        """
         try:
             # 基本情報の取得
             weather_info = self._extract_weather_info(weather_data)
-            past_examples = self._format_past_comments(past_comments, selected_pair)
 
-            # 天気条件に応じた追加指示
+            # 地点名以外は同じ気象データ・過去コメントの地点間で共通なので使い回し、
+            # 地点名だけを最後に差し込む
+            suffix_template = self._get_dynamic_suffix_template(
+                weather_info, past_comments, selected_pair, verbosity
+            )
+            dynamic_suffix = suffix_template.replace(
+                _LOCATION_SENTINEL, location or weather_info.get("location", "")
+            )
+
+            prompt_length = len(self.templates.static_prefix) + len(dynamic_suffix)
+            logger.debug(f"プロンプト構築完了 - 長さ: {prompt_length}文字")
+            return self.templates.static_prefix, dynamic_suffix
+
+        except Exception as e:
+            logger.error(f"プロンプト構築エラー: {str(e)}")
+            return "", self._get_fallback_prompt(location, weather_data)
+
+    def _get_dynamic_suffix_template(
+        self, weather_info: Dict[str, Any], past_comments: List, selected_pair, verbosity: str
+    ) -> str:
+        """地点名の位置を _LOCATION_SENTINEL にした可変部分を取得（同じ入力なら再利用）"""
+        key = (
+            weather_info["weather_description"],
+            weather_info["temperature"],
+            weather_info["humidity"],
+            weather_info["wind_speed"],
+            weather_info["current_time"],
+            verbosity,
+            id(past_comments),
+            id(selected_pair),
+        )
+        refs = (past_comments, selected_pair)
+        try:
+            suffix_template = self._suffix_cache.get(key, refs)
+            cacheable = True
+        except TypeError:
+            # ハッシュできない値を含む場合は再利用しない
+            suffix_template = None
+            cacheable = False
+
+        if suffix_template is None:
+            suffix_template = self._render_dynamic_suffix(
+                weather_info, past_comments, selected_pair, verbosity
+            )
+            if cacheable:
+                self._suffix_cache.set(key, refs, suffix_template)
+        return suffix_template
+
+    def _render_dynamic_suffix(
+        self, weather_info: Dict[str, Any], past_comments: List, selected_pair, verbosity: str
+    ) -> str:
+        """可変部分を構築（地点名は _LOCATION_SENTINEL のまま）"""
+        past_examples = self._format_past_comments(past_comments, selected_pair)
+
+        current_time = weather_info["current_time"]
+        weather_guidance = seasonal_guidance = time_guidance = ""
+
+        # 天気条件に応じた追加指示
+        if verbosity != "minimal":
             weather_guidance = self._get_weather_specific_guidance(
                 weather_info["weather_description"]
             )
 
-            # 季節・時刻に応じた調整
-            seasonal_guidance = self._get_seasonal_guidance(weather_info["current_time"])
-            time_guidance = self._get_time_specific_guidance(weather_info["current_time"])
+        # 季節・時刻に応じた調整（minimal では季節と時間帯の語だけを時刻に添える）
+        month_hour = _parse_month_hour(current_time)
+        if month_hour is not None:
+            month, hour = month_hour
+            if verbosity == "rich":
+                seasonal_guidance = self._get_seasonal_guidance(month)
+                time_guidance = self._get_time_specific_guidance(hour)
+            else:
+                current_time += f"（{_SEASON_BY_MONTH[month]}・{_PERIOD_BY_HOUR[hour]}）"
 
-            # プロンプト構築
-            prompt = self.templates.base_template.format(
-                location=location or weather_info.get("location", ""),
+        # 可変部分の構築
+        parts = [
+            self._render_dynamic(
+                location=_LOCATION_SENTINEL,
                 weather_description=weather_info["weather_description"],
                 temperature=weather_info["temperature"],
                 humidity=weather_info["humidity"],
                 wind_speed=weather_info["wind_speed"],
-                current_time=weather_info["current_time"],
+                current_time=current_time,
                 past_comments_examples=past_examples,
             )
+        ]
 
-            # 追加指示を追加
-            if weather_guidance:
-                prompt += f"\n\n## 天気別の留意点\n{weather_guidance}"
+        # 追加指示を追加（最後に1度だけ連結する）
+        if weather_guidance:
+            parts += ("\n\n## 天気別の留意点\n", weather_guidance)
 
-            if seasonal_guidance:
-                prompt += f"\n\n## 季節の表現\n{seasonal_guidance}"
+        if seasonal_guidance:
+            parts += ("\n\n## 季節の表現\n", seasonal_guidance)
 
-            if time_guidance:
-                prompt += f"\n\n## 時間帯の表現\n{time_guidance}"
+        if time_guidance:
+            parts += ("\n\n## 時間帯の表現\n", time_guidance)
 
-            logger.debug(f"プロンプト構築完了 - 長さ: {len(prompt)}文字")
-            return prompt
-
-        except Exception as e:
-            logger.error(f"プロンプト構築エラー: {str(e)}")
-            return self._get_fallback_prompt(location, weather_data)
+        parts.append("\n\n天気コメント:")
+        return "".join(parts)
 
     def _extract_weather_info(self, weather_data) -> Dict[str, Any]:
         """天気データから情報を抽出"""
@@ -172,22 +456,52 @@ class CommentPromptBuilder:
                 "current_time": datetime.now().strftime("%Y-%m-%d %H:%M"),
             }
 
+        # WeatherForecast（slots のため __dict__ を持たない）は attrgetter 1回で取り出し、
+        # 属性が欠けたオブジェクトのみ個別に既定値を補う
+        try:
+            location, description, temperature, humidity, wind_speed, forecast_time = (
+                _get_weather_fields(weather_data)
+            )
+        except AttributeError:
+            location = getattr(weather_data, "location", "")
+            description = getattr(weather_data, "weather_description", "不明")
+            temperature = getattr(weather_data, "temperature", "不明")
+            humidity = getattr(weather_data, "humidity", "不明")
+            wind_speed = getattr(weather_data, "wind_speed", "不明")
+            forecast_time = getattr(weather_data, "datetime", None) or datetime.now()
+
         return {
-            "location": getattr(weather_data, "location", ""),
-            "weather_description": getattr(weather_data, "weather_description", "不明"),
-            "temperature": getattr(weather_data, "temperature", "不明"),
-            "humidity": getattr(weather_data, "humidity", "不明"),
-            "wind_speed": getattr(weather_data, "wind_speed", "不明"),
-            "current_time": getattr(weather_data, "datetime", datetime.now()).strftime(
-                "%Y-%m-%d %H:%M"
+            "location": location,
+            "weather_description": description,
+            "temperature": temperature,
+            "humidity": humidity,
+            "wind_speed": wind_speed,
+            "current_time": (
+                forecast_time
+                if isinstance(forecast_time, str)
+                else forecast_time.strftime("%Y-%m-%d %H:%M")
             ),
         }
 
     def _format_past_comments(self, past_comments: List, selected_pair) -> str:
-        """過去コメントをフォーマット"""
+        """過去コメントをフォーマット
+
+        同じリスト・ペアから複数のプロンプト（create_custom_prompt など）を作る場合に
+        備え、入力オブジェクトの同一性で結果を再利用する。
+        """
         if not past_comments and not selected_pair:
             return "（過去のコメントデータなし）"
 
+        key = (id(past_comments), id(selected_pair))
+        refs = (past_comments, selected_pair)
+        formatted = self._format_cache.get(key, refs)
+        if formatted is None:
+            formatted = self._render_past_comments(past_comments, selected_pair)
+            self._format_cache.set(key, refs, formatted)
+        return formatted
+
+    def _render_past_comments(self, past_comments: List, selected_pair) -> str:
+        """過去コメントの一覧文字列を構築"""
         examples = []
 
         # 選択されたペアを優先的に表示
@@ -208,10 +522,7 @@ class CommentPromptBuilder:
         if past_comments:
             # 多様性を確保するため、最大15件まで表示
             for comment in past_comments[:15]:
-                # PastCommentオブジェクトの場合
-                text = getattr(comment, "comment_text", str(comment))
-                location = getattr(comment, "location", "不明")
-                comment_type = getattr(comment, "comment_type", None)
+                text, location, comment_type = _comment_fields(comment)
 
                 if comment_type:
                     examples.append(f"- 「{text}」 ({comment_type}, 地点:{location})")
@@ -221,49 +532,28 @@ class CommentPromptBuilder:
         return "\n".join(examples) if examples else "（過去のコメントデータなし）"
 
     def _get_weather_specific_guidance(self, weather_description: str) -> str:
-        """天気条件に応じた指示を取得"""
-        for condition, guidance in self.templates.weather_specific.items():
-            if condition in weather_description:
-                return guidance
-        return ""
-
-    def _get_seasonal_guidance(self, current_time: str) -> str:
+        """天気条件に応じた指示を取得（説明文中で最初に現れる天気を採用）"""
+        if self._weather_automaton is not None:
+            # 正規表現と同じく、開始位置が最も前のもの（同じ位置なら定義順で先のもの）を採用
+            best = None
+            for end, (order, length, guidance) in self._weather_automaton.iter(
+                weather_description
+            ):
+                candidate = (end - length, order, guidance)
+                if best is None or candidate < best:
+                    best = candidate
+            return best[2] if best else ""
+
+        match = self._weather_re.search(weather_description)
+        return self.templates.weather_specific[match.group(0)] if match else ""
+
+    def _get_seasonal_guidance(self, month: int) -> str:
         """季節に応じた指示を取得"""
-        try:
-            dt = datetime.strptime(current_time, "%Y-%m-%d %H:%M")
-            month = dt.month
-
-            if month in [3, 4, 5]:
-                season = "春"
-            elif month in [6, 7, 8]:
-                season = "夏"
-            elif month in [9, 10, 11]:
-                season = "秋"
-            else:
-                season = "冬"
-
-            return self.templates.seasonal_adjustments.get(season, "")
-        except:
-            return ""
+        return self.templates.seasonal_adjustments.get(_SEASON_BY_MONTH[month], "")
 
-    def _get_time_specific_guidance(self, current_time: str) -> str:
+    def _get_time_specific_guidance(self, hour: int) -> str:
         """時間帯に応じた指示を取得"""
-        try:
-            dt = datetime.strptime(current_time, "%Y-%m-%d %H:%M")
-            hour = dt.hour
-
-            if 5 <= hour < 11:
-                time_period = "朝"
-            elif 11 <= hour < 17:
-                time_period = "昼"
-            elif 17 <= hour < 21:
-                time_period = "夕方"
-            else:
-                time_period = "夜"
-
-            return self.templates.time_specific.get(time_period, "")
-        except:
-            return ""
+        return self.templates.time_specific.get(_PERIOD_BY_HOUR[hour], "")
 
     def _get_fallback_prompt(self, location: str, weather_data) -> str:
         """フォールバック用のシンプルなプロンプト"""
@@ -287,13 +577,19 @@ class CommentPromptBuilder:
         Returns:
             str: 構築されたプロンプト
         """
-        weather_info = self._extract_weather_info(weather_data)
-        past_examples = self._format_past_comments(past_comments, None)
-
-        format_vars = {**weather_info, "past_comments_examples": past_examples, **kwargs}
+        # テンプレートが参照する変数だけを用意する（過去コメントの整形なども必要な場合のみ）
+        required = _template_fields(template).difference(kwargs)
+        format_vars = dict(kwargs)
+        if required:
+            weather_info = self._extract_weather_info(weather_data)
+            format_vars.update((key, weather_info[key]) for key in required & weather_info.keys())
+            if "past_comments_examples" in required:
+                format_vars["past_comments_examples"] = self._format_past_comments(
+                    past_comments, None
+                )
 
         try:
-            return template.format(**format_vars)
+            return template.format_map(format_vars)
         except KeyError as e:
             logger.error(f"テンプレート変数不足: {str(e)}")
             return self._get_fallback_prompt(kwargs.get("location", ""), weather_data)
@@ -332,3 +628,8 @@ EXAMPLE_TEMPLATES = {
 
 天気コメント:""",
 }
+
+# 事前に解析済みのプロンプトテンプレート例
+COMPILED_EXAMPLE_TEMPLATES = {
+    name: compile_template(template) for name, template in EXAMPLE_TEMPLATES.items()
+}
@@ -1,23 +1,51 @@
 """プロンプトテンプレート定義"""
 
-# コメント生成用プロンプトテンプレート
-COMMENT_GENERATION_PROMPT = """あなたは天気予報のコメント作成者です。以下の条件でコメントを生成してください。
+import string
+from typing import Callable
 
-【現在の天気情報】
-- 地点: {location}
-- 天気: {weather_condition}
-- 気温: {temperature}°C
-- 時間帯: {time_period}
 
-【参考コメント】
-過去の類似条件でのコメント:
-- 天気コメント: "{weather_comment}"
-- アドバイス: "{advice_comment}"
+def compile_template(template: str) -> Callable[..., str]:
+    """str.format 形式のテンプレートを事前に解析し、描画関数を返す
 
-【制約条件】
-- 必ず{max_length}文字以内
+    呼び出しごとにテンプレートを解析し直さないよう、1度だけ % 形式に変換しておく。
+    値は str() で文字列化される。書式指定や変換指定（{x:.1f}, {x!r}）、位置引数や
+    属性参照を含むテンプレートは変換せず、そのまま str.format を使う。
+
+    Args:
+        template: str.format 形式のテンプレート
+
+    Returns:
+        キーワード引数を受け取り、描画した文字列を返す関数
+    """
+    chunks = []
+    for literal, name, format_spec, conversion in string.Formatter().parse(template):
+        chunks.append(literal.replace("%", "%%"))
+        if name is None:
+            continue
+        if format_spec or conversion or not name.isidentifier():
+            return template.format
+        chunks.append(f"%({name})s")
+
+    percent_template = "".join(chunks)
+
+    def render(**kwargs) -> str:
+        return percent_template % kwargs
+
+    return render
+
+
+# コメント生成用のシステムプロンプト（全プロバイダー共通）
+COMMENT_SYSTEM_PROMPT = (
+    "あなたは天気予報のコメント作成の専門家です。短く、親しみやすいコメントを生成してください。"
+)
+
+# コメント生成用プロンプトの固定部分
+# OpenAI / Anthropic のプロンプトキャッシュは先頭からの完全一致で効くため、
+# 入力によって変わらない指示と例を先頭に置き、プレースホルダーは含めない
+COMMENT_GENERATION_STATIC_PROMPT = """あなたは天気予報のコメント作成者です。以下の条件でコメントを生成してください。
+
+【共通の条件】
 - 自然で親しみやすい表現
-- NGワード: {ng_words}
 - 季節感を考慮
 - 。や、などの句読点は使用せず、スペースや改行も含めない
 
@@ -33,8 +61,32 @@ COMMENT_GENERATION_PROMPT = """あなたは天気予報のコメント作成者
 - "危険な暑さです"（7文字 - NGワード使用）
 - "絶対に傘を持って"（8文字 - NGワード使用）
 
+"""
+
+# コメント生成用プロンプトの可変部分（天気情報・参考コメント・制約）
+COMMENT_GENERATION_DYNAMIC_PROMPT = """【現在の天気情報】
+- 地点: {location}
+- 天気: {weather_condition}
+- 気温: {temperature}°C
+- 時間帯: {time_period}
+
+【参考コメント】
+過去の類似条件でのコメント:
+- 天気コメント: "{weather_comment}"
+- アドバイス: "{advice_comment}"
+
+【制約条件】
+- 必ず{max_length}文字以内
+- NGワード: {ng_words}
+
 コメントを1つだけ生成してください。余計な説明は不要です:"""
 
+# コメント生成用プロンプトテンプレート
+COMMENT_GENERATION_PROMPT = COMMENT_GENERATION_STATIC_PROMPT + COMMENT_GENERATION_DYNAMIC_PROMPT
+
+# 事前に解析済みのコメント生成用プロンプト（可変部分）
+render_comment_generation_prompt = compile_template(COMMENT_GENERATION_DYNAMIC_PROMPT)
+
 # 評価用プロンプトテンプレート（将来使用）
 COMMENT_EVALUATION_PROMPT = """以下のコメントを評価してください。
 
@@ -49,4 +101,12 @@ COMMENT_EVALUATION_PROMPT = """以下のコメントを評価してください
 各項目について「OK」または「NG」で評価し、総合評価を出してください。"""
 
 # エクスポート
-__all__ = ["COMMENT_GENERATION_PROMPT", "COMMENT_EVALUATION_PROMPT"]
+__all__ = [
+    "COMMENT_SYSTEM_PROMPT",
+    "COMMENT_GENERATION_STATIC_PROMPT",
+    "COMMENT_GENERATION_DYNAMIC_PROMPT",
+    "COMMENT_GENERATION_PROMPT",
+    "COMMENT_EVALUATION_PROMPT",
+    "compile_template",
+    "render_comment_generation_prompt",
+]
@@ -1,8 +1,22 @@
 """LLMプロバイダーパッケージ"""
 
+import importlib
+
 from src.llm.providers.base_provider import LLMProvider
-from src.llm.providers.openai_provider import OpenAIProvider
-from src.llm.providers.gemini_provider import GeminiProvider
-from src.llm.providers.anthropic_provider import AnthropicProvider
+
+# 各プロバイダーは SDK の読み込みが重いため、参照されたときに初めて import する
+_LAZY_PROVIDERS = {
+    "OpenAIProvider": "src.llm.providers.openai_provider",
+    "GeminiProvider": "src.llm.providers.gemini_provider",
+    "AnthropicProvider": "src.llm.providers.anthropic_provider",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_PROVIDERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module_name), name)
+
 
 __all__ = ["LLMProvider", "OpenAIProvider", "GeminiProvider", "AnthropicProvider"]
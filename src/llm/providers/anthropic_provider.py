@@ -1,16 +1,61 @@
 """Anthropic Claude APIプロバイダー"""
 
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 
-from src.llm.providers.base_provider import LLMProvider
+try:
+    # SDK 既定のタイムアウト・keepalive 設定を引き継いだ httpx クライアント
+    from anthropic import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+    SHARED_HTTP_CLIENT_AVAILABLE = True
+except ImportError:
+    SHARED_HTTP_CLIENT_AVAILABLE = False
+
+from src.llm.prompt_templates import COMMENT_GENERATION_STATIC_PROMPT, COMMENT_SYSTEM_PROMPT
+from src.llm.providers.base_provider import (
+    COMMENT_MAX_TOKENS,
+    COMMENT_STOP_SEQUENCES,
+    DEFAULT_COMMENT_TEMPERATURE,
+    DEFAULT_GENERATE_MAX_TOKENS,
+    LLMProvider,
+    cached_comment,
+)
+from src.llm.providers.http_clients import LoopLocal, SharedHttpClients
 from src.data.weather_data import WeatherForecast
 from src.data.comment_pair import CommentPair
 
 logger = logging.getLogger(__name__)
 
+# 全プロバイダーで共有するHTTP接続プールの上限
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 32
+
+# コメント生成を止める文字列。Messages API は空白のみの停止文字列を受け付けないため改行は除く
+# （COMMENT_MAX_TOKENS と「。」で1行に収まる）
+ANTHROPIC_COMMENT_STOP_SEQUENCES = [stop for stop in COMMENT_STOP_SEQUENCES if stop.strip()]
+
+# 複数地点の一括生成で1回のリクエストにまとめる地点数の上限
+BATCH_MAX_ITEMS = 10
+# 一括生成時の1地点あたりの最大トークン数（JSON の引用符・区切りの分、単体生成より多めに取る）
+BATCH_MAX_TOKENS_PER_ITEM = 50
+
+BATCH_INSTRUCTION = (
+    "以下の各地点について、条件を満たすコメントを1つずつ生成してください。\n"
+    '["地点1のコメント", "地点2のコメント", ...] 形式のJSON配列のみを出力し、'
+    "要素数と順序は地点の番号と一致させてください。"
+)
+
+# プロセス全体で共有するHTTPクライアント（非同期クライアントはイベントループごと）
+_http_clients = SharedHttpClients(
+    DefaultHttpxClient if SHARED_HTTP_CLIENT_AVAILABLE else None,
+    DefaultAsyncHttpxClient if SHARED_HTTP_CLIENT_AVAILABLE else None,
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+)
+
 
 class AnthropicProvider(LLMProvider):
     """Anthropic Claude APIを使用するプロバイダー"""
@@ -23,16 +68,37 @@ class AnthropicProvider(LLMProvider):
             api_key: Anthropic APIキー
             model: 使用するモデル名
         """
-        self.client = Anthropic(api_key=api_key)
+        self.client = Anthropic(api_key=api_key, http_client=_http_clients.get())
+        # 非同期クライアントの接続はイベントループに紐づくため、ループごとに作成する
+        self._async_clients = LoopLocal(
+            lambda: AsyncAnthropic(api_key=api_key, http_client=_http_clients.get_async())
+        )
+        # システムプロンプトとコメント生成の固定指示は毎回同じなので1度だけ組み立て、
+        # プロンプトキャッシュの区切り（cache_control）を付けておく
+        self._cached_system_blocks = [
+            {
+                "type": "text",
+                "text": f"{COMMENT_SYSTEM_PROMPT}\n\n{COMMENT_GENERATION_STATIC_PROMPT}",
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
         self.model = model
         logger.info(f"Initialized Anthropic provider with model: {model}")
 
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        """実行中のイベントループ用の非同期クライアント"""
+        return self._async_clients.get()
+
+    @cached_comment
     def generate_comment(
         self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
     ) -> str:
         """
         Claude APIを使用してコメントを生成。
 
+        応答はストリーミングで受信し、文字数の上限を超えた時点で打ち切る。
+
         Args:
             weather_data: 天気予報データ
             past_comments: 過去のコメントペア
@@ -42,37 +108,202 @@ class AnthropicProvider(LLMProvider):
             生成されたコメント
         """
         try:
-            # プロンプトの構築
-            prompt = self._build_prompt(weather_data, past_comments, constraints)
-
-            # APIリクエスト
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=50,
-                temperature=0.7,
-                system="あなたは天気予報のコメント作成の専門家です。短く、親しみやすいコメントを生成してください。",
-                messages=[{"role": "user", "content": prompt}],
+            return self._stream_comment(
+                self._comment_request(weather_data, past_comments, constraints), constraints
             )
 
-            # レスポンスからコメントを抽出
-            generated_comment = response.content[0].text.strip()
+        except Exception as e:
+            logger.error(f"Error in Anthropic API call: {str(e)}")
+            raise
 
-            # 改行や余分な記号を除去
-            generated_comment = generated_comment.replace("\n", "").strip('"')
+    @cached_comment
+    async def agenerate_comment(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        """
+        非同期クライアントを使用してコメントを生成。
 
-            logger.info(f"Generated comment: {generated_comment}")
-            return generated_comment
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            生成されたコメント
+        """
+        try:
+            char_limit = self._stream_char_limit(constraints)
+            text = ""
+            async with self.async_client.messages.stream(
+                **self._comment_request(weather_data, past_comments, constraints)
+            ) as stream:
+                async for delta in stream.text_stream:
+                    text += delta
+                    if len(text) >= char_limit:
+                        # 上限に達したら応答を閉じ、残りの生成を受信しない
+                        await stream.close()
+                        break
+            return self._clean_comment(text)
 
         except Exception as e:
             logger.error(f"Error in Anthropic API call: {str(e)}")
             raise
 
-    def generate(self, prompt: str) -> str:
+    def generate_comment_from_prompt(
+        self, prompt: str, constraints: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        構築済みのプロンプトからコメントを生成。
+
+        Args:
+            prompt: 構築済みのプロンプト（ユーザーメッセージとして送る）
+            constraints: 制約条件
+
+        Returns:
+            生成されたコメント
+        """
+        constraints = constraints or {}
+        try:
+            return self._stream_comment(
+                {
+                    "model": self.model,
+                    "max_tokens": COMMENT_MAX_TOKENS,
+                    "temperature": constraints.get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+                    "stop_sequences": ANTHROPIC_COMMENT_STOP_SEQUENCES,
+                    "system": COMMENT_SYSTEM_PROMPT,
+                    "messages": [{"role": "user", "content": prompt}],
+                },
+                constraints,
+            )
+
+        except Exception as e:
+            logger.error(f"Error in Anthropic API call: {str(e)}")
+            raise
+
+    def _stream_comment(self, request: Dict[str, Any], constraints: Dict[str, Any]) -> str:
+        """ストリーミングで受信し、文字数の上限を超えた時点で打ち切る"""
+        char_limit = self._stream_char_limit(constraints)
+        text = ""
+        with self.client.messages.stream(**request) as stream:
+            for delta in stream.text_stream:
+                text += delta
+                if len(text) >= char_limit:
+                    # 上限に達したら応答を閉じ、残りの生成を受信しない
+                    stream.close()
+                    break
+        return self._clean_comment(text)
+
+    def _comment_request(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """コメント生成リクエストのパラメータを構築"""
+        # 可変部分（天気情報・参考コメント）だけをユーザーメッセージにする
+        _, dynamic_prompt = self._build_prompt_parts(weather_data, past_comments, constraints)
+
+        return {
+            "model": self.model,
+            "max_tokens": COMMENT_MAX_TOKENS,
+            "temperature": constraints.get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+            "stop_sequences": ANTHROPIC_COMMENT_STOP_SEQUENCES,
+            "system": self._cached_system_blocks,
+            "messages": [{"role": "user", "content": dynamic_prompt}],
+        }
+
+    def generate_comments_batch(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        複数地点の天気コメントをまとめて生成する。
+
+        BATCH_MAX_ITEMS 地点ずつ1回のAPI呼び出しに詰めて送信し、往復回数を削減する。
+        応答を解析できなかった分は generate_comment で個別に処理する。
+
+        Args:
+            items: generate_comment の引数（weather_data, past_comments, constraints）の辞書のリスト
+
+        Returns:
+            items と同じ順序の生成コメント
+        """
+        comments: List[str] = []
+        for start in range(0, len(items), BATCH_MAX_ITEMS):
+            chunk = items[start : start + BATCH_MAX_ITEMS]
+            try:
+                comments.extend(self._generate_comments_chunk(chunk))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Batch response could not be parsed, falling back: {str(e)}")
+                comments.extend(self.generate_comment(**item) for item in chunk)
+        return comments
+
+    def _generate_comments_chunk(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        複数地点のコメントを1回のAPI呼び出しで生成する。
+
+        Args:
+            items: generate_comment の引数の辞書のリスト
+
+        Returns:
+            items と同じ順序の生成コメント
+
+        Raises:
+            ValueError: 応答が期待した形式でない場合
+        """
+        blocks = [BATCH_INSTRUCTION]
+        for index, item in enumerate(items, 1):
+            blocks.append(
+                self._format_batch_item(
+                    index, item["weather_data"], item["past_comments"], item["constraints"]
+                )
+            )
+
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=BATCH_MAX_TOKENS_PER_ITEM * len(items),
+            temperature=items[0]["constraints"].get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+            system=self._cached_system_blocks,
+            messages=[{"role": "user", "content": "\n\n".join(blocks)}],
+        )
+
+        text = response.content[0].text
+        # コードブロックなどで囲まれていても配列部分だけを取り出す
+        start, end = text.find("["), text.rfind("]")
+        if start == -1 or end < start:
+            raise ValueError(f"No JSON array in response: {text!r:.100}")
+
+        results = json.loads(text[start : end + 1])
+        if not isinstance(results, list) or len(results) != len(items):
+            raise ValueError(f"Expected {len(items)} results, got {results!r:.100}")
+
+        return [str(result).replace("\n", "").strip().strip('"') for result in results]
+
+    @staticmethod
+    def _format_batch_item(
+        index: int,
+        weather_data: WeatherForecast,
+        past_comments: CommentPair,
+        constraints: Dict[str, Any],
+    ) -> str:
+        """一括生成用に1地点分の条件を整形"""
+        ng_words = "、".join(constraints.get("ng_words", [])) or "なし"
+        return (
+            f"[{index}] 地点: {weather_data.location} / 天気: {weather_data.weather_description}"
+            f" / 気温: {weather_data.temperature}°C"
+            f" / 時間帯: {constraints.get('time_period', '昼')}\n"
+            f"参考の天気コメント: \"{past_comments.weather_comment.comment_text}\""
+            f" / 参考のアドバイス: \"{past_comments.advice_comment.comment_text}\"\n"
+            f"必ず{constraints.get('max_length', 15)}文字以内 / NGワード: {ng_words}"
+        )
+
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = DEFAULT_GENERATE_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> str:
         """
         汎用的なテキスト生成を行う。
 
         Args:
             prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数（大きくするとレイテンシのばらつきも大きくなる）
+            stop: 生成を止める文字列のリスト
 
         Returns:
             生成されたテキスト
@@ -80,12 +311,15 @@ class AnthropicProvider(LLMProvider):
         try:
             logger.info(f"Generating text with Anthropic {self.model}")
 
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=500,
-                temperature=0.7,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            request: Dict[str, Any] = {
+                "model": self.model,
+                "max_tokens": max_tokens,
+                "temperature": 0.7,
+                "messages": [{"role": "user", "content": prompt}],
+            }
+            if stop:
+                request["stop_sequences"] = stop
+            message = self.client.messages.create(**request)
 
             generated_text = message.content[0].text
             logger.info(f"Generated text: {generated_text[:100]}...")
@@ -1,10 +1,269 @@
 """LLMプロバイダーの基底クラス"""
 
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
 from src.data.weather_data import WeatherForecast
 from src.data.comment_pair import CommentPair
+from src.llm.cache import MemoryCacheBackend, SQLiteCacheBackend
+from src.llm.prompt_templates import (
+    COMMENT_GENERATION_STATIC_PROMPT,
+    render_comment_generation_prompt,
+)
+
+logger = logging.getLogger(__name__)
+
+# コメント生成時のデフォルト temperature（constraints["temperature"] で上書き可能）
+DEFAULT_COMMENT_TEMPERATURE = 0.7
+
+# 15文字程度のコメントに必要な出力トークン数の上限
+COMMENT_MAX_TOKENS = 25
+# コメントは1行・1文なので、改行・句点（またはプロンプト末尾の見出しの繰り返し）で生成を止める
+# （Anthropic は空白のみの停止文字列を受け付けないため、改行を除いて使う）
+COMMENT_STOP_SEQUENCES = ["\n", "。", "天気コメント:"]
+# ストリーミング生成で max_length を超えてから受信を打ち切るまでの余裕（文字数）
+STREAM_STOP_MARGIN = 5
+# 汎用生成（generate）の最大出力トークン数のデフォルト
+# 実際の出力が短くても上限に比例してレイテンシが伸びるため小さく取り、長い出力は呼び出し側で指定する
+DEFAULT_GENERATE_MAX_TOKENS = 128
+# 一括生成（generate_bulk）のプロンプト1件あたりの最大トークン数。
+# まとめて送れずに1件ずつ生成する場合も同じ上限を使う
+BULK_MAX_TOKENS_PER_PROMPT = 500
+
+# agenerate_comments の同時実行数のデフォルト
+DEFAULT_ASYNC_CONCURRENCY = 16
+
+# プロバイダー単位のコメントキャッシュのデフォルト設定
+DEFAULT_COMMENT_CACHE_MAX_ENTRIES = 4096
+DEFAULT_COMMENT_CACHE_TTL_SECONDS = 3600.0
+
+
+# 呼び出し元（LLMManager）が結果を待つ期限（time.monotonic() の値）。
+# プロバイダーの再試行はこれを超えて続けない
+_request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+@contextmanager
+def request_deadline(deadline: Optional[float]) -> Iterator[None]:
+    """このコンテキスト内のプロバイダー呼び出しに、呼び出し元の期限を設定する
+
+    Args:
+        deadline: 期限（time.monotonic() の値。None で期限なし）
+    """
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def request_deadline_reached(next_wait: float = 0.0) -> bool:
+    """next_wait 秒待つと呼び出し元の期限を過ぎるか
+
+    Args:
+        next_wait: これから待機する秒数
+
+    Returns:
+        期限が設定されていて、待機後に期限を過ぎる場合は True
+    """
+    deadline = _request_deadline.get()
+    return deadline is not None and time.monotonic() + next_wait >= deadline
+
+
+class _PersistentCommentCache:
+    """プロセス内 LRU の背後に SQLite を置いたコメントキャッシュ
+
+    SQLite の障害で生成自体を止めないよう、読み書きの失敗は警告に留める。
+    """
+
+    def __init__(self, memory: MemoryCacheBackend, store: SQLiteCacheBackend):
+        self.memory = memory
+        self.store = store
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        try:
+            value = self.store.get(key)
+        except Exception as e:
+            logger.warning(f"コメントキャッシュの読み込みに失敗: {str(e)}")
+            return None
+        if value is not None:
+            self.memory.set(key, value, _comment_cache_ttl)
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: float) -> None:
+        self.memory.set(key, value, ttl_seconds)
+        try:
+            self.store.set(key, value, ttl_seconds)
+        except Exception as e:
+            logger.warning(f"コメントキャッシュの書き込みに失敗: {str(e)}")
+
+
+# 気温を丸めてキーにするため、LLMManager の完全一致キャッシュより広く一致する。
+# サンプリングを伴う生成も同じ結果を返すようになるため既定では無効で、
+# configure_comment_cache() か環境変数 LLM_COMMENT_CACHE_TTL（秒）で有効にする。
+# 環境変数 LLM_COMMENT_CACHE_PATH を指定すると SQLite に保存し、再起動後も再利用する
+_comment_cache: Optional[Union[MemoryCacheBackend, _PersistentCommentCache]] = None
+_comment_cache_ttl = DEFAULT_COMMENT_CACHE_TTL_SECONDS
+
+
+def configure_comment_cache(
+    max_entries: int = DEFAULT_COMMENT_CACHE_MAX_ENTRIES,
+    ttl_seconds: float = DEFAULT_COMMENT_CACHE_TTL_SECONDS,
+    path: Optional[str] = None,
+) -> None:
+    """プロバイダー単位のコメントキャッシュを設定
+
+    Args:
+        max_entries: 最大件数（0 以下で無効化）
+        ttl_seconds: 有効期限（秒、0 以下で無効化）
+        path: 永続化先の SQLite ファイル（指定時は保存済みの新しいものから読み込んでおく）
+    """
+    global _comment_cache, _comment_cache_ttl
+    if isinstance(_comment_cache, _PersistentCommentCache):
+        _comment_cache.store.close()
+    if max_entries <= 0 or ttl_seconds <= 0:
+        _comment_cache = None
+        return
+
+    memory = MemoryCacheBackend(max_entries=max_entries)
+    _comment_cache_ttl = ttl_seconds
+    if path is None:
+        _comment_cache = memory
+        return
+
+    store = SQLiteCacheBackend(path)
+    try:
+        for key, value, remaining in reversed(store.recent(max_entries)):
+            memory.set(key, value, remaining)
+    except Exception as e:
+        logger.warning(f"コメントキャッシュの事前読み込みに失敗: {str(e)}")
+    _comment_cache = _PersistentCommentCache(memory, store)
+
+
+def _comment_cache_key(
+    provider: "LLMProvider",
+    weather_data: WeatherForecast,
+    past_comments: CommentPair,
+    constraints: Dict[str, Any],
+) -> str:
+    """コメントキャッシュのキーを生成（気温は1℃単位に丸める）"""
+    weather_comment = getattr(past_comments, "weather_comment", None)
+    advice_comment = getattr(past_comments, "advice_comment", None)
+    return repr(
+        (
+            type(provider).__name__,
+            getattr(provider, "model_name", None) or getattr(provider, "model", None),
+            weather_data.location,
+            weather_data.weather_description,
+            round(weather_data.temperature),
+            constraints.get("time_period"),
+            constraints.get("max_length", 15),
+            tuple(constraints.get("ng_words", ())),
+            constraints.get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+            getattr(weather_comment, "comment_text", None),
+            getattr(advice_comment, "comment_text", None),
+        )
+    )
+
+
+def cached_comment(generate_comment):
+    """generate_comment の結果をコメントキャッシュに保存するデコレーター
+
+    同期メソッド・コルーチンメソッド（agenerate_comment）のどちらにも適用できる。
+    """
+    if inspect.iscoroutinefunction(generate_comment):
+
+        @functools.wraps(generate_comment)
+        async def async_wrapper(
+            self,
+            weather_data: WeatherForecast,
+            past_comments: CommentPair,
+            constraints: Dict[str, Any],
+        ) -> str:
+            cache = _comment_cache
+            if cache is None:
+                return await generate_comment(self, weather_data, past_comments, constraints)
+
+            key = _comment_cache_key(self, weather_data, past_comments, constraints)
+            comment = cache.get(key)
+            if comment is None:
+                comment = await generate_comment(self, weather_data, past_comments, constraints)
+                cache.set(key, comment, _comment_cache_ttl)
+            return comment
+
+        return async_wrapper
+
+    @functools.wraps(generate_comment)
+    def wrapper(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        cache = _comment_cache
+        if cache is None:
+            return generate_comment(self, weather_data, past_comments, constraints)
+
+        key = _comment_cache_key(self, weather_data, past_comments, constraints)
+        comment = cache.get(key)
+        if comment is None:
+            comment = generate_comment(self, weather_data, past_comments, constraints)
+            cache.set(key, comment, _comment_cache_ttl)
+        return comment
+
+    return wrapper
+
+
+if os.getenv("LLM_COMMENT_CACHE_TTL"):
+    configure_comment_cache(
+        ttl_seconds=float(os.environ["LLM_COMMENT_CACHE_TTL"]),
+        path=os.getenv("LLM_COMMENT_CACHE_PATH"),
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _join_ng_words(ng_words: Tuple[str, ...]) -> str:
+    """NGワードをプロンプト用に連結（同じ組み合わせは使い回す）"""
+    return "、".join(ng_words)
+
+
+@functools.lru_cache(maxsize=1024)
+def _render_dynamic_prompt(
+    location: str,
+    weather_condition: str,
+    temperature: float,
+    time_period: str,
+    weather_comment: str,
+    advice_comment: str,
+    ng_words: Tuple[str, ...],
+    max_length: int,
+) -> str:
+    """プロンプトの可変部分を生成
+
+    キーはプロンプトに埋め込む値そのものなので、フェイルオーバー先のプロバイダーや
+    同じ入力での再生成では組み立て済みの文字列を使い回す。
+    """
+    return render_comment_generation_prompt(
+        location=location,
+        weather_condition=weather_condition,
+        temperature=temperature,
+        time_period=time_period,
+        weather_comment=weather_comment,
+        advice_comment=advice_comment,
+        ng_words=_join_ng_words(ng_words),
+        max_length=max_length,
+    )
 
 
 class LLMProvider(ABC):
@@ -27,13 +286,98 @@ class LLMProvider(ABC):
         """
         pass
 
+    def generate_comment_from_prompt(
+        self, prompt: str, constraints: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        構築済みのプロンプトから天気コメントを生成する。
+
+        CommentPromptBuilder などで組み立て済みのプロンプトを、
+        コメント生成用テンプレートで再度組み立てずにそのまま送る。
+        既定では generate で生成し、改行や余分な記号を除去する。
+
+        Args:
+            prompt: 構築済みのプロンプト
+            constraints: 制約条件（temperature, max_length等）
+
+        Returns:
+            生成されたコメント文字列
+        """
+        return self._clean_comment(self.generate(prompt))
+
+    async def agenerate_comment(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        """
+        天気コメントを非同期で生成する。
+
+        既定では generate_comment をスレッドプールで実行する。非同期クライアントを
+        持つプロバイダーはオーバーライドする。
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            生成されたコメント文字列
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            functools.partial(self.generate_comment, weather_data, past_comments, constraints),
+        )
+
+    async def agenerate_comments(
+        self, items: List[Dict[str, Any]], max_concurrency: int = DEFAULT_ASYNC_CONCURRENCY
+    ) -> List[Union[str, BaseException]]:
+        """
+        複数の天気コメントを並行して生成する。
+
+        Args:
+            items: agenerate_comment の引数（weather_data, past_comments, constraints）の辞書のリスト
+            max_concurrency: 同時に実行する API 呼び出しの上限
+
+        Returns:
+            items と同じ順序の生成コメント（失敗した要素は例外オブジェクト）
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(item: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.agenerate_comment(**item)
+
+        return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+    def generate_comments_batch(self, items: List[Dict[str, Any]]) -> List[str]:
+        """
+        複数地点の天気コメントを生成する。
+
+        既定では generate_comment を順に呼び出す。1回のAPI呼び出しに複数地点を
+        まとめられるプロバイダーはオーバーライドする。
+
+        Args:
+            items: generate_comment の引数（weather_data, past_comments, constraints）の辞書のリスト
+
+        Returns:
+            items と同じ順序の生成コメント
+        """
+        return [self.generate_comment(**item) for item in items]
+
     @abstractmethod
-    def generate(self, prompt: str) -> str:
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = DEFAULT_GENERATE_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> str:
         """
         汎用的なテキスト生成を行う。
 
         Args:
             prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数（大きくするとレイテンシのばらつきも大きくなる）
+            stop: 生成を止める文字列のリスト
 
         Returns:
             生成されたテキスト
@@ -53,26 +397,72 @@ class LLMProvider(ABC):
 
         Returns:
             構築されたプロンプト文字列
+
+        Raises:
+            ValueError: 固定部分がプロンプトの先頭にない場合
         """
-        from src.llm.prompt_templates import COMMENT_GENERATION_PROMPT
-
-        # NGワードのフォーマット
-        ng_words_str = "、".join(constraints.get("ng_words", []))
-
-        # プロンプトの構築
-        prompt = COMMENT_GENERATION_PROMPT.format(
-            location=weather_data.location,
-            weather_condition=weather_data.weather_description,
-            temperature=weather_data.temperature,
-            time_period=constraints.get("time_period", "昼"),
-            weather_comment=past_comments.weather_comment.comment_text,
-            advice_comment=past_comments.advice_comment.comment_text,
-            ng_words=ng_words_str,
-            max_length=constraints.get("max_length", 15),
+        static_prompt, dynamic_prompt = self._build_prompt_parts(
+            weather_data, past_comments, constraints
         )
+        prompt = static_prompt + dynamic_prompt
 
+        # プロンプトキャッシュが効くよう、固定部分が常に先頭にあること
+        if not prompt.startswith(COMMENT_GENERATION_STATIC_PROMPT):
+            raise ValueError("プロンプトの先頭が固定部分（COMMENT_GENERATION_STATIC_PROMPT）ではありません")
         return prompt
 
+    def _build_prompt_parts(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> Tuple[str, str]:
+        """
+        プロンプトを固定部分と可変部分に分けて構築する。
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            (入力によらない固定部分, 天気情報などの可変部分)
+        """
+        # 可変部分の構築（同じ入力では組み立て済みのものを使い回す）
+        dynamic_prompt = _render_dynamic_prompt(
+            weather_data.location,
+            weather_data.weather_description,
+            weather_data.temperature,
+            constraints.get("time_period", "昼"),
+            past_comments.weather_comment.comment_text,
+            past_comments.advice_comment.comment_text,
+            tuple(constraints.get("ng_words", ())),
+            constraints.get("max_length", 15),
+        )
+
+        return COMMENT_GENERATION_STATIC_PROMPT, dynamic_prompt
+
+    @staticmethod
+    def _stream_char_limit(constraints: Dict[str, Any]) -> int:
+        """ストリーミング受信を打ち切る文字数（超過分は呼び出し側で自然な位置に切り詰める）"""
+        return constraints.get("max_length", 15) + STREAM_STOP_MARGIN
+
+    @staticmethod
+    def _clean_comment(text: str) -> str:
+        """生成テキストから改行や余分な記号を除去"""
+        generated_comment = text.strip().replace("\n", "").strip('"')
+        logger.info(f"Generated comment: {generated_comment}")
+        return generated_comment
+
 
 # エクスポート
-__all__ = ["LLMProvider"]
+__all__ = [
+    "LLMProvider",
+    "DEFAULT_COMMENT_TEMPERATURE",
+    "COMMENT_MAX_TOKENS",
+    "DEFAULT_GENERATE_MAX_TOKENS",
+    "BULK_MAX_TOKENS_PER_PROMPT",
+    "COMMENT_STOP_SEQUENCES",
+    "STREAM_STOP_MARGIN",
+    "cached_comment",
+    "configure_comment_cache",
+    "request_deadline",
+    "request_deadline_reached",
+]
@@ -1,11 +1,19 @@
 """Google Gemini APIプロバイダー"""
 
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 import google.generativeai as genai
 
-from src.llm.providers.base_provider import LLMProvider
+from src.llm.prompt_templates import COMMENT_SYSTEM_PROMPT
+from src.llm.providers.base_provider import (
+    COMMENT_MAX_TOKENS,
+    COMMENT_STOP_SEQUENCES,
+    DEFAULT_COMMENT_TEMPERATURE,
+    DEFAULT_GENERATE_MAX_TOKENS,
+    LLMProvider,
+    cached_comment,
+)
 from src.data.weather_data import WeatherForecast
 from src.data.comment_pair import CommentPair
 
@@ -28,12 +36,15 @@ class GeminiProvider(LLMProvider):
         self.model_name = model
         logger.info(f"Initialized Gemini provider with model: {model}")
 
+    @cached_comment
     def generate_comment(
         self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
     ) -> str:
         """
         Gemini APIを使用してコメントを生成。
 
+        応答はストリーミングで受信し、文字数の上限を超えた時点で打ち切る。
+
         Args:
             weather_data: 天気予報データ
             past_comments: 過去のコメントペア
@@ -43,44 +54,84 @@ class GeminiProvider(LLMProvider):
             生成されたコメント
         """
         try:
-            # プロンプトの構築
-            prompt = self._build_prompt(weather_data, past_comments, constraints)
-
-            # システムプロンプトを含めた完全なプロンプト
-            full_prompt = (
-                "あなたは天気予報のコメント作成の専門家です。"
-                "短く、親しみやすいコメントを生成してください。\n\n"
-                f"{prompt}"
-            )
+            char_limit = self._stream_char_limit(constraints)
+            text = ""
+            for chunk in self.model.generate_content(
+                self._comment_prompt(weather_data, past_comments, constraints),
+                generation_config=self._comment_generation_config(constraints),
+                stream=True,
+            ):
+                text += chunk.text
+                if len(text) >= char_limit:
+                    break
+            return self._clean_comment(text)
 
-            # APIリクエスト
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=0.7,
-                    max_output_tokens=50,
-                ),
-            )
+        except Exception as e:
+            logger.error(f"Error in Gemini API call: {str(e)}")
+            raise
 
-            # レスポンスからコメントを抽出
-            generated_comment = response.text.strip()
+    @cached_comment
+    async def agenerate_comment(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        """
+        Gemini APIの非同期呼び出しでコメントを生成。
 
-            # 改行や余分な記号を除去
-            generated_comment = generated_comment.replace("\n", "").strip('"')
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
 
-            logger.info(f"Generated comment: {generated_comment}")
-            return generated_comment
+        Returns:
+            生成されたコメント
+        """
+        try:
+            char_limit = self._stream_char_limit(constraints)
+            text = ""
+            response = await self.model.generate_content_async(
+                self._comment_prompt(weather_data, past_comments, constraints),
+                generation_config=self._comment_generation_config(constraints),
+                stream=True,
+            )
+            async for chunk in response:
+                text += chunk.text
+                if len(text) >= char_limit:
+                    break
+            return self._clean_comment(text)
 
         except Exception as e:
             logger.error(f"Error in Gemini API call: {str(e)}")
             raise
 
-    def generate(self, prompt: str) -> str:
+    def _comment_prompt(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        """システムプロンプトを含めた完全なプロンプトを構築"""
+        prompt = self._build_prompt(weather_data, past_comments, constraints)
+        return f"{COMMENT_SYSTEM_PROMPT}\n\n{prompt}"
+
+    @staticmethod
+    def _comment_generation_config(constraints: Dict[str, Any]) -> "genai.GenerationConfig":
+        """コメント生成用の生成設定"""
+        return genai.GenerationConfig(
+            temperature=constraints.get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+            max_output_tokens=COMMENT_MAX_TOKENS,
+            stop_sequences=COMMENT_STOP_SEQUENCES,
+        )
+
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = DEFAULT_GENERATE_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> str:
         """
         汎用的なテキスト生成を行う。
 
         Args:
             prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数（大きくするとレイテンシのばらつきも大きくなる）
+            stop: 生成を止める文字列のリスト
 
         Returns:
             生成されたテキスト
@@ -92,7 +143,8 @@ class GeminiProvider(LLMProvider):
                 prompt,
                 generation_config=genai.GenerationConfig(
                     temperature=0.7,
-                    max_output_tokens=500,
+                    max_output_tokens=max_tokens,
+                    stop_sequences=stop,
                 ),
             )
 
@@ -0,0 +1,103 @@
+"""LLMプロバイダーで共有するHTTPクライアント
+
+同期クライアントはプロセス全体で1つを共有して TLS 接続を使い回す。
+非同期クライアントの接続はイベントループに紐づくため、ループごとに作成する
+（asyncio.run を繰り返し呼んでも、閉じたループの接続を使わないようにする）。
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+T = TypeVar("T")
+
+
+class LoopLocal(Generic[T]):
+    """イベントループごとに1つのオブジェクトを保持する
+
+    ループが破棄されると対応するオブジェクトも参照されなくなる。
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        """
+        Args:
+            factory: ループごとのオブジェクトを生成する関数
+        """
+        self._factory = factory
+        self._values: "weakref.WeakKeyDictionary[Any, T]" = weakref.WeakKeyDictionary()
+
+    def get(self) -> T:
+        """実行中のイベントループ用のオブジェクトを取得
+
+        Raises:
+            RuntimeError: イベントループの外から呼ばれた場合
+        """
+        loop = asyncio.get_running_loop()
+        value = self._values.get(loop)
+        if value is None:
+            value = self._values[loop] = self._factory()
+        return value
+
+
+class SharedHttpClients:
+    """SDK ごとの共有HTTPクライアント（h2 があれば HTTP/2 で多重化する）"""
+
+    def __init__(
+        self,
+        sync_client_class: Optional[Callable[..., Any]],
+        async_client_class: Optional[Callable[..., Any]],
+        max_connections: int,
+        max_keepalive_connections: int,
+    ):
+        """
+        Args:
+            sync_client_class: SDK の同期 httpx クライアントのクラス（None で共有しない）
+            async_client_class: SDK の非同期 httpx クライアントのクラス（None で共有しない）
+            max_connections: 接続プールの上限
+            max_keepalive_connections: keepalive で保持する接続数の上限
+        """
+        self.sync_client_class = sync_client_class
+        self.async_client_class = async_client_class
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._sync_client = None
+        self._lock = threading.Lock()
+        self._async_clients = LoopLocal(lambda: self.async_client_class(**self.options()))
+
+    def options(self) -> Dict[str, Any]:
+        """httpx クライアントの生成オプション"""
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+            ),
+        }
+
+    def get(self) -> Optional[Any]:
+        """プロセス共有の同期クライアントを取得（SDK が対応していなければNone）"""
+        if self._sync_client is None and self.sync_client_class is not None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = self.sync_client_class(**self.options())
+        return self._sync_client
+
+    def get_async(self) -> Optional[Any]:
+        """実行中のイベントループ用の非同期クライアントを取得（SDK が対応していなければNone）"""
+        if self.async_client_class is None:
+            return None
+        return self._async_clients.get()
+
+
+# エクスポート
+__all__ = ["HTTP2_AVAILABLE", "LoopLocal", "SharedHttpClients"]
@@ -1,33 +1,213 @@
 """OpenAI APIプロバイダー"""
 
+import asyncio
+import functools
+import json
 import logging
 import time
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 
-from openai import OpenAI
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    BadRequestError,
+    OpenAI,
+    RateLimitError,
+)
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
-from src.llm.providers.base_provider import LLMProvider
-from src.data.weather_data import WeatherForecast
+try:
+    # SDK 既定のタイムアウト・keepalive 設定を引き継いだ httpx クライアント
+    from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+    SHARED_HTTP_CLIENT_AVAILABLE = True
+except ImportError:
+    SHARED_HTTP_CLIENT_AVAILABLE = False
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+from src.exceptions import APIResponseError
+from src.llm.cache import LLMCache, SemanticCache
+from src.llm.concurrency import AsyncRateLimiter
+from src.llm.prompt_templates import COMMENT_GENERATION_STATIC_PROMPT, COMMENT_SYSTEM_PROMPT
+from src.llm.providers.base_provider import (
+    BULK_MAX_TOKENS_PER_PROMPT,
+    COMMENT_MAX_TOKENS,
+    COMMENT_STOP_SEQUENCES,
+    DEFAULT_COMMENT_TEMPERATURE,
+    DEFAULT_GENERATE_MAX_TOKENS,
+    LLMProvider,
+    cached_comment,
+    request_deadline_reached,
+)
+from src.llm.providers.http_clients import LoopLocal, SharedHttpClients
+from src.data.weather_data import WeatherCondition, WeatherForecast
 from src.data.comment_pair import CommentPair
 
 logger = logging.getLogger(__name__)
 
+# 全プロバイダーで共有するHTTP接続プールの上限
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+# 一括生成で1回のリクエストにまとめるプロンプト数の上限
+BULK_MAX_PROMPTS = 20
+# モデルごとの出力トークン数の上限（前方一致。長い接頭辞を先に並べる）
+MODEL_MAX_OUTPUT_TOKENS = (
+    ("gpt-4o-mini", 16384),
+    ("gpt-4o", 16384),
+    ("gpt-4-turbo", 4096),
+    ("gpt-4", 8192),
+    ("gpt-3.5-turbo", 4096),
+)
+# 上限が不明なモデルの出力トークン数の上限
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+# セマンティックキャッシュの検索に使う埋め込みモデル
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+# Batch API の完了期限と状態確認の間隔（秒）
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL_SECONDS = 30.0
+# Batch API の処理が終了したことを表す状態
+BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+# 再試行の対象とする一時的なエラー
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError)
+# API呼び出しの最大試行回数
+MAX_RETRY_ATTEMPTS = 5
+# 再試行までの待機時間の上限（秒）
+RETRY_MAX_WAIT_SECONDS = 30
+
+
+def _stop_at_request_deadline(retry_state: Any) -> bool:
+    """次の待機で呼び出し元の期限を過ぎるなら再試行をやめる
+
+    LLMManager がタイムアウトで結果を切り捨てた後も、レート制限中のプロバイダーへ
+    再試行し続けないようにする。
+    """
+    return request_deadline_reached(getattr(retry_state, "upcoming_sleep", 0.0))
+
+
+# 同時に失敗したリクエストが一斉に再試行しないよう、待機時間をランダムにずらす
+_retry_api_call = retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    wait=wait_random_exponential(multiplier=1, max=RETRY_MAX_WAIT_SECONDS),
+    stop=stop_after_attempt(MAX_RETRY_ATTEMPTS) | _stop_at_request_deadline,
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
+
+# system メッセージは全リクエストでバイト単位で同一に保ち、プロバイダー側の
+# プロンプトキャッシュ（先頭一致）が効くようにする。入力ごとに変わる内容は user メッセージへ
+COMMENT_SYSTEM_MESSAGE = f"{COMMENT_SYSTEM_PROMPT}\n\n{COMMENT_GENERATION_STATIC_PROMPT}"
+GENERATE_SYSTEM_PROMPT = "あなたは役立つアシスタントです。"
+# LLMを呼ばずに定型文で返す天気（降水がなく気温も穏やかな場合のみ使う）
+COMMENT_TEMPLATES: Dict[WeatherCondition, str] = {
+    WeatherCondition.CLEAR: "晴れて過ごしやすい",
+    WeatherCondition.PARTLY_CLOUDY: "時折日差しが届く",
+    WeatherCondition.CLOUDY: "雲の多い穏やかな日",
+}
+# 定型文を使う気温の範囲（℃）と降水量の上限（mm）
+TEMPLATE_TEMPERATURE_RANGE = (10.0, 30.0)
+TEMPLATE_MAX_PRECIPITATION = 0.1
+
+BULK_SYSTEM_PROMPT = (
+    "あなたは役立つアシスタントです。"
+    'ユーザーから {"requests": [依頼1, 依頼2, ...]} 形式のJSONで複数の依頼が渡されます。'
+    "各依頼に独立して回答し、"
+    '{"results": [回答1, 回答2, ...]} 形式のJSONのみを出力してください。'
+    "results の要素数と順序は requests と一致させてください。"
+)
+
+# プロセス全体で共有するHTTPクライアント（非同期クライアントはイベントループごと）
+_http_clients = SharedHttpClients(
+    DefaultHttpxClient if SHARED_HTTP_CLIENT_AVAILABLE else None,
+    DefaultAsyncHttpxClient if SHARED_HTTP_CLIENT_AVAILABLE else None,
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+
+def _max_output_tokens(model: str) -> int:
+    """モデルの出力トークン数の上限を取得"""
+    for prefix, max_tokens in MODEL_MAX_OUTPUT_TOKENS:
+        if model.startswith(prefix):
+            return max_tokens
+    return DEFAULT_MAX_OUTPUT_TOKENS
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    """トークン数の見積もりに使うエンコーディングを取得"""
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def _estimate_tokens(request: Dict[str, Any]) -> int:
+    """リクエストが消費するトークン数（プロンプト + 最大出力）を見積もる
+
+    tiktoken がない場合は文字数で代用する（日本語はおおむね1文字1トークン以上のため
+    多めの見積もりになる）。
+    """
+    text = "".join(message["content"] for message in request["messages"])
+    prompt_tokens = len(_get_encoding().encode(text)) if TIKTOKEN_AVAILABLE else len(text)
+    return prompt_tokens + request.get("max_tokens", 0)
+
 
 class OpenAIProvider(LLMProvider):
     """OpenAI APIを使用するプロバイダー"""
 
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-3.5-turbo",
+        response_cache: Optional[LLMCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        rate_limiter: Optional[AsyncRateLimiter] = None,
+        use_templates: bool = False,
+    ):
         """
         OpenAIプロバイダーの初期化。
 
         Args:
             api_key: OpenAI APIキー
             model: 使用するモデル名
+            response_cache: 同一リクエストの応答を再利用するキャッシュ（None で無効）。
+                temperature > 0 のリクエストは cache_sampled=True の場合のみ保存する
+            semantic_cache: プロンプトが類似したコメントを再利用するキャッシュ（None で無効）
+            embedding_model: semantic_cache の検索に使う埋め込みモデル
+            rate_limiter: 非同期呼び出しの同時実行数・RPM・TPM のリミッター（None で無制限）
+            use_templates: 穏やかな晴れ・曇りでは API を呼ばずに定型文を返すかどうか
         """
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, http_client=_http_clients.get())
+        # 非同期クライアントの接続はイベントループに紐づくため、ループごとに作成する
+        # （generate_comments_batch は呼び出しごとに asyncio.run で新しいループを使う）
+        self._async_clients = LoopLocal(
+            lambda: AsyncOpenAI(api_key=api_key, http_client=_http_clients.get_async())
+        )
         self.model = model
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.embedding_model = embedding_model
+        self.rate_limiter = rate_limiter
+        self.use_templates = use_templates
         logger.info(f"Initialized OpenAI provider with model: {model}")
 
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """実行中のイベントループ用の非同期クライアント"""
+        return self._async_clients.get()
+
+    @cached_comment
     def generate_comment(
         self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
     ) -> str:
@@ -42,99 +222,502 @@ class OpenAIProvider(LLMProvider):
         Returns:
             生成されたコメント
         """
-        max_retries = 3
-        retry_delay = 3  # 初期待機時間（秒）
+        template = self._try_template(weather_data, constraints)
+        if template is not None:
+            return template
 
-        for attempt in range(max_retries):
-            try:
-                # プロンプトの構築
-                prompt = self._build_prompt(weather_data, past_comments, constraints)
-
-                # APIリクエスト
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "あなたは天気予報のコメント作成の専門家です。短く、親しみやすいコメントを生成してください。",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.7,
-                    max_tokens=50,
-                    n=1,
-                )
-
-                # レスポンスからコメントを抽出
-                generated_comment = response.choices[0].message.content.strip()
-
-                # 改行や余分な記号を除去
-                generated_comment = generated_comment.replace("\n", "").strip('"')
-
-                logger.info(f"Generated comment: {generated_comment}")
-                return generated_comment
-
-            except Exception as e:
-                error_message = str(e)
-
-                # Rate limit errorの場合はリトライ
-                if "rate_limit_exceeded" in error_message or "429" in error_message:
-                    if attempt < max_retries - 1:
-                        wait_time = retry_delay * (2**attempt)  # 指数バックオフ
-                        logger.warning(f"Rate limit exceeded. Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-                        continue
-
-                logger.error(f"Error in OpenAI API call: {error_message}")
-                raise
-
-    def generate(self, prompt: str) -> str:
+        request = self._comment_request(weather_data, past_comments, constraints)
+        scope = self._semantic_scope(weather_data)
+        embedding, cached = self._semantic_lookup(request, scope)
+        if cached is not None:
+            return self._clean_comment(cached)
+
+        try:
+            content = self._cached_create(request)
+        except Exception as e:
+            logger.error(f"Error in OpenAI API call: {str(e)}")
+            raise
+
+        self._semantic_store(embedding, content, scope)
+        return self._clean_comment(content)
+
+    @cached_comment
+    async def agenerate_comment(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> str:
+        """
+        非同期クライアントを使用してコメントを生成。
+
+        イベントループを止めないため、複数地点を agenerate_comments で並行に生成できる。
+
+        Args:
+            weather_data: 天気予報データ
+            past_comments: 過去のコメントペア
+            constraints: 制約条件
+
+        Returns:
+            生成されたコメント
+        """
+        template = self._try_template(weather_data, constraints)
+        if template is not None:
+            return template
+
+        request = self._comment_request(weather_data, past_comments, constraints)
+        scope = self._semantic_scope(weather_data)
+        embedding, cached = await self._asemantic_lookup(request, scope)
+        if cached is not None:
+            return self._clean_comment(cached)
+
+        try:
+            content = await self._acached_create(request)
+        except Exception as e:
+            logger.error(f"Error in OpenAI API call: {str(e)}")
+            raise
+
+        self._semantic_store(embedding, content, scope)
+        return self._clean_comment(content)
+
+    def _try_template(
+        self, weather_data: WeatherForecast, constraints: Dict[str, Any]
+    ) -> Optional[str]:
+        """
+        LLMを呼ぶまでもない穏やかな天気であれば定型文のコメントを返す。
+
+        Args:
+            weather_data: 天気予報データ
+            constraints: 制約条件
+
+        Returns:
+            定型文のコメント（該当しない場合はNone）
+        """
+        if not self.use_templates:
+            return None
+
+        template = COMMENT_TEMPLATES.get(weather_data.weather_condition)
+        if template is None:
+            return None
+
+        min_temperature, max_temperature = TEMPLATE_TEMPERATURE_RANGE
+        if weather_data.precipitation > TEMPLATE_MAX_PRECIPITATION or not (
+            min_temperature <= weather_data.temperature <= max_temperature
+        ):
+            return None
+
+        if len(template) > constraints.get("max_length", 15) or any(
+            ng_word in template for ng_word in constraints.get("ng_words", ())
+        ):
+            return None
+
+        logger.info(f"Using template comment for {weather_data.weather_condition.value}")
+        return template
+
+    def _comment_request(
+        self, weather_data: WeatherForecast, past_comments: CommentPair, constraints: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """コメント生成リクエストのパラメータを構築
+
+        固定の指示は COMMENT_SYSTEM_MESSAGE に含めて system メッセージとし、
+        地点・天気・時間帯など入力ごとに変わる内容は必ず user メッセージに入れる。
+        """
+        _, dynamic_prompt = self._build_prompt_parts(weather_data, past_comments, constraints)
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": COMMENT_SYSTEM_MESSAGE},
+                {"role": "user", "content": dynamic_prompt},
+            ],
+            "temperature": constraints.get("temperature", DEFAULT_COMMENT_TEMPERATURE),
+            "max_tokens": COMMENT_MAX_TOKENS,
+            "stop": COMMENT_STOP_SEQUENCES,
+            "n": 1,
+        }
+
+    def _semantic_scope(self, weather_data: WeatherForecast) -> str:
+        """セマンティックキャッシュの検索範囲（地点・天気・気温帯）を取得"""
+        if self.semantic_cache is None:
+            return ""
+        return self.semantic_cache.scope_key(
+            weather_data.location, weather_data.weather_condition, weather_data.temperature
+        )
+
+    def _semantic_lookup(
+        self, request: Dict[str, Any], scope: str
+    ) -> Tuple[Optional[List[float]], Optional[str]]:
+        """
+        プロンプトを埋め込み、セマンティックキャッシュの同じ scope から類似した生成結果を検索する。
+
+        Args:
+            request: chat.completions.create に渡すパラメータ
+            scope: 検索範囲（_semantic_scope で取得する）
+
+        Returns:
+            (プロンプトの埋め込み, キャッシュ済みの生成結果) のタプル
+            （キャッシュ無効・埋め込み失敗時は埋め込みもNone）
+        """
+        if self.semantic_cache is None:
+            return None, None
+
+        try:
+            response = self.client.embeddings.create(
+                model=self.embedding_model, input=request["messages"][-1]["content"]
+            )
+        except Exception as e:
+            # 埋め込みの失敗で生成自体を止めない
+            logger.warning(f"Embedding for semantic cache failed: {str(e)}")
+            return None, None
+
+        embedding = response.data[0].embedding
+        return embedding, self.semantic_cache.lookup(embedding, scope)
+
+    async def _asemantic_lookup(
+        self, request: Dict[str, Any], scope: str
+    ) -> Tuple[Optional[List[float]], Optional[str]]:
+        """_semantic_lookup の非同期版"""
+        if self.semantic_cache is None:
+            return None, None
+
+        try:
+            response = await self.async_client.embeddings.create(
+                model=self.embedding_model, input=request["messages"][-1]["content"]
+            )
+        except Exception as e:
+            logger.warning(f"Embedding for semantic cache failed: {str(e)}")
+            return None, None
+
+        embedding = response.data[0].embedding
+        return embedding, self.semantic_cache.lookup(embedding, scope)
+
+    def _semantic_store(self, embedding: Optional[List[float]], content: str, scope: str) -> None:
+        """生成結果をセマンティックキャッシュに保存（埋め込みがない場合は何もしない）"""
+        if embedding is not None:
+            self.semantic_cache.add(embedding, content, scope)
+
+    def _response_cache_key(self, request: Dict[str, Any]) -> Optional[str]:
+        """リクエストの応答キャッシュのキーを生成（キャッシュ対象外の場合はNone）"""
+        if self.response_cache is None:
+            return None
+
+        payload = {"messages": request["messages"], "max_tokens": request["max_tokens"]}
+        if "stop" in request:
+            payload["stop"] = request["stop"]
+        return self.response_cache.cache_key(
+            "openai", request["model"], request["temperature"], payload
+        )
+
+    @_retry_api_call
+    def _create(self, request: Dict[str, Any]) -> Any:
+        """Chat Completions APIを呼び出す（一時的なエラーはジッター付き指数バックオフで再試行）"""
+        return self.client.chat.completions.create(**request)
+
+    @_retry_api_call
+    async def _acreate(self, request: Dict[str, Any]) -> Any:
+        """_create の非同期版（rate_limiter の指定時はスロットを確保してから送信）"""
+        if self.rate_limiter is None:
+            return await self.async_client.chat.completions.create(**request)
+
+        async with self.rate_limiter.slot(_estimate_tokens(request)):
+            return await self.async_client.chat.completions.create(**request)
+
+    def _cached_create(self, request: Dict[str, Any]) -> str:
+        """
+        Chat Completions APIを呼び出し、応答テキストを返す。
+
+        同一リクエストの応答がキャッシュにあれば API を呼ばずに返す。
+
+        Args:
+            request: chat.completions.create に渡すパラメータ
+
+        Returns:
+            応答テキスト
+        """
+        key = self._response_cache_key(request)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        content = self._create(request).choices[0].message.content
+        if key is not None:
+            self.response_cache.set(key, content)
+        return content
+
+    async def _acached_create(self, request: Dict[str, Any]) -> str:
+        """_cached_create の非同期版"""
+        key = self._response_cache_key(request)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        content = (await self._acreate(request)).choices[0].message.content
+        if key is not None:
+            self.response_cache.set(key, content)
+        return content
+
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = DEFAULT_GENERATE_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> str:
         """
         汎用的なテキスト生成を行う。
 
         Args:
             prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数（大きくするとレイテンシのばらつきも大きくなる）
+            stop: 生成を止める文字列のリスト
 
         Returns:
             生成されたテキスト
         """
-        max_retries = 3
-        retry_delay = 3  # 初期待機時間（秒）
+        logger.info(f"Generating text with OpenAI {self.model}")
+
+        try:
+            generated_text = self._cached_create(self._generate_request(prompt, max_tokens, stop))
+        except Exception as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise
+
+        logger.info(f"Generated text: {generated_text[:100]}...")
+        return generated_text
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        max_tokens: int = DEFAULT_GENERATE_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        汎用的なテキスト生成をストリーミングで行う。
+
+        生成されたトークンを受信した順に返すため、全文の生成を待たずに表示を始められる。
+
+        Args:
+            prompt: プロンプト文字列
+            max_tokens: 最大出力トークン数
+            stop: 生成を止める文字列のリスト
+
+        Yields:
+            生成されたテキストの断片
+        """
+        request = self._generate_request(prompt, max_tokens, stop)
+        key = self._response_cache_key(request)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks: List[str] = []
+        stream = await self._acreate({**request, "stream": True})
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks.append(delta)
+                yield delta
+
+        if key is not None:
+            self.response_cache.set(key, "".join(chunks))
+
+    def _generate_request(
+        self,
+        prompt: str,
+        max_tokens: int = DEFAULT_GENERATE_MAX_TOKENS,
+        stop: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """汎用生成リクエストのパラメータを構築（入力ごとの内容は user メッセージのみに入れる）"""
+        request = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": GENERATE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.7,
+            "max_tokens": max_tokens,
+        }
+        if stop:
+            request["stop"] = stop
+        return request
+
+    def generate_comments_batch(
+        self,
+        items: List[Dict[str, Any]],
+        offline: bool = False,
+        poll_interval: float = BATCH_POLL_INTERVAL_SECONDS,
+        timeout: Optional[float] = None,
+    ) -> List[str]:
+        """
+        複数地点の天気コメントを生成する。
+
+        offline=True の場合は Batch API（料金半額・RPM制限の対象外、完了まで最大24時間）に
+        まとめて投入し、完了を待って結果を取得する。それ以外は非同期クライアントで
+        並行して生成する。
+
+        Args:
+            items: generate_comment の引数（weather_data, past_comments, constraints）の辞書のリスト
+            offline: Batch API を使用するか（夜間の一括生成など待ち時間を許容できる場合）
+            poll_interval: Batch API の状態確認の間隔（秒）
+            timeout: Batch API の完了を待つ時間の上限（秒、None で完了期限まで待つ）
+
+        Returns:
+            items と同じ順序の生成コメント
+        """
+        if not offline:
+            results = asyncio.run(self.agenerate_comments(items))
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            return results
+
+        comments = self._run_comment_batch(items, poll_interval, timeout)
+        # Batch API で失敗した分は個別に生成する
+        return [
+            comments.get(f"req-{index}") or self.generate_comment(**item)
+            for index, item in enumerate(items)
+        ]
+
+    def _run_comment_batch(
+        self, items: List[Dict[str, Any]], poll_interval: float, timeout: Optional[float]
+    ) -> Dict[str, str]:
+        """
+        コメント生成リクエストを Batch API で実行する。
+
+        Args:
+            items: generate_comment の引数の辞書のリスト
+            poll_interval: 状態確認の間隔（秒）
+            timeout: 完了を待つ時間の上限（秒、None で無制限）
+
+        Returns:
+            custom_id（"req-<items のインデックス>"）から生成コメントへの対応（成功分のみ）
+
+        Raises:
+            TimeoutError: timeout までに完了しなかった場合（バッチは取り消す）
+            APIResponseError: バッチが失敗・期限切れになった場合
+        """
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": f"req-{index}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._comment_request(**item),
+                },
+                ensure_ascii=False,
+            )
+            for index, item in enumerate(items)
+        ]
+        input_file = self.client.files.create(
+            file=("comments.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(items)} comment requests")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            if deadline is not None and time.monotonic() >= deadline:
+                self.client.batches.cancel(batch.id)
+                raise TimeoutError(f"Batch {batch.id} did not finish within {timeout} seconds")
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise APIResponseError(f"Batch {batch.id} ended with status: {batch.status}")
+
+        comments: Dict[str, str] = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                custom_id, error = record.get("custom_id"), record.get("error")
+                logger.warning(f"Batch request {custom_id} failed: {error}")
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            comments[record["custom_id"]] = self._clean_comment(content)
+
+        logger.info(f"Batch {batch.id} completed: {len(comments)}/{len(items)} succeeded")
+        return comments
+
+    def generate_bulk(self, prompts: List[str]) -> List[str]:
+        """
+        複数のプロンプトをまとめて処理する。
+
+        BULK_MAX_PROMPTS 件（出力トークン数がモデルの上限に収まる件数）ずつ
+        1回のAPI呼び出しに詰めて送信し、リクエスト数を削減する。
+        応答の件数が合わないなど解析できなかった分や、API が要求を拒否した分は
+        generate() で個別に処理する。
 
-        for attempt in range(max_retries):
+        Args:
+            prompts: プロンプト文字列のリスト
+
+        Returns:
+            prompts と同じ順序の生成テキスト
+        """
+        max_output_tokens = _max_output_tokens(self.model)
+        chunk_size = max(1, min(BULK_MAX_PROMPTS, max_output_tokens // BULK_MAX_TOKENS_PER_PROMPT))
+
+        results: List[str] = []
+        for start in range(0, len(prompts), chunk_size):
+            chunk = prompts[start : start + chunk_size]
             try:
-                logger.info(
-                    f"Generating text with OpenAI {self.model} (attempt {attempt + 1}/{max_retries})"
-                )
-
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "あなたは役立つアシスタントです。"},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.7,
-                    max_tokens=500,
-                )
-
-                generated_text = response.choices[0].message.content
-                logger.info(f"Generated text: {generated_text[:100]}...")
-
-                return generated_text
-
-            except Exception as e:
-                error_message = str(e)
-
-                # Rate limit errorの場合はリトライ
-                if "rate_limit_exceeded" in error_message or "429" in error_message:
-                    if attempt < max_retries - 1:
-                        wait_time = retry_delay * (2**attempt)  # 指数バックオフ
-                        logger.warning(f"Rate limit exceeded. Retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
-                        continue
-
-                logger.error(f"OpenAI API error: {error_message}")
-                raise
+                results.extend(self._generate_bulk_chunk(chunk))
+            except BadRequestError as e:
+                logger.warning(f"Bulk request was rejected, falling back: {str(e)}")
+                results.extend(self._generate_each(chunk))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Bulk response could not be parsed, falling back: {str(e)}")
+                results.extend(self._generate_each(chunk))
+        return results
+
+    def _generate_each(self, prompts: List[str]) -> List[str]:
+        """一括生成できなかったプロンプトを、一括生成と同じ出力上限で1件ずつ生成"""
+        return [self.generate(prompt, max_tokens=BULK_MAX_TOKENS_PER_PROMPT) for prompt in prompts]
+
+    def _generate_bulk_chunk(self, prompts: List[str]) -> List[str]:
+        """
+        プロンプト群を1回のAPI呼び出しで処理する。
+
+        Args:
+            prompts: プロンプト文字列のリスト
+
+        Returns:
+            prompts と同じ順序の生成テキスト
+
+        Raises:
+            ValueError: 応答が期待した形式でない場合
+        """
+        response = self._create(
+            {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": BULK_SYSTEM_PROMPT},
+                    {
+                        "role": "user",
+                        "content": json.dumps({"requests": prompts}, ensure_ascii=False),
+                    },
+                ],
+                "temperature": 0.7,
+                "max_tokens": min(
+                    BULK_MAX_TOKENS_PER_PROMPT * len(prompts), _max_output_tokens(self.model)
+                ),
+                "response_format": {"type": "json_object"},
+            }
+        )
+
+        results = json.loads(response.choices[0].message.content)["results"]
+        if not isinstance(results, list) or len(results) != len(prompts):
+            raise ValueError(f"Expected {len(prompts)} results, got {results!r:.100}")
+
+        return [str(result) for result in results]
 
 
 # エクスポート
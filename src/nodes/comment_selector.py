@@ -1,6 +1,8 @@
 """コメント選択ロジックを分離したクラス"""
 
+import asyncio
 import logging
+import re
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple
 
@@ -17,6 +19,17 @@ from src.utils.common_utils import SEVERE_WEATHER_PATTERNS, FORBIDDEN_PHRASES
 
 logger = logging.getLogger(__name__)
 
+# 悪天候・雨天に適したコメントのキーワード
+# （件数が少ないため Aho-Corasick ではなく、1回の走査で済む正規表現の選択にまとめる）
+_SEVERE_WEATHER_KEYWORDS_RE = re.compile("雨|荒れ|心配|警戒|注意|傘|安全")
+_RAIN_WEATHER_KEYWORDS_RE = re.compile("雨|荒れ|心配|警戒|注意")
+_RAIN_ADVICE_KEYWORDS_RE = re.compile("傘|雨|濡れ|注意|安全|室内")
+# 雨天に不適切な表現
+_RAIN_WEATHER_FORBIDDEN = frozenset(["穏やか", "過ごしやすい", "快適", "爽やか"])
+_RAIN_ADVICE_FORBIDDEN = frozenset(["過ごしやすい", "快適", "お出かけ", "散歩"])
+# LLMによる選択の最大出力トークン数（全候補を1回で提示し、番号のみを返させる）
+SELECTION_MAX_TOKENS = 8
+
 
 class CommentSelector:
     """コメント選択クラス"""
@@ -35,7 +48,30 @@ class CommentSelector:
         target_datetime: datetime,
         state: Optional[CommentGenerationState] = None
     ) -> Optional[CommentPair]:
-        """最適なコメントペアを選択"""
+        """最適なコメントペアを選択
+
+        実行中のイベントループ内からは aselect_optimal_comment_pair を使用すること。
+        """
+        return asyncio.run(
+            self.aselect_optimal_comment_pair(
+                weather_comments, advice_comments, weather_data,
+                location_name, target_datetime, state
+            )
+        )
+
+    async def aselect_optimal_comment_pair(
+        self, 
+        weather_comments: List[PastComment], 
+        advice_comments: List[PastComment], 
+        weather_data: WeatherForecast, 
+        location_name: str, 
+        target_datetime: datetime,
+        state: Optional[CommentGenerationState] = None
+    ) -> Optional[CommentPair]:
+        """最適なコメントペアを選択（非同期版）
+
+        天気コメントとアドバイスコメントのLLM選択は互いに独立しているため並行して実行する。
+        """
         
         # 事前フィルタリング
         filtered_weather = self.validator.get_weather_appropriate_comments(
@@ -48,12 +84,14 @@ class CommentSelector:
         logger.info(f"フィルタリング結果 - 天気: {len(weather_comments)} -> {len(filtered_weather)}")
         logger.info(f"フィルタリング結果 - アドバイス: {len(advice_comments)} -> {len(filtered_advice)}")
         
-        # 最適なコメントを選択
-        best_weather = self._select_best_weather_comment(
-            filtered_weather, weather_data, location_name, target_datetime, state
-        )
-        best_advice = self._select_best_advice_comment(
-            filtered_advice, weather_data, location_name, target_datetime, state
+        # 最適なコメントを選択（天気・アドバイスを並行して選択）
+        best_weather, best_advice = await asyncio.gather(
+            self._select_best_weather_comment(
+                filtered_weather, weather_data, location_name, target_datetime, state
+            ),
+            self._select_best_advice_comment(
+                filtered_advice, weather_data, location_name, target_datetime, state
+            ),
         )
         
         if not best_weather or not best_advice:
@@ -80,7 +118,7 @@ class CommentSelector:
             selection_reason="LLMによる最適選択",
         )
     
-    def _select_best_weather_comment(
+    async def _select_best_weather_comment(
         self, 
         comments: List[PastComment], 
         weather_data: WeatherForecast, 
@@ -98,14 +136,14 @@ class CommentSelector:
             logger.warning("天気コメント候補が空です")
             return None
             
-        selected_comment = self._llm_select_comment(
+        selected_comment = await self._llm_select_comment(
             candidates, weather_data, location_name, target_datetime, 
             CommentType.WEATHER_COMMENT, state
         )
         
         return selected_comment
 
-    def _select_best_advice_comment(
+    async def _select_best_advice_comment(
         self, 
         comments: List[PastComment], 
         weather_data: WeatherForecast, 
@@ -123,7 +161,7 @@ class CommentSelector:
             logger.warning("アドバイスコメント候補が空です")
             return None
             
-        selected_comment = self._llm_select_comment(
+        selected_comment = await self._llm_select_comment(
             candidates, weather_data, location_name, target_datetime, 
             CommentType.ADVICE, state
         )
@@ -136,12 +174,23 @@ class CommentSelector:
         weather_data: WeatherForecast
     ) -> List[Dict[str, Any]]:
         """天気コメント候補を準備"""
-        candidates = []
+        severe_limit, weather_limit, others_limit = self._get_weather_candidate_limits()
         severe_matched = []
         weather_matched = []
         others = []
         
+        # ループ内で変わらない値は先に求めておく
+        is_severe = self.severe_config.is_severe_weather(weather_data.weather_condition)
+        weather_description_lower = weather_data.weather_description.lower()
+        # 天気条件ごとのマッチ結果（同じ天気条件のコメントが多いため、判定は条件ごとに1回だけ）
+        matched_by_condition: Dict[Optional[str], bool] = {}
+        
         for i, comment in enumerate(comments):
+            # 全カテゴリが上限に達したら、以降の候補は切り捨てられるだけなので打ち切る
+            if (len(weather_matched) >= weather_limit and len(others) >= others_limit
+                    and (not is_severe or len(severe_matched) >= severe_limit)):
+                break
+            
             # バリデーターによる除外チェック（強化版）
             is_valid, reason = self.validator.validate_comment(comment, weather_data)
             if not is_valid:
@@ -164,21 +213,31 @@ class CommentSelector:
                 original_index=i
             )
             
+            condition = comment.weather_condition
+            is_matched = matched_by_condition.get(condition)
+            if is_matched is None:
+                is_matched = matched_by_condition[condition] = self._is_weather_matched(
+                    condition, weather_description_lower
+                )
+            
             # 悪天候時の特別な優先順位付け
-            if self.severe_config.is_severe_weather(weather_data.weather_condition):
-                if self._is_severe_weather_appropriate(comment.comment_text, weather_data):
-                    severe_matched.append(candidate)
-                elif self._is_weather_matched(comment.weather_condition, weather_data.weather_description):
-                    weather_matched.append(candidate)
-                else:
-                    others.append(candidate)
+            if is_severe and self._is_severe_weather_appropriate(
+                comment.comment_text, weather_data
+            ):
+                severe_matched.append(candidate)
+            elif is_matched:
+                weather_matched.append(candidate)
             else:
-                if self._is_weather_matched(comment.weather_condition, weather_data.weather_description):
-                    weather_matched.append(candidate)
-                else:
-                    others.append(candidate)
+                others.append(candidate)
         
-        # 優先順位順に結合（設定ファイルから制限を取得）
+        # 優先順位順に結合
+        return (
+            severe_matched[:severe_limit] + weather_matched[:weather_limit] + others[:others_limit]
+        )
+    
+    def _get_weather_candidate_limits(self) -> Tuple[int, int, int]:
+        """天気コメント候補のカテゴリ別の上限（悪天候, 天気マッチ, その他）を取得"""
+        # 設定ファイルから制限を取得
         from src.config.config_loader import load_config
         try:
             config = load_config('weather_thresholds', validate=False)
@@ -201,9 +260,7 @@ class CommentSelector:
         weather_limit = int(limit * weather_ratio) 
         others_limit = limit - severe_limit - weather_limit
         
-        candidates = (severe_matched[:severe_limit] + weather_matched[:weather_limit] + others[:others_limit])
-        
-        return candidates
+        return severe_limit, weather_limit, others_limit
     
     def _prepare_advice_candidates(
         self, 
@@ -306,8 +363,9 @@ class CommentSelector:
     ) -> Optional[PastComment]:
         """雨天に適した天気コメントを検索"""
         for comment in comments:
-            if (any(keyword in comment.comment_text for keyword in ["雨", "荒れ", "心配", "警戒", "注意"]) and
-                not any(forbidden in comment.comment_text for forbidden in ["穏やか", "過ごしやすい", "快適", "爽やか"])):
+            text = comment.comment_text
+            if (_RAIN_WEATHER_KEYWORDS_RE.search(text) and
+                not any(forbidden in text for forbidden in _RAIN_WEATHER_FORBIDDEN)):
                 return comment
         return None
     
@@ -318,9 +376,10 @@ class CommentSelector:
     ) -> Optional[PastComment]:
         """雨天に適したアドバイスコメントを検索"""
         for comment in comments:
-            if (any(keyword in comment.comment_text for keyword in ["傘", "雨", "濡れ", "注意", "安全", "室内"]) and
-                not any(forbidden in comment.comment_text for forbidden in ["過ごしやすい", "快適", "お出かけ", "散歩"]) and
-                not self._should_exclude_advice_comment(comment.comment_text, weather_data)):
+            text = comment.comment_text
+            if (_RAIN_ADVICE_KEYWORDS_RE.search(text) and
+                not any(forbidden in text for forbidden in _RAIN_ADVICE_FORBIDDEN) and
+                not self._should_exclude_advice_comment(text, weather_data)):
                 return comment
         return None
     
@@ -513,14 +572,15 @@ class CommentSelector:
     
     def _is_severe_weather_appropriate(self, comment_text: str, weather_data: WeatherForecast) -> bool:
         """悪天候に適したコメントかチェック"""
-        severe_keywords = ["雨", "荒れ", "心配", "警戒", "注意", "傘", "安全"]
-        return any(keyword in comment_text for keyword in severe_keywords)
+        return _SEVERE_WEATHER_KEYWORDS_RE.search(comment_text) is not None
     
-    def _is_weather_matched(self, comment_condition: Optional[str], weather_description: str) -> bool:
-        """天気条件がマッチするかチェック"""
+    def _is_weather_matched(
+        self, comment_condition: Optional[str], weather_description_lower: str
+    ) -> bool:
+        """天気条件がマッチするかチェック（天気の説明は小文字化済みのものを渡す）"""
         if not comment_condition:
             return False
-        return comment_condition.lower() in weather_description.lower()
+        return comment_condition.lower() in weather_description_lower
     
     def _create_candidate_dict(self, index: int, comment: PastComment, original_index: int) -> Dict[str, Any]:
         """候補辞書を作成"""
@@ -533,7 +593,7 @@ class CommentSelector:
             'comment_object': comment  # 元のcommentオブジェクトを保持
         }
     
-    def _llm_select_comment(
+    async def _llm_select_comment(
         self,
         candidates: List[Dict[str, Any]],
         weather_data: WeatherForecast,
@@ -555,7 +615,7 @@ class CommentSelector:
             logger.info(f"LLM選択開始: {len(candidates)}件の候補から選択中...")
             
             # LLMによる選択を実行
-            selected_candidate = self._perform_llm_selection(
+            selected_candidate = await self._perform_llm_selection(
                 candidates, weather_data, location_name, target_datetime, comment_type
             )
             
@@ -573,7 +633,7 @@ class CommentSelector:
             # エラー時は最初の候補を返す
             return candidates[0]['comment_object']
     
-    def _perform_llm_selection(
+    async def _perform_llm_selection(
         self,
         candidates: List[Dict[str, Any]],
         weather_data: WeatherForecast,
@@ -596,7 +656,7 @@ class CommentSelector:
             logger.debug(f"プロンプト内容: {prompt[:200]}...")
             
             # LLMに選択を依頼
-            response = self.llm_manager.generate(prompt)
+            response = await self.llm_manager.agenerate(prompt, max_tokens=SELECTION_MAX_TOKENS)
             
             logger.info(f"LLMレスポンス: {response}")
             
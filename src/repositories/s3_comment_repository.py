@@ -446,7 +446,10 @@ class S3CommentRepository:
                             weather_data["weather_condition"] = "不明"
 
                     try:
-                        weather_comment = PastComment.from_dict(weather_data, source_file)
+                        # weather_data はこの行専用に作成した辞書なのでコピーせず保持する
+                        weather_comment = PastComment.from_dict(
+                            weather_data, source_file, copy_raw=False
+                        )
                         comments.append(weather_comment)
                     except Exception as e:
                         logger.debug(f"Weather comment creation failed: {str(e)}")
@@ -475,7 +478,9 @@ class S3CommentRepository:
                         advice_data["weather_condition"] = "不明"
 
                     try:
-                        advice_comment = PastComment.from_dict(advice_data, source_file)
+                        advice_comment = PastComment.from_dict(
+                            advice_data, source_file, copy_raw=False
+                        )
                         comments.append(advice_comment)
                     except Exception as e:
                         logger.debug(f"Advice comment creation failed: {str(e)}")
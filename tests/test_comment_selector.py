@@ -0,0 +1,144 @@
+"""
+コメント選択クラスのテスト
+"""
+
+import asyncio
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from src.data.past_comment import CommentType, PastComment
+from src.nodes.comment_selector import SELECTION_MAX_TOKENS, CommentSelector
+
+
+def _make_comment(text, comment_type):
+    """テスト用の過去コメントを作成"""
+    return PastComment(
+        location="東京",
+        datetime=datetime(2024, 1, 1, 9, 0),
+        weather_condition="晴れ",
+        comment_text=text,
+        comment_type=comment_type,
+    )
+
+
+class TestCommentSelector:
+    """CommentSelector クラスのテスト"""
+
+    def test_weather_and_advice_selected_concurrently(self):
+        """天気・アドバイスのLLM選択が並行して実行されるテスト"""
+        weather = [_make_comment(t, CommentType.WEATHER_COMMENT) for t in ["晴れ", "快晴"]]
+        advice = [_make_comment(t, CommentType.ADVICE) for t in ["日焼け対策", "水分補給"]]
+        in_flight = 0
+        max_in_flight = 0
+        requested_max_tokens = []
+
+        async def agenerate(prompt, max_tokens=None):
+            nonlocal in_flight, max_in_flight
+            requested_max_tokens.append(max_tokens)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return "1"
+
+        llm_manager = MagicMock()
+        llm_manager.agenerate = agenerate
+        validator = MagicMock()
+        validator.get_weather_appropriate_comments.side_effect = lambda comments, *a, **k: comments
+        selector = CommentSelector(llm_manager, validator)
+
+        def candidates(comments, weather_data):
+            return [
+                selector._create_candidate_dict(i, comment, i) for i, comment in enumerate(comments)
+            ]
+
+        with (
+            patch.object(selector, "_prepare_weather_candidates", side_effect=candidates),
+            patch.object(selector, "_prepare_advice_candidates", side_effect=candidates),
+            patch.object(selector, "_format_weather_context", return_value=""),
+            patch.object(selector, "_validate_comment_pair", return_value=True),
+        ):
+            pair = selector.select_optimal_comment_pair(
+                weather, advice, MagicMock(), "東京", datetime(2024, 1, 1, 9, 0)
+            )
+
+        assert pair.weather_comment is weather[1]
+        assert pair.advice_comment is advice[1]
+        assert max_in_flight == 2
+        # 全候補を1回で提示し、番号のみの短い出力を要求する
+        assert requested_max_tokens == [SELECTION_MAX_TOKENS, SELECTION_MAX_TOKENS]
+
+    def test_rain_appropriate_comments(self):
+        """雨天向けキーワードを含み、不適切な表現を含まないコメントを選ぶテスト"""
+        selector = CommentSelector(MagicMock(), MagicMock())
+        weather = [_make_comment(t, CommentType.WEATHER_COMMENT) for t in ["穏やかな雨", "雨が心配"]]
+        advice = [_make_comment(t, CommentType.ADVICE) for t in ["お出かけに傘を", "傘をお忘れなく"]]
+
+        with patch.object(selector, "_should_exclude_advice_comment", return_value=False):
+            assert selector._find_rain_appropriate_advice_comment(advice, MagicMock()) is advice[1]
+        assert selector._find_rain_appropriate_weather_comment(weather) is weather[1]
+        assert selector._is_severe_weather_appropriate("荒れた天気", MagicMock())
+        assert not selector._is_severe_weather_appropriate("晴れて爽やか", MagicMock())
+
+    def test_weather_candidates_stop_when_all_categories_full(self):
+        """全カテゴリが上限に達したら残りのコメントは検証せずに打ち切るテスト"""
+        validator = MagicMock()
+        validator.validate_comment.return_value = (True, "")
+        selector = CommentSelector(MagicMock(), validator)
+        selector.severe_config = MagicMock()
+        selector.severe_config.is_severe_weather.return_value = False
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime(2024, 1, 1, 9, 0),
+                weather_condition=condition,
+                comment_text=f"コメント{i}",
+                comment_type=CommentType.WEATHER_COMMENT,
+            )
+            for i, condition in enumerate(["晴れ", "晴れ", "曇り", "晴れ", "曇り"])
+        ]
+        weather_data = MagicMock(weather_description="晴れ")
+
+        with (
+            patch.object(selector, "_get_weather_candidate_limits", return_value=(1, 1, 1)),
+            patch.object(selector, "_is_sunny_weather_with_changeable_comment", return_value=False),
+            patch.object(selector, "_should_exclude_weather_comment", return_value=False),
+        ):
+            candidates = selector._prepare_weather_candidates(comments, weather_data)
+
+        assert [c["comment_object"] for c in candidates] == [comments[0], comments[2]]
+        assert validator.validate_comment.call_count == 3
+
+    def test_weather_match_evaluated_once_per_condition(self):
+        """天気条件のマッチ判定が同じ条件のコメントで繰り返されないテスト"""
+        validator = MagicMock()
+        validator.validate_comment.return_value = (True, "")
+        selector = CommentSelector(MagicMock(), validator)
+        selector.severe_config = MagicMock()
+        selector.severe_config.is_severe_weather.return_value = False
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime(2024, 1, 1, 9, 0),
+                weather_condition=condition,
+                comment_text=f"コメント{i}",
+                comment_type=CommentType.WEATHER_COMMENT,
+            )
+            for i, condition in enumerate(["晴れ", "曇り", "晴れ", "曇り", "晴れ"])
+        ]
+        weather_data = MagicMock(weather_description="晴れ")
+
+        with (
+            patch.object(selector, "_get_weather_candidate_limits", return_value=(10, 10, 10)),
+            patch.object(selector, "_is_sunny_weather_with_changeable_comment", return_value=False),
+            patch.object(selector, "_should_exclude_weather_comment", return_value=False),
+            patch.object(
+                selector, "_is_weather_matched", wraps=selector._is_weather_matched
+            ) as is_weather_matched,
+        ):
+            candidates = selector._prepare_weather_candidates(comments, weather_data)
+
+        assert [c["comment_object"] for c in candidates] == [
+            comments[0], comments[2], comments[4], comments[1], comments[3]
+        ]
+        assert is_weather_matched.call_count == 2
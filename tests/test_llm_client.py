@@ -0,0 +1,205 @@
+"""
+LLMクライアントのテスト
+"""
+
+import asyncio
+import dataclasses
+import json
+import time
+
+import pytest
+from unittest.mock import MagicMock
+
+from src.llm.llm_client import (
+    AnthropicClient,
+    GeminiClient,
+    LLMConfig,
+    OpenAIClient,
+    TokenBucket,
+    get_rate_limit_bucket,
+    rate_limit,
+)
+
+
+class TestLLMConfig:
+    """LLMConfig のテスト"""
+
+    def test_frozen_and_hashable(self):
+        """変更不可で、キャッシュのキーに使える"""
+        config = LLMConfig(model="gpt-4", additional_params={"top_p": 0.9})
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            config.model = "gpt-3.5-turbo"
+        assert hash(config) == hash(LLMConfig(model="gpt-4"))
+        assert config != LLMConfig(model="gpt-4")
+
+    def test_additional_params_are_not_shared(self):
+        """additional_params の既定値はインスタンスごとに別の辞書"""
+        first = LLMConfig(model="gpt-4")
+        second = LLMConfig(model="gpt-4")
+
+        assert first.additional_params == {}
+        assert first.additional_params is not second.additional_params
+
+
+class TestTokenBucket:
+    """TokenBucket のテスト"""
+
+    def test_burst_up_to_capacity(self):
+        """容量分は待たずに取得できる"""
+        bucket = TokenBucket(rate=1.0, capacity=3)
+
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+
+        assert time.monotonic() - start < 0.1
+
+    def test_waits_for_refill(self):
+        """容量を超えると補充を待つ"""
+        bucket = TokenBucket(rate=20.0)
+
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+
+        assert time.monotonic() - start >= 0.09
+
+    def test_acquire_async_reserves_in_order(self):
+        """同時に待機しても予約分だけ待ち時間が積み上がる"""
+        bucket = TokenBucket(rate=20.0)
+
+        async def run():
+            start = time.monotonic()
+            await asyncio.gather(*(bucket.acquire_async() for _ in range(3)))
+            return time.monotonic() - start
+
+        assert asyncio.run(run()) >= 0.09
+
+    def test_invalid_rate(self):
+        """不正なレートのエラーテスト"""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestRateLimit:
+    """rate_limit 装飾子のテスト"""
+
+    def test_sync_and_async_functions(self):
+        """同期関数・コルーチン関数の両方に適用できる"""
+
+        @rate_limit(calls_per_minute=6000)
+        def add(a, b):
+            return a + b
+
+        @rate_limit(calls_per_minute=6000)
+        async def add_async(a, b):
+            return a + b
+
+        assert add(1, 2) == 3
+        assert asyncio.run(add_async(1, 2)) == 3
+        assert add.__name__ == "add"
+
+    def test_provider_bucket_is_shared(self):
+        """同じプロバイダーは1つのバケットを共有する"""
+        assert get_rate_limit_bucket("test-provider", 120) is get_rate_limit_bucket(
+            "test-provider"
+        )
+        assert get_rate_limit_bucket("test-provider").rate == 2.0
+
+
+class TestHTTPClients:
+    """requests を使用するクライアントのテスト"""
+
+    @pytest.mark.parametrize(
+        "client_class, body, expected",
+        [
+            (GeminiClient, {"candidates": [{"content": {"parts": [{"text": "晴れ"}]}}]}, "晴れ"),
+            (AnthropicClient, {"content": [{"text": "曇り"}]}, "曇り"),
+        ],
+    )
+    def test_session_is_reused(self, client_class, body, expected):
+        """同じクライアントでは同じ HTTP セッションを使い回す"""
+        client = client_class(LLMConfig(model="test-model", api_key="test-key"))
+        response = MagicMock()
+        response.content = json.dumps(body).encode("utf-8")
+        client._session.post = MagicMock(return_value=response)
+
+        assert client.generate_comment("テスト") == expected
+        assert client.generate_comment("テスト") == expected
+        assert client._session.post.call_count == 2
+
+        sent = json.loads(client._session.post.call_args.kwargs["data"])
+        assert "テスト" in json.dumps(sent, ensure_ascii=False)
+
+    def test_gemini_request_uses_model_url_and_key(self):
+        """Gemini はモデル名を含む URL と API キーのパラメータで送信する"""
+        client = GeminiClient(LLMConfig(model="gemini-pro", api_key="test-key"))
+        response = MagicMock()
+        response.content = b'{"candidates": [{"content": {"parts": [{"text": "x"}]}}]}'
+        client._session.post = MagicMock(return_value=response)
+
+        client.generate_comment("テスト")
+
+        args, kwargs = client._session.post.call_args
+        assert args[0].endswith("/models/gemini-pro:generateContent")
+        assert kwargs["params"] == {"key": "test-key"}
+        assert kwargs["headers"]["Content-Type"] == "application/json"
+
+    @pytest.mark.parametrize("client_class", [GeminiClient, AnthropicClient])
+    def test_precompiled_body_matches_full_serialization(self, client_class):
+        """事前にシリアライズした固定部分と連結したボディは、全体をシリアライズした結果と同じ"""
+        from src.llm.llm_client import _dumps_json
+
+        client = client_class(LLMConfig(model="test-model", api_key="test-key"))
+        response = MagicMock()
+        response.content = b'{"candidates": [{"content": {"parts": [{"text": "x"}]}}]}'
+        client._session.post = MagicMock(return_value=response)
+        prompt = '晴れ "引用" \\ と\n改行'
+
+        client._make_api_request(prompt)
+
+        body = client._session.post.call_args.kwargs["data"]
+        sent = json.loads(body)
+        assert body == _dumps_json(sent)
+        if client_class is GeminiClient:
+            assert sent["contents"][0]["parts"][0]["text"] == prompt
+            assert sent["generationConfig"] == {"temperature": 0.7, "maxOutputTokens": 50}
+        else:
+            assert sent["messages"] == [{"role": "user", "content": prompt}]
+            assert sent["model"] == "test-model"
+
+
+class TestOpenAIClient:
+    """OpenAIClient のテスト"""
+
+    def test_uses_client_instance(self):
+        """クライアントインスタンス経由でリクエストする"""
+        client = OpenAIClient(LLMConfig(model="gpt-4", api_key="test-key", timeout=10))
+        response = MagicMock()
+        response.choices[0].message.content = "晴れて爽やか\n"
+        client._client = MagicMock()
+        client._client.chat.completions.create.return_value = response
+
+        assert client.generate_comment("テスト") == "晴れて爽やか"
+        kwargs = client._client.chat.completions.create.call_args.kwargs
+        assert kwargs["model"] == "gpt-4"
+        assert kwargs["messages"] == [{"role": "user", "content": "テスト"}]
+
+
+class TestValidateResponse:
+    """レスポンス検証のテスト"""
+
+    def test_strips_control_characters_and_truncates(self):
+        """改行・タブを除去し、15文字に切り詰める"""
+        client = OpenAIClient(LLMConfig(model="gpt-4", api_key="test-key"))
+
+        assert client._validate_response(" 晴れ\r\nて\t爽やか ") == "晴れて爽やか"
+        assert client._validate_response("あ" * 20) == "あ" * 15
+
+    def test_empty_response(self):
+        """空のレスポンスのエラーテスト"""
+        client = OpenAIClient(LLMConfig(model="gpt-4", api_key="test-key"))
+
+        with pytest.raises(ValueError):
+            client._validate_response("")
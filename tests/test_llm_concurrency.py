@@ -0,0 +1,138 @@
+"""
+LLM同時実行数制御のテスト
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.exceptions import RateLimitError
+from src.llm.concurrency import AsyncRateLimiter, LLMConcurrencyLimiter
+
+
+class FakeRedis:
+    """INCR/DECR/EXPIRE だけを持つテスト用の Redis"""
+
+    def __init__(self):
+        self.values = {}
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    def decr(self, key):
+        self.values[key] -= 1
+        return self.values[key]
+
+    def expire(self, key, seconds):
+        return True
+
+
+def _make_global_limiter(global_limit, acquire_timeout=0.1):
+    """Redis をテスト用に差し替えたリミッターを作成"""
+    limiter = LLMConcurrencyLimiter(acquire_timeout=acquire_timeout)
+    limiter.global_limit = global_limit
+    limiter._redis = FakeRedis()
+    return limiter
+
+
+class TestLLMConcurrencyLimiter:
+    """LLMConcurrencyLimiter のテスト"""
+
+    def test_inflight_limit(self):
+        """プロセス内の上限に達するとタイムアウト後にエラーになる"""
+        limiter = LLMConcurrencyLimiter(inflight_limit=1, acquire_timeout=0.05)
+
+        with limiter.slot("openai"):
+            with pytest.raises(RateLimitError):
+                with limiter.slot("openai"):
+                    pass
+
+        with limiter.slot("openai"):
+            pass
+
+    def test_global_limit_per_provider(self):
+        """全体の上限はプロバイダーごとに数え、解放時に減算する"""
+        limiter = _make_global_limiter(global_limit=1)
+
+        with limiter.slot("openai"):
+            assert limiter._redis.values["llm:inflight:openai"] == 1
+            with limiter.slot("gemini"):
+                pass
+            with pytest.raises(RateLimitError):
+                with limiter.slot("openai"):
+                    pass
+
+        assert limiter._redis.values["llm:inflight:openai"] == 0
+
+    def test_released_on_error(self):
+        """呼び出しが失敗してもスロットを解放する"""
+        limiter = _make_global_limiter(global_limit=1)
+
+        with pytest.raises(ValueError):
+            with limiter.slot("openai"):
+                raise ValueError("API error")
+
+        assert limiter._redis.values["llm:inflight:openai"] == 0
+        with limiter.slot("openai"):
+            pass
+
+    def test_redis_failure_does_not_block(self):
+        """Redis 障害時はプロセス内の制限だけで続行する"""
+        limiter = _make_global_limiter(global_limit=1)
+        limiter._redis = MagicMock()
+        limiter._redis.incr.side_effect = ConnectionError("redis down")
+
+        with limiter.slot("openai"):
+            pass
+
+        limiter._redis.decr.assert_not_called()
+
+
+class TestAsyncRateLimiter:
+    """AsyncRateLimiter のテスト"""
+
+    def test_max_concurrency(self):
+        """同時実行数が上限を超えない（ループをまたいでも使える）"""
+        limiter = AsyncRateLimiter(max_concurrency=2)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def call():
+            nonlocal in_flight, max_in_flight
+            async with limiter.slot():
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        async def run():
+            await asyncio.gather(*(call() for _ in range(5)))
+
+        asyncio.run(run())
+        asyncio.run(run())
+        assert max_in_flight == 2
+
+    def test_requests_and_tokens_per_minute(self):
+        """RPM・TPM を超える分は回復するまで送信を遅らせる"""
+        limiter = AsyncRateLimiter(requests_per_minute=2, tokens_per_minute=600)
+        delays = []
+
+        async def fake_sleep(delay):
+            delays.append(delay)
+
+        async def run():
+            for tokens in (100, 100, 100):
+                async with limiter.slot(tokens):
+                    pass
+            async with limiter.slot(500):
+                pass
+
+        with patch("src.llm.concurrency.asyncio.sleep", fake_sleep):
+            asyncio.run(run())
+
+        # 3件目は RPM（2/分 = 30秒に1件）、4件目は RPM・TPM の両方で待つ
+        assert len(delays) == 2
+        assert delays[0] == pytest.approx(30, abs=0.5)
+        assert delays[1] == pytest.approx(60, abs=0.5)
@@ -0,0 +1,536 @@
+"""
+LLMマネージャーのテスト
+"""
+
+import functools
+import subprocess
+import sys
+import time
+import pytest
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from src.data.comment_pair import CommentPair
+from src.data.past_comment import CommentType, PastComment
+from src.data.weather_data import WeatherCondition, WeatherForecast, WindDirection
+from src.llm.cache import (
+    CacheConfig,
+    LLMCache,
+    MemoryCacheBackend,
+    SemanticCache,
+    SQLiteCacheBackend,
+)
+from src.llm.concurrency import LLMConcurrencyLimiter
+from src.llm.llm_manager import MIN_ADAPTIVE_TIMEOUT, LLMManager
+from src.llm.providers.base_provider import (
+    BULK_MAX_TOKENS_PER_PROMPT,
+    request_deadline_reached,
+)
+
+
+@pytest.fixture
+def weather_data():
+    """テスト用の天気予報"""
+    return WeatherForecast(
+        location="東京",
+        datetime=datetime(2024, 6, 5, 9, 0),
+        temperature=25.0,
+        weather_code="100",
+        weather_condition=WeatherCondition.CLEAR,
+        weather_description="晴れ",
+        precipitation=0.0,
+        humidity=50.0,
+        wind_speed=2.0,
+        wind_direction=WindDirection.N,
+        wind_direction_degrees=0,
+    )
+
+
+@pytest.fixture
+def comment_pair():
+    """テスト用の過去コメントペア"""
+
+    def make(text, comment_type):
+        return PastComment(
+            location="東京",
+            datetime=datetime(2024, 6, 5, 9, 0),
+            weather_condition="晴れ",
+            comment_text=text,
+            comment_type=comment_type,
+        )
+
+    return CommentPair(
+        weather_comment=make("爽やかな朝です", CommentType.WEATHER_COMMENT),
+        advice_comment=make("日焼け対策を", CommentType.ADVICE),
+        similarity_score=0.9,
+        selection_reason="テスト",
+    )
+
+
+@pytest.fixture
+def provider():
+    """テスト用のモックプロバイダー"""
+    mock_provider = MagicMock()
+    mock_provider.model = "test-model"
+    mock_provider.generate_comment.return_value = "晴れて爽やか"
+    return mock_provider
+
+
+def _make_manager(provider, cache=None, use_cache=True):
+    """プロバイダー初期化をモックして LLMManager を生成"""
+    with patch.object(LLMManager, "_initialize_provider", return_value=provider):
+        return LLMManager(provider="openai", cache=cache, use_cache=use_cache)
+
+
+class TestLLMManagerCache:
+    """生成結果キャッシュのテスト"""
+
+    def test_deterministic_generation_is_cached(self, provider, weather_data, comment_pair):
+        """temperature=0 の同一入力は API を1回だけ呼ぶ"""
+        manager = _make_manager(provider, cache=LLMCache())
+        constraints = {"max_length": 15, "temperature": 0}
+
+        first = manager.generate_comment(weather_data, comment_pair, constraints)
+        second = manager.generate_comment(weather_data, comment_pair, constraints)
+
+        assert first == second == "晴れて爽やか"
+        assert provider.generate_comment.call_count == 1
+        assert manager.cache.hits == 1
+
+    def test_sampled_generation_is_not_cached(self, provider, weather_data, comment_pair):
+        """temperature > 0 の生成は既定でキャッシュしない"""
+        manager = _make_manager(provider, cache=LLMCache())
+        constraints = {"max_length": 15}
+
+        manager.generate_comment(weather_data, comment_pair, constraints)
+        manager.generate_comment(weather_data, comment_pair, constraints)
+
+        assert provider.generate_comment.call_count == 2
+
+    def test_different_inputs_use_different_keys(self, provider, weather_data, comment_pair):
+        """入力が異なれば別のキャッシュエントリになる"""
+        manager = _make_manager(provider, cache=LLMCache())
+
+        manager.generate_comment(weather_data, comment_pair, {"temperature": 0, "time_period": "朝"})
+        manager.generate_comment(weather_data, comment_pair, {"temperature": 0, "time_period": "夜"})
+
+        assert provider.generate_comment.call_count == 2
+
+    def test_cache_disabled(self, provider, weather_data, comment_pair):
+        """use_cache=False の場合はキャッシュしない"""
+        manager = _make_manager(provider, use_cache=False)
+        constraints = {"temperature": 0}
+
+        manager.generate_comment(weather_data, comment_pair, constraints)
+        manager.generate_comment(weather_data, comment_pair, constraints)
+
+        assert manager.cache is None
+        assert provider.generate_comment.call_count == 2
+
+
+class TestMemoryCacheBackend:
+    """メモリキャッシュのテスト"""
+
+    def test_lru_eviction(self):
+        """最大件数を超えると最も古く使われたものから削除される"""
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", "1", 60)
+        backend.set("b", "2", 60)
+        assert backend.get("a") == "1"
+        backend.set("c", "3", 60)
+
+        assert backend.get("b") is None
+        assert backend.get("a") == "1"
+        assert backend.get("c") == "3"
+
+    def test_expired_entry(self):
+        """有効期限切れの値は返さない"""
+        backend = MemoryCacheBackend()
+        backend.set("a", "1", 0)
+
+        assert backend.get("a") is None
+        assert len(backend) == 0
+
+
+class TestSQLiteCacheBackend:
+    """SQLiteキャッシュのテスト"""
+
+    def test_batched_writes_survive_reopen(self, tmp_path):
+        """バッファした書き込みは件数到達・終了時に反映され、再接続後も読める"""
+        path = str(tmp_path / "cache.db")
+        backend = SQLiteCacheBackend(path, write_batch_size=2)
+        backend.set("a", "1", 60)
+        assert backend.get("a") == "1"
+
+        other = SQLiteCacheBackend(path)
+        assert other.get("a") is None
+        backend.set("b", "2", 60)
+        assert other.get("a") == "1"
+
+        backend.set("c", "3", 60)
+        backend.close()
+        assert other.get("c") == "3"
+        other.close()
+
+    def test_expired_and_recent(self, tmp_path):
+        """有効期限切れは返さず、recent は期限の遅い順に返す"""
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+        backend.set("old", "1", 0)
+        backend.set("short", "2", 60)
+        backend.set("long", "3", 600)
+
+        assert backend.get("old") is None
+        assert [key for key, _, _ in backend.recent(10)] == ["long", "short"]
+        assert backend.recent(1)[0][2] > 500
+        backend.close()
+
+
+class TestSemanticCache:
+    """埋め込みベクトルによる類似一致キャッシュのテスト"""
+
+    def test_similar_embedding_hits(self):
+        """類似度が閾値以上なら再利用し、未満なら返さない"""
+        cache = SemanticCache(CacheConfig(similarity_threshold=0.95))
+        cache.add([1.0, 0.0, 0.0], "晴れて爽やか")
+
+        assert cache.lookup([0.99, 0.05, 0.0]) == "晴れて爽やか"
+        assert cache.lookup([0.5, 0.5, 0.0]) is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_oldest_entry_is_overwritten(self):
+        """最大件数を超えた場合は古いものから上書きする"""
+        cache = SemanticCache(CacheConfig(max_entries=2))
+        cache.add([1.0, 0.0], "1")
+        cache.add([0.0, 1.0], "2")
+        cache.add([-1.0, 0.0], "3")
+
+        assert len(cache) == 2
+        assert cache.lookup([1.0, 0.0]) is None
+        assert cache.lookup([0.0, 1.0]) == "2"
+        assert cache.lookup([-1.0, 0.0]) == "3"
+
+    def test_lookup_is_limited_to_scope(self):
+        """同じ埋め込みでも scope（地点・天気・気温帯）が異なれば返さない"""
+        cache = SemanticCache(CacheConfig(temperature_bucket=5.0))
+        tokyo = cache.scope_key("東京", "clear", 21.0)
+        cache.add([1.0, 0.0], "東京は晴れ", tokyo)
+
+        assert cache.lookup([1.0, 0.0], cache.scope_key("東京", "clear", 24.0)) == "東京は晴れ"
+        assert cache.lookup([1.0, 0.0], cache.scope_key("大阪", "clear", 21.0)) is None
+        assert cache.lookup([1.0, 0.0], cache.scope_key("東京", "rain", 21.0)) is None
+        assert cache.lookup([1.0, 0.0], cache.scope_key("東京", "clear", 26.0)) is None
+
+    def test_expired_entries_skipped_and_persisted(self, tmp_path):
+        """期限切れは返さず、保存・読み込みの対象にもならない"""
+        path = str(tmp_path / "semantic.npz")
+        cache = SemanticCache(CacheConfig(ttl=60))
+        cache.add([1.0, 0.0], "有効")
+        cache.config.ttl = 0
+        cache.add([0.0, 1.0], "期限切れ")
+        assert cache.lookup([0.0, 1.0]) is None
+        cache.save(path)
+
+        reloaded = SemanticCache(CacheConfig(path=path))
+        assert len(reloaded) == 1
+        assert reloaded.lookup([1.0, 0.0]) == "有効"
+
+    def test_overwritten_entry_leaves_its_scope(self):
+        """上書きされた行は元の scope の検索対象から外れる"""
+        cache = SemanticCache(CacheConfig(max_entries=1))
+        cache.add([1.0, 0.0], "東京は晴れ", "東京")
+        cache.add([1.0, 0.0], "大阪は晴れ", "大阪")
+
+        assert cache.lookup([1.0, 0.0], "東京") is None
+        assert cache.lookup([1.0, 0.0], "大阪") == "大阪は晴れ"
+
+
+class TestLLMCacheLocalTier:
+    """共有キャッシュ手前のプロセス内キャッシュのテスト"""
+
+    def test_remote_backend_is_read_once(self):
+        """共有キャッシュから取得した値は以降プロセス内から返す"""
+        remote = MagicMock()
+        remote.get.return_value = "晴れて爽やか"
+        cache = LLMCache(backend=remote)
+
+        assert cache.get("key") == "晴れて爽やか"
+        assert cache.get("key") == "晴れて爽やか"
+        assert remote.get.call_count == 1
+        assert cache.hits == 2
+
+    def test_set_writes_through(self):
+        """保存時は共有キャッシュにも書き込む"""
+        remote = MagicMock()
+        cache = LLMCache(backend=remote, ttl_seconds=120)
+
+        cache.set("key", "晴れて爽やか")
+
+        remote.set.assert_called_once_with("key", "晴れて爽やか", 120)
+        assert cache.get("key") == "晴れて爽やか"
+        remote.get.assert_not_called()
+
+    def test_memory_backend_has_no_local_tier(self):
+        """保存先がプロセス内メモリなら二重に持たない"""
+        assert LLMCache()._local is None
+        assert LLMCache(backend=MagicMock(), local_max_entries=0)._local is None
+
+
+class TestLLMManagerBatch:
+    """一括生成のテスト"""
+
+    def test_generate_comment_batch_preserves_order(self, provider, weather_data, comment_pair):
+        """結果が入力順で返り、失敗は例外オブジェクトとして返る"""
+
+        def generate_comment(weather_data, past_comments, constraints):
+            if constraints["time_period"] == "夜":
+                raise RuntimeError("API error")
+            return f"{constraints['time_period']}のコメント"
+
+        provider.generate_comment.side_effect = generate_comment
+        manager = _make_manager(provider, use_cache=False)
+        items = [
+            {
+                "weather_data": weather_data,
+                "past_comments": comment_pair,
+                "constraints": {"time_period": period},
+            }
+            for period in ("朝", "昼", "夜")
+        ]
+
+        results = manager.generate_comment_batch(items, max_concurrency=2)
+
+        assert results[:2] == ["朝のコメント", "昼のコメント"]
+        assert isinstance(results[2], RuntimeError)
+
+
+class TestTruncateNaturally:
+    """コメント切り詰めのテスト"""
+
+    def test_cuts_after_last_break_within_limit(self, provider):
+        """max_length 以内で最も後ろの区切りの後で切る"""
+        manager = _make_manager(provider, use_cache=False)
+
+        assert manager._truncate_naturally("今日は晴れです、洗濯日和になりそう", 10) == "今日は晴れです、"
+        assert manager._truncate_naturally("晴れますね今日も", 5) == "晴れますね"
+
+    def test_result_never_exceeds_max_length(self, provider):
+        """区切り文字列が max_length をまたぐ場合は手前の区切りを使う"""
+        manager = _make_manager(provider, use_cache=False)
+
+        assert manager._truncate_naturally("雨がいいかきくます", 8) == "雨が"
+        assert manager._truncate_naturally("雨が降りますので傘を", 4) == "雨が"
+
+    def test_no_break_found(self, provider):
+        """区切りがなければ単純に切り詰める"""
+        manager = _make_manager(provider, use_cache=False)
+
+        assert manager._truncate_naturally("あいうえおかきくけこ", 5) == "あいうえお"
+        assert manager._truncate_naturally("短い", 5) == "短い"
+
+
+class TestLLMManagerGenerate:
+    """汎用テキスト生成のテスト"""
+
+    def test_uses_provider_generate(self, provider):
+        """プロバイダーの generate を呼び出す"""
+        provider.generate.return_value = "生成結果"
+        manager = _make_manager(provider, use_cache=False)
+
+        assert manager.generate("プロンプト") == "生成結果"
+        provider.generate.assert_called_once_with("プロンプト")
+
+    def test_generate_bulk_per_prompt_uses_bulk_token_limit(self, provider):
+        """一括生成に対応しないプロバイダーでも1件あたりの出力上限は一括生成と同じ"""
+        provider.generate.return_value = "生成結果"
+        del provider.generate_bulk
+        manager = _make_manager(provider, use_cache=False)
+
+        assert manager.generate_bulk(["質問1", "質問2"]) == ["生成結果", "生成結果"]
+        assert [c.kwargs for c in provider.generate.call_args_list] == [
+            {"max_tokens": BULK_MAX_TOKENS_PER_PROMPT}
+        ] * 2
+
+    def test_falls_back_to_generate_comment(self):
+        """generate を持たないプロバイダーはダミーの天気予報で generate_comment を使う"""
+        legacy_provider = MagicMock(spec=["generate_comment", "model"])
+        legacy_provider.generate_comment.return_value = "生成結果"
+        manager = _make_manager(legacy_provider, use_cache=False)
+
+        assert manager.generate("プロンプト") == "生成結果"
+        assert manager.generate("プロンプト") == "生成結果"
+        first, second = legacy_provider.generate_comment.call_args_list
+        assert first.kwargs["constraints"] == {"custom_prompt": "プロンプト"}
+        assert first.kwargs["weather_data"] is second.kwargs["weather_data"]
+
+    def test_comment_from_prompt_skips_template(self, provider):
+        """構築済みのプロンプトはそのままプロバイダーに渡し、長すぎれば切り詰める"""
+        provider.generate_comment_from_prompt.return_value = "今日は晴れて爽やかな一日、お出かけ日和です"
+        manager = _make_manager(provider, use_cache=False)
+
+        comment = manager.generate_comment_from_prompt("プロンプト", {"max_length": 15})
+
+        assert len(comment) <= 15
+        provider.generate_comment_from_prompt.assert_called_once_with(
+            "プロンプト", {"max_length": 15}
+        )
+        provider.generate_comment.assert_not_called()
+
+
+class TestLLMManagerFailover:
+    """タイムアウトとフェイルオーバーのテスト"""
+
+    def test_falls_back_on_timeout(self, provider, weather_data, comment_pair):
+        """タイムアウトしたら次のプロバイダーで生成する"""
+        provider.generate_comment.side_effect = lambda **kwargs: time.sleep(0.5) or "遅い"
+        fallback = MagicMock()
+        fallback.generate_comment.return_value = "代替コメント"
+        manager = _make_manager(provider, use_cache=False)
+        manager.fallback_providers = ["gemini"]
+        manager.request_timeout = 0.05
+        manager._providers["gemini"] = fallback
+
+        assert manager.generate_comment(weather_data, comment_pair, {}) == "代替コメント"
+        assert "gemini" in manager.get_latency_stats()
+
+    def test_other_errors_are_not_retried(self, provider, weather_data, comment_pair):
+        """タイムアウト・通信エラー以外はフォールバックしない"""
+        provider.generate_comment.side_effect = ValueError("bad request")
+        fallback = MagicMock()
+        manager = _make_manager(provider, use_cache=False)
+        manager.fallback_providers = ["gemini"]
+        manager._providers["gemini"] = fallback
+
+        with pytest.raises(ValueError):
+            manager.generate_comment(weather_data, comment_pair, {})
+        fallback.generate_comment.assert_not_called()
+
+    def test_waiting_for_slot_does_not_count_as_timeout(self, provider):
+        """同時実行数の枠待ちはプロバイダーのタイムアウトに含めない"""
+        calls = []
+
+        def generate_comment(**kwargs):
+            calls.append(1)
+            time.sleep(0.2)
+            return "晴れて爽やか"
+
+        provider.generate_comment.side_effect = generate_comment
+        manager = _make_manager(provider, use_cache=False)
+        manager.limiter = LLMConcurrencyLimiter(inflight_limit=1)
+        manager.request_timeout = 0.3
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(
+                    manager._call_with_timeout,
+                    "openai",
+                    functools.partial(provider.generate_comment),
+                )
+                for _ in range(3)
+            ]
+            results = [future.result() for future in futures]
+
+        assert results == ["晴れて爽やか"] * 3
+        assert len(calls) == 3
+
+    def test_provider_call_runs_under_request_deadline(self, provider):
+        """プロバイダー呼び出しにはタイムアウトに合わせた期限が設定される"""
+        manager = _make_manager(provider, use_cache=False)
+        manager.request_timeout = 10.0
+        within = functools.partial(request_deadline_reached, 5.0)
+        beyond = functools.partial(request_deadline_reached, 20.0)
+
+        assert manager._call_with_timeout("openai", within) is False
+        assert manager._call_with_timeout("openai", beyond) is True
+        # 期限は呼び出しの外には残らない
+        assert request_deadline_reached(60.0) is False
+
+    def test_adaptive_timeout(self, provider):
+        """十分なサンプルがあれば p99 に基づくタイムアウトを使う"""
+        manager = _make_manager(provider, use_cache=False)
+        assert manager.get_request_timeout("openai") == manager.request_timeout
+
+        manager._latencies["openai"] = deque([5.0] * 99 + [10.0], maxlen=100)
+        assert manager.get_request_timeout("openai") == pytest.approx(12.0)
+
+        manager._latencies["openai"] = deque([0.1] * 100, maxlen=100)
+        assert manager.get_request_timeout("openai") == MIN_ADAPTIVE_TIMEOUT
+
+
+class TestLLMManagerProviders:
+    """プロバイダー管理のテスト"""
+
+    def test_providers_are_initialized_once(self, provider):
+        """初期化済みのプロバイダーは切り替え時に再利用する"""
+        gemini = MagicMock()
+        initializers = {"openai": provider, "gemini": gemini}
+
+        def initialize(self, name):
+            if name not in initializers:
+                raise ValueError(f"{name} is not configured")
+            return initializers[name]
+
+        with patch.object(LLMManager, "_initialize_provider", autospec=True) as init:
+            init.side_effect = initialize
+            manager = LLMManager(provider="openai", use_cache=False)
+            # 使うまで他のプロバイダーは初期化しない
+            assert set(manager._providers) == {"openai"}
+
+            manager.switch_provider("gemini")
+            manager.switch_provider("openai")
+            manager.switch_provider("gemini")
+            manager.switch_provider("openai")
+
+            assert [call.args[1] for call in init.call_args_list] == ["openai", "gemini"]
+        assert manager.provider is provider
+        assert manager.provider_name == "openai"
+
+    def test_switch_to_unavailable_provider(self, provider):
+        """使用できないプロバイダーへの切り替えは失敗し、現在のプロバイダーを維持する"""
+
+        def initialize(self, name):
+            if name != "openai":
+                raise ValueError(f"{name} is not configured")
+            return provider
+
+        with patch.object(LLMManager, "_initialize_provider", autospec=True) as init:
+            init.side_effect = initialize
+            manager = LLMManager(provider="openai", use_cache=False)
+
+            with pytest.raises(ValueError):
+                manager.switch_provider("anthropic")
+
+        assert manager.provider_name == "openai"
+
+
+class TestLLMManagerImports:
+    """プロバイダーの遅延読み込みのテスト"""
+
+    def test_provider_sdks_are_not_imported_eagerly(self):
+        """LLMManager の import だけではプロバイダーの SDK を読み込まない"""
+        code = (
+            "import sys, src.llm.llm_manager; "
+            "print([m for m in ('openai', 'anthropic', 'google.generativeai') "
+            "if m in sys.modules])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent.parent,
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_failover_exceptions_include_loaded_sdks(self):
+        """読み込み済みの SDK の通信エラーはフェイルオーバー対象になる"""
+        import openai
+
+        from src.llm.llm_manager import _get_failover_exceptions
+
+        exceptions = _get_failover_exceptions()
+        assert TimeoutError in exceptions
+        assert openai.APIConnectionError in exceptions
@@ -2,17 +2,43 @@
 LLMプロバイダーのテスト
 """
 
+import asyncio
+import json
+
 import pytest
-from unittest.mock import patch, MagicMock, Mock
+from unittest.mock import patch, AsyncMock, MagicMock, Mock
 
+from src.llm.providers.base_provider import (
+    BULK_MAX_TOKENS_PER_PROMPT,
+    COMMENT_MAX_TOKENS,
+    COMMENT_STOP_SEQUENCES,
+    DEFAULT_GENERATE_MAX_TOKENS,
+)
 from src.llm.providers.openai_provider import OpenAIProvider
 from src.llm.providers.gemini_provider import GeminiProvider
 from src.llm.providers.anthropic_provider import AnthropicProvider
-from src.data.weather_data import WeatherForecast
+from src.data.weather_data import WeatherCondition, WeatherForecast
 from src.data.comment_pair import CommentPair
 from src.data.past_comment import PastComment
 
 
+def _text_stream(*deltas):
+    """Anthropic の messages.stream が返すコンテキストマネージャーのモック"""
+    stream = MagicMock()
+    stream.__enter__.return_value.text_stream = iter(deltas)
+    return stream
+
+
+def _async_text_stream(*deltas):
+    """AsyncAnthropic の messages.stream が返すコンテキストマネージャーのモック"""
+    text_stream = MagicMock()
+    text_stream.__aiter__.return_value = list(deltas)
+    stream = MagicMock()
+    stream.__aenter__.return_value.text_stream = text_stream
+    stream.__aenter__.return_value.close = AsyncMock()
+    return stream
+
+
 class TestOpenAIProvider:
     """OpenAIプロバイダーのテストクラス"""
 
@@ -55,9 +81,54 @@ class TestOpenAIProvider:
         """OpenAIプロバイダー初期化のテスト"""
         provider = OpenAIProvider(api_key="test-key", model="gpt-4")
 
-        mock_openai_class.assert_called_once_with(api_key="test-key")
+        from src.llm.providers.openai_provider import _http_clients
+
+        mock_openai_class.assert_called_once_with(
+            api_key="test-key", http_client=_http_clients.get()
+        )
         assert provider.model == "gpt-4"
 
+    def test_openai_providers_share_http_client(self):
+        """全プロバイダーで1つのHTTP接続プールを共有するテスト"""
+        first = OpenAIProvider(api_key="test-key")
+        second = OpenAIProvider(api_key="other-key")
+
+        assert first.client._client is second.client._client
+
+        async def async_clients():
+            return first.async_client, second.async_client
+
+        # 非同期クライアントは同じイベントループ内でのみ共有し、asyncio.run ごとに作り直す
+        (first_async, second_async), (next_async, _) = (
+            asyncio.run(async_clients()),
+            asyncio.run(async_clients()),
+        )
+        assert first_async._client is second_async._client
+        assert first_async is not next_async
+        assert first_async._client is not next_async._client
+
+    @patch("src.llm.providers.openai_provider.AsyncOpenAI")
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_comments_batch_twice(self, mock_openai_class, mock_async_class):
+        """generate_comments_batch を続けて呼んでも、前のイベントループのクライアントを使わないテスト"""
+        mock_async_class.side_effect = lambda **kwargs: MagicMock(
+            chat=MagicMock(
+                completions=MagicMock(
+                    create=AsyncMock(
+                        return_value=MagicMock(
+                            choices=[MagicMock(message=MagicMock(content="晴れて爽やか"))]
+                        )
+                    )
+                )
+            )
+        )
+        provider = OpenAIProvider(api_key="test-key")
+        items = TestAnthropicProvider._batch_items(2)
+
+        assert provider.generate_comments_batch(items) == ["晴れて爽やか"] * 2
+        assert provider.generate_comments_batch(items) == ["晴れて爽やか"] * 2
+        assert mock_async_class.call_count == 2
+
     @patch("src.llm.providers.openai_provider.OpenAI")
     def test_openai_generate_comment(self, mock_openai_class, sample_data):
         """OpenAIでのコメント生成テスト"""
@@ -83,7 +154,422 @@ class TestOpenAIProvider:
         call_args = mock_client.chat.completions.create.call_args
         assert call_args.kwargs["model"] == "gpt-4"
         assert call_args.kwargs["temperature"] == 0.7
-        assert call_args.kwargs["max_tokens"] == 50
+        assert call_args.kwargs["max_tokens"] == COMMENT_MAX_TOKENS
+        assert call_args.kwargs["stop"] == COMMENT_STOP_SEQUENCES
+
+    @pytest.mark.parametrize(
+        "use_templates, condition, temperature, precipitation, constraints, expected",
+        [
+            (True, WeatherCondition.CLEAR, 20.0, 0.0, {}, "晴れて過ごしやすい"),
+            (True, WeatherCondition.CLOUDY, 15.0, 0.0, {}, "雲の多い穏やかな日"),
+            (False, WeatherCondition.CLEAR, 20.0, 0.0, {}, "生成コメント"),
+            (True, WeatherCondition.RAIN, 20.0, 3.0, {}, "生成コメント"),
+            (True, WeatherCondition.CLEAR, 35.0, 0.0, {}, "生成コメント"),
+            (True, WeatherCondition.CLEAR, 20.0, 0.0, {"ng_words": ["過ごしやすい"]}, "生成コメント"),
+            (True, WeatherCondition.CLOUDY, 15.0, 0.0, {"max_length": 5}, "生成コメント"),
+        ],
+    )
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_template_fast_path(
+        self,
+        mock_openai_class,
+        use_templates,
+        condition,
+        temperature,
+        precipitation,
+        constraints,
+        expected,
+    ):
+        """穏やかな晴れ・曇りは API を呼ばずに定型文を返し、それ以外は LLM で生成するテスト"""
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="生成コメント"))]
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai_class.return_value = mock_client
+        provider = OpenAIProvider(api_key="test-key", use_templates=use_templates)
+        weather_data = MagicMock(
+            location="東京",
+            weather_description="晴れ",
+            weather_condition=condition,
+            temperature=temperature,
+            precipitation=precipitation,
+        )
+
+        result = provider.generate_comment(weather_data, MagicMock(), constraints)
+
+        assert result == expected
+        assert mock_client.chat.completions.create.called == (expected == "生成コメント")
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_max_tokens_and_stop(self, mock_openai_class):
+        """汎用生成は小さい上限がデフォルトで、長さ・停止文字列を指定できるテスト"""
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="回答"))]
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai_class.return_value = mock_client
+        provider = OpenAIProvider(api_key="test-key")
+
+        assert provider.generate("質問") == "回答"
+        call_kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["max_tokens"] == DEFAULT_GENERATE_MAX_TOKENS
+        assert "stop" not in call_kwargs
+
+        provider.generate("質問", max_tokens=1000, stop=["\n"])
+        call_kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["max_tokens"] == 1000
+        assert call_kwargs["stop"] == ["\n"]
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_system_message_is_static(self, mock_openai_class):
+        """固定の指示は system、地点ごとの内容は user メッセージに分かれるテスト"""
+        from src.llm.prompt_templates import COMMENT_GENERATION_STATIC_PROMPT
+
+        provider = OpenAIProvider(api_key="test-key")
+        items = TestAnthropicProvider._batch_items(2)
+        (system_0, user_0), (system_1, user_1) = (
+            provider._comment_request(**item)["messages"] for item in items
+        )
+
+        assert system_0 == system_1
+        assert system_0["role"] == "system"
+        assert COMMENT_GENERATION_STATIC_PROMPT in system_0["content"]
+        assert "地点0" in user_0["content"] and "地点1" in user_1["content"]
+        assert COMMENT_GENERATION_STATIC_PROMPT not in user_0["content"]
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_bulk_single_request(self, mock_openai_class):
+        """複数プロンプトが1回のAPI呼び出しにまとめられるテスト"""
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = '{"results": ["回答1", "回答2"]}'
+        mock_client.chat.completions.create.return_value = mock_response
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        results = provider.generate_bulk(["質問1", "質問2"])
+
+        assert results == ["回答1", "回答2"]
+        mock_client.chat.completions.create.assert_called_once()
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_bulk_fallback(self, mock_openai_class):
+        """一括応答の件数が合わない場合は個別生成にフォールバックするテスト"""
+        bulk_response = MagicMock()
+        bulk_response.choices = [MagicMock()]
+        bulk_response.choices[0].message.content = '{"results": ["回答1"]}'
+        single_response = MagicMock()
+        single_response.choices = [MagicMock()]
+        single_response.choices[0].message.content = "個別回答"
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = [
+            bulk_response,
+            single_response,
+            single_response,
+        ]
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        results = provider.generate_bulk(["質問1", "質問2"])
+
+        assert results == ["個別回答", "個別回答"]
+        assert mock_client.chat.completions.create.call_count == 3
+        # 個別生成でも一括生成と同じ出力上限を使う
+        single_calls = mock_client.chat.completions.create.call_args_list[1:]
+        assert [c.kwargs["max_tokens"] for c in single_calls] == [BULK_MAX_TOKENS_PER_PROMPT] * 2
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_bulk_respects_output_limit(self, mock_openai_class):
+        """出力トークン数がモデルの上限に収まる件数ずつ送信するテスト"""
+
+        def create(**request):
+            count = len(json.loads(request["messages"][1]["content"])["requests"])
+            response = MagicMock()
+            response.choices = [MagicMock()]
+            response.choices[0].message.content = json.dumps({"results": ["回答"] * count})
+            return response
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = create
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key", model="gpt-3.5-turbo")
+        results = provider.generate_bulk([f"質問{i}" for i in range(20)])
+
+        assert results == ["回答"] * 20
+        calls = mock_client.chat.completions.create.call_args_list
+        assert [c.kwargs["max_tokens"] for c in calls] == [4000, 4000, 2000]
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_bulk_falls_back_on_bad_request(self, mock_openai_class):
+        """API が一括要求を拒否した場合は個別生成にフォールバックするテスト"""
+        import httpx
+        from openai import BadRequestError
+
+        rejected = BadRequestError(
+            "max_tokens is too large",
+            response=httpx.Response(400, request=httpx.Request("POST", "https://api")),
+            body=None,
+        )
+        single_response = MagicMock()
+        single_response.choices = [MagicMock()]
+        single_response.choices[0].message.content = "個別回答"
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = [
+            rejected,
+            single_response,
+            single_response,
+        ]
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        results = provider.generate_bulk(["質問1", "質問2"])
+
+        assert results == ["個別回答", "個別回答"]
+        assert mock_client.chat.completions.create.call_count == 3
+        # 個別生成でも一括生成と同じ出力上限を使う
+        single_calls = mock_client.chat.completions.create.call_args_list[1:]
+        assert [c.kwargs["max_tokens"] for c in single_calls] == [BULK_MAX_TOKENS_PER_PROMPT] * 2
+
+    @patch("src.llm.providers.openai_provider.AsyncOpenAI")
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_agenerate_comments(self, mock_openai_class, mock_async_class):
+        """非同期クライアントで複数地点を並行生成し、入力順で返すテスト"""
+        responses = []
+        for text in ["晴れて爽やか", "日差しに注意"]:
+            response = MagicMock()
+            response.choices = [MagicMock()]
+            response.choices[0].message.content = f'"{text}"\n'
+            responses.append(response)
+        mock_async_client = MagicMock()
+        mock_async_client.chat.completions.create = AsyncMock(side_effect=responses)
+        mock_async_class.return_value = mock_async_client
+
+        from src.llm.concurrency import AsyncRateLimiter
+
+        provider = OpenAIProvider(
+            api_key="test-key", rate_limiter=AsyncRateLimiter(tokens_per_minute=10000)
+        )
+        results = asyncio.run(provider.agenerate_comments(TestAnthropicProvider._batch_items(2)))
+
+        assert results == ["晴れて爽やか", "日差しに注意"]
+        assert mock_async_client.chat.completions.create.await_count == 2
+        mock_openai_class.return_value.chat.completions.create.assert_not_called()
+        call_kwargs = mock_async_client.chat.completions.create.call_args_list[0].kwargs
+        assert call_kwargs["max_tokens"] == COMMENT_MAX_TOKENS
+
+    @pytest.mark.parametrize("cache_sampled, expected_calls", [(True, 1), (False, 2)])
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_response_cache(self, mock_openai_class, cache_sampled, expected_calls):
+        """同一リクエストの応答キャッシュのテスト（temperature > 0 は指定時のみ保存）"""
+        from src.llm.cache import LLMCache
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value.choices = [
+            MagicMock(message=MagicMock(content="回答"))
+        ]
+        mock_openai_class.return_value = mock_client
+
+        cache = LLMCache(cache_sampled=cache_sampled)
+        provider = OpenAIProvider(api_key="test-key", response_cache=cache)
+
+        assert provider.generate("質問") == "回答"
+        assert provider.generate("質問") == "回答"
+        assert mock_client.chat.completions.create.call_count == expected_calls
+        assert cache.hits == 2 - expected_calls
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_retries_transient_errors_only(self, mock_openai_class):
+        """一時的なエラーのみ再試行し、それ以外はそのまま送出するテスト"""
+        import httpx
+        from openai import RateLimitError
+        from tenacity import wait_none
+
+        rate_limited = RateLimitError(
+            "rate limited",
+            response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com")),
+            body=None,
+        )
+        response = MagicMock()
+        response.choices = [MagicMock(message=MagicMock(content="回答"))]
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = [
+            rate_limited,
+            response,
+            ValueError("bad request"),
+        ]
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        with patch.object(OpenAIProvider._create.retry, "wait", wait_none()):
+            assert provider.generate("質問") == "回答"
+            with pytest.raises(ValueError):
+                provider.generate("質問")
+
+        assert mock_client.chat.completions.create.call_count == 3
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_retries_stop_at_request_deadline(self, mock_openai_class):
+        """呼び出し元の期限を過ぎたら再試行をやめるテスト"""
+        import time
+
+        import httpx
+        from openai import RateLimitError
+        from tenacity import wait_none
+
+        from src.llm.providers.base_provider import request_deadline
+        from src.llm.providers.openai_provider import MAX_RETRY_ATTEMPTS
+
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = RateLimitError(
+            "rate limited",
+            response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com")),
+            body=None,
+        )
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        with patch.object(OpenAIProvider._create.retry, "wait", wait_none()):
+            with request_deadline(time.monotonic() + 60):
+                with pytest.raises(RateLimitError):
+                    provider.generate("質問")
+            assert mock_client.chat.completions.create.call_count == MAX_RETRY_ATTEMPTS
+
+            mock_client.chat.completions.create.reset_mock()
+            with request_deadline(time.monotonic()):
+                with pytest.raises(RateLimitError):
+                    provider.generate("質問")
+            assert mock_client.chat.completions.create.call_count == 1
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_comments_batch_offline(self, mock_openai_class):
+        """Batch API で一括生成し、失敗した分のみ個別に生成するテスト"""
+        import json
+
+        mock_client = MagicMock()
+        mock_client.batches.create.return_value = MagicMock(id="batch-1", status="in_progress")
+        mock_client.batches.retrieve.return_value = MagicMock(
+            id="batch-1", status="completed", output_file_id="file-out"
+        )
+        output = [
+            {
+                "custom_id": "req-1",
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {"content": '"日差しに注意"'}}]},
+                },
+            },
+            {"custom_id": "req-0", "response": {"status_code": 500}, "error": "server error"},
+        ]
+        mock_client.files.content.return_value.text = "\n".join(json.dumps(r) for r in output)
+        mock_client.chat.completions.create.return_value.choices = [
+            MagicMock(message=MagicMock(content="晴れて爽やか"))
+        ]
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        results = provider.generate_comments_batch(
+            TestAnthropicProvider._batch_items(2), offline=True, poll_interval=0
+        )
+
+        assert results == ["晴れて爽やか", "日差しに注意"]
+        file_name, payload = mock_client.files.create.call_args.kwargs["file"]
+        lines = [json.loads(line) for line in payload.decode("utf-8").splitlines()]
+        assert [line["custom_id"] for line in lines] == ["req-0", "req-1"]
+        assert lines[0]["url"] == "/v1/chat/completions"
+        assert lines[0]["body"]["max_tokens"] == COMMENT_MAX_TOKENS
+        mock_client.batches.create.assert_called_once_with(
+            input_file_id=mock_client.files.create.return_value.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        mock_client.chat.completions.create.assert_called_once()
+
+    @patch("src.llm.providers.openai_provider.AsyncOpenAI")
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_generate_stream(self, mock_openai_class, mock_async_class):
+        """生成されたトークンを受信した順に返すテスト"""
+        chunks = []
+        for delta in ["晴れて", None, "爽やか"]:
+            chunk = MagicMock()
+            chunk.choices = [MagicMock()]
+            chunk.choices[0].delta.content = delta
+            chunks.append(chunk)
+        stream = MagicMock()
+        stream.__aiter__.return_value = chunks
+        mock_async_client = MagicMock()
+        mock_async_client.chat.completions.create = AsyncMock(return_value=stream)
+        mock_async_class.return_value = mock_async_client
+
+        provider = OpenAIProvider(api_key="test-key")
+
+        async def collect():
+            return [delta async for delta in provider.generate_stream("質問")]
+
+        assert asyncio.run(collect()) == ["晴れて", "爽やか"]
+        call_kwargs = mock_async_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["stream"] is True
+        assert call_kwargs["max_tokens"] == DEFAULT_GENERATE_MAX_TOKENS
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_semantic_cache(self, mock_openai_class):
+        """プロンプトの埋め込みが類似していれば過去のコメントを再利用するテスト"""
+        from src.llm.cache import SemanticCache
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = [
+            MagicMock(data=[MagicMock(embedding=[1.0, 0.0])]),
+            MagicMock(data=[MagicMock(embedding=[0.999, 0.01])]),
+        ]
+        mock_client.chat.completions.create.return_value.choices = [
+            MagicMock(message=MagicMock(content="晴れて爽やか"))
+        ]
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key", semantic_cache=SemanticCache())
+        first, second = TestAnthropicProvider._batch_items(2)
+        for item, temperature in ((first, 25.0), (second, 25.4)):
+            item["weather_data"].location = "東京"
+            item["weather_data"].weather_condition = WeatherCondition.CLEAR
+            item["weather_data"].temperature = temperature
+
+        assert provider.generate_comment(**first) == "晴れて爽やか"
+        assert provider.generate_comment(**second) == "晴れて爽やか"
+        mock_client.chat.completions.create.assert_called_once()
+        embed_kwargs = mock_client.embeddings.create.call_args.kwargs
+        assert embed_kwargs["model"] == "text-embedding-3-small"
+        assert "25.4" in embed_kwargs["input"]
+        assert provider.semantic_cache.hits == 1
+
+    @patch("src.llm.providers.openai_provider.OpenAI")
+    def test_openai_semantic_cache_is_scoped_by_location(self, mock_openai_class):
+        """埋め込みがほぼ同じでも、地点が異なればキャッシュ済みのコメントを再利用しないテスト"""
+        from src.llm.cache import SemanticCache
+
+        mock_client = MagicMock()
+        mock_client.embeddings.create.side_effect = [
+            MagicMock(data=[MagicMock(embedding=[1.0, 0.0])]),
+            MagicMock(data=[MagicMock(embedding=[0.999, 0.01])]),
+        ]
+        mock_client.chat.completions.create.side_effect = [
+            MagicMock(choices=[MagicMock(message=MagicMock(content="東京は晴れ"))]),
+            MagicMock(choices=[MagicMock(message=MagicMock(content="大阪は晴れ"))]),
+        ]
+        mock_openai_class.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key", semantic_cache=SemanticCache())
+        first, second = TestAnthropicProvider._batch_items(2)
+        for item, location in ((first, "東京"), (second, "大阪")):
+            item["weather_data"].location = location
+            item["weather_data"].weather_condition = WeatherCondition.CLEAR
+
+        assert provider.generate_comment(**first) == "東京は晴れ"
+        assert provider.generate_comment(**second) == "大阪は晴れ"
+        assert mock_client.chat.completions.create.call_count == 2
+        assert provider.semantic_cache.hits == 0
 
 
 class TestGeminiProvider:
@@ -140,9 +626,10 @@ class TestGeminiProvider:
         """Geminiでのコメント生成テスト"""
         # モックの設定
         mock_model = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = "今日は爽やかですね"
-        mock_model.generate_content.return_value = mock_response
+        mock_model.generate_content.return_value = [
+            MagicMock(text="今日は"),
+            MagicMock(text="爽やかですね"),
+        ]
         mock_genai.GenerativeModel.return_value = mock_model
 
         provider = GeminiProvider(api_key="test-key")
@@ -154,6 +641,32 @@ class TestGeminiProvider:
 
         assert result == "今日は爽やかですね"
         mock_model.generate_content.assert_called_once()
+        assert mock_model.generate_content.call_args.kwargs["stream"] is True
+
+    @patch("src.llm.providers.gemini_provider.genai")
+    def test_gemini_agenerate_comment(self, mock_genai):
+        """Geminiの非同期呼び出しでのコメント生成テスト"""
+        mock_model = MagicMock()
+        mock_response = MagicMock()
+        mock_response.__aiter__.return_value = [MagicMock(text="晴れて"), MagicMock(text="爽やか")]
+        mock_model.generate_content_async = AsyncMock(return_value=mock_response)
+        mock_genai.GenerativeModel.return_value = mock_model
+        weather_data = MagicMock(location="東京", weather_description="晴れ", temperature=25.0)
+        comment_pair = MagicMock()
+        comment_pair.weather_comment.comment_text = "爽やかな朝です"
+        comment_pair.advice_comment.comment_text = "日焼け対策を"
+
+        provider = GeminiProvider(api_key="test-key")
+        result = asyncio.run(
+            provider.agenerate_comment(weather_data, comment_pair, {"max_length": 15})
+        )
+
+        assert result == "晴れて爽やか"
+        mock_model.generate_content_async.assert_awaited_once()
+        mock_model.generate_content.assert_not_called()
+        mock_genai.GenerationConfig.assert_called_once_with(
+            temperature=0.7, max_output_tokens=25, stop_sequences=["\n", "。", "天気コメント:"]
+        )
 
 
 class TestAnthropicProvider:
@@ -198,19 +711,38 @@ class TestAnthropicProvider:
         """Anthropicプロバイダー初期化のテスト"""
         provider = AnthropicProvider(api_key="test-key", model="claude-3-opus-20240229")
 
-        mock_anthropic_class.assert_called_once_with(api_key="test-key")
+        from src.llm.providers.anthropic_provider import _http_clients
+
+        mock_anthropic_class.assert_called_once_with(
+            api_key="test-key", http_client=_http_clients.get()
+        )
         assert provider.model == "claude-3-opus-20240229"
 
+    def test_anthropic_providers_share_http_client(self):
+        """全プロバイダーで1つのHTTP接続プールを共有するテスト"""
+        first = AnthropicProvider(api_key="test-key")
+        second = AnthropicProvider(api_key="other-key")
+
+        assert first.client._client is second.client._client
+
+        async def async_clients():
+            return first.async_client, second.async_client
+
+        # 非同期クライアントは同じイベントループ内でのみ共有し、asyncio.run ごとに作り直す
+        (first_async, second_async), (next_async, _) = (
+            asyncio.run(async_clients()),
+            asyncio.run(async_clients()),
+        )
+        assert first_async._client is second_async._client
+        assert first_async is not next_async
+        assert first_async._client is not next_async._client
+
     @patch("src.llm.providers.anthropic_provider.Anthropic")
     def test_anthropic_generate_comment(self, mock_anthropic_class, sample_data):
         """Anthropicでのコメント生成テスト"""
         # モックの設定
         mock_client = MagicMock()
-        mock_response = MagicMock()
-        mock_content = MagicMock()
-        mock_content.text = "今日は爽やかですね"
-        mock_response.content = [mock_content]
-        mock_client.messages.create.return_value = mock_response
+        mock_client.messages.stream.return_value = _text_stream("今日は", "爽やかですね")
         mock_anthropic_class.return_value = mock_client
 
         provider = AnthropicProvider(api_key="test-key")
@@ -221,13 +753,173 @@ class TestAnthropicProvider:
         )
 
         assert result == "今日は爽やかですね"
-        mock_client.messages.create.assert_called_once()
+        mock_client.messages.stream.assert_called_once()
 
         # API呼び出しパラメータの検証
-        call_args = mock_client.messages.create.call_args
+        call_args = mock_client.messages.stream.call_args
         assert call_args.kwargs["model"] == "claude-3-opus-20240229"
         assert call_args.kwargs["temperature"] == 0.7
-        assert call_args.kwargs["max_tokens"] == 50
+        assert call_args.kwargs["max_tokens"] == 25
+        assert call_args.kwargs["stop_sequences"] == ["。", "天気コメント:"]
+
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_static_prompt_is_cacheable(self, mock_anthropic_class):
+        """固定部分がシステムプロンプトとしてプロンプトキャッシュの対象になるテスト"""
+        from src.llm.prompt_templates import COMMENT_GENERATION_STATIC_PROMPT
+
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = _text_stream("晴れて爽やか")
+        mock_anthropic_class.return_value = mock_client
+        weather_data = MagicMock(location="東京", weather_description="晴れ", temperature=25.0)
+        comment_pair = MagicMock()
+        comment_pair.weather_comment.comment_text = "爽やかな朝です"
+        comment_pair.advice_comment.comment_text = "日焼け対策を"
+
+        provider = AnthropicProvider(api_key="test-key")
+        provider.generate_comment(weather_data, comment_pair, {"max_length": 15})
+
+        call_kwargs = mock_client.messages.stream.call_args.kwargs
+        (system_block,) = call_kwargs["system"]
+        assert system_block["text"].endswith(COMMENT_GENERATION_STATIC_PROMPT)
+        assert system_block["cache_control"] == {"type": "ephemeral"}
+
+        user_prompt = call_kwargs["messages"][0]["content"]
+        assert COMMENT_GENERATION_STATIC_PROMPT not in user_prompt
+        assert "東京" in user_prompt
+        assert "爽やかな朝です" in user_prompt
+
+    @staticmethod
+    def _batch_items(count):
+        items = []
+        for index in range(count):
+            comment_pair = MagicMock()
+            comment_pair.weather_comment.comment_text = "爽やかな朝です"
+            comment_pair.advice_comment.comment_text = "日焼け対策を"
+            items.append(
+                {
+                    "weather_data": MagicMock(
+                        location=f"地点{index}", weather_description="晴れ", temperature=25.0
+                    ),
+                    "past_comments": comment_pair,
+                    "constraints": {"max_length": 15},
+                }
+            )
+        return items
+
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_generate_comments_batch(self, mock_anthropic_class):
+        """複数地点が1回のAPI呼び出しにまとめられるテスト"""
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value.content = [
+            MagicMock(text='```json\n["晴れて爽やか", "日差しに注意"]\n```')
+        ]
+        mock_anthropic_class.return_value = mock_client
+
+        provider = AnthropicProvider(api_key="test-key")
+        results = provider.generate_comments_batch(self._batch_items(2))
+
+        assert results == ["晴れて爽やか", "日差しに注意"]
+        mock_client.messages.create.assert_called_once()
+        user_prompt = mock_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "[1] 地点: 地点0" in user_prompt
+        assert "[2] 地点: 地点1" in user_prompt
+
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_generate_comments_batch_fallback(self, mock_anthropic_class):
+        """応答の件数が合わない場合は地点ごとの生成にフォールバックするテスト"""
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value.content = [MagicMock(text='["晴れて爽やか"]')]
+        mock_client.messages.stream.side_effect = [_text_stream("個別1"), _text_stream("個別2")]
+        mock_anthropic_class.return_value = mock_client
+
+        provider = AnthropicProvider(api_key="test-key")
+        results = provider.generate_comments_batch(self._batch_items(2))
+
+        assert results == ["個別1", "個別2"]
+        mock_client.messages.create.assert_called_once()
+        assert mock_client.messages.stream.call_count == 2
+
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_generate_comment_from_prompt(self, mock_anthropic_class):
+        """構築済みのプロンプトはテンプレートを通さずユーザーメッセージとして送るテスト"""
+        mock_client = mock_anthropic_class.return_value
+        mock_client.messages.stream.return_value = _text_stream("晴れて爽やか")
+
+        provider = AnthropicProvider(api_key="test-key")
+        with patch.object(provider, "_build_prompt_parts") as build_prompt_parts:
+            result = provider.generate_comment_from_prompt("構築済みプロンプト", {"temperature": 0.2})
+
+        assert result == "晴れて爽やか"
+        build_prompt_parts.assert_not_called()
+        call_kwargs = mock_client.messages.stream.call_args.kwargs
+        assert call_kwargs["messages"] == [{"role": "user", "content": "構築済みプロンプト"}]
+        assert call_kwargs["temperature"] == 0.2
+        assert call_kwargs["stop_sequences"] == ["。", "天気コメント:"]
+
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_stream_stops_at_length_limit(self, mock_anthropic_class):
+        """文字数の上限を超えた時点でストリームの受信を打ち切るテスト"""
+        deltas = iter(["晴れて", "爽やかな", "一日に", "なりそう", "です。", "お出かけ", "日和"])
+        stream = _text_stream()
+        stream.__enter__.return_value.text_stream = deltas
+        mock_anthropic_class.return_value.messages.stream.return_value = stream
+
+        provider = AnthropicProvider(api_key="test-key")
+        (item,) = self._batch_items(1)
+        item["constraints"] = {"max_length": 10}
+        result = provider.generate_comment(**item)
+
+        assert result == "晴れて爽やかな一日になりそうです。"
+        assert list(deltas) == ["お出かけ", "日和"]
+        stream.__enter__.return_value.close.assert_called_once()
+        stream.__exit__.assert_called_once()
+
+    @patch("src.llm.providers.anthropic_provider.AsyncAnthropic")
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_stream_request_kwargs(self, mock_anthropic_class, mock_async_class):
+        """同期・非同期のストリーミングで messages.stream に渡す引数が完全に一致するテスト"""
+        mock_anthropic_class.return_value.messages.stream.return_value = _text_stream("晴れ")
+        mock_async_client = MagicMock()
+        mock_async_client.messages.stream.return_value = _async_text_stream("晴れ")
+        mock_async_class.return_value = mock_async_client
+
+        provider = AnthropicProvider(api_key="test-key")
+        (item,) = self._batch_items(1)
+        provider.generate_comment(**item)
+        asyncio.run(provider.agenerate_comment(**item))
+
+        _, user_prompt = provider._build_prompt_parts(**item)
+        expected = {
+            "model": "claude-3-opus-20240229",
+            "max_tokens": 25,
+            "temperature": 0.7,
+            "stop_sequences": ["。", "天気コメント:"],
+            "system": provider._cached_system_blocks,
+            "messages": [{"role": "user", "content": user_prompt}],
+        }
+        mock_anthropic_class.return_value.messages.stream.assert_called_once_with(**expected)
+        mock_async_client.messages.stream.assert_called_once_with(**expected)
+
+    @patch("src.llm.providers.anthropic_provider.AsyncAnthropic")
+    @patch("src.llm.providers.anthropic_provider.Anthropic")
+    def test_anthropic_agenerate_comments(self, mock_anthropic_class, mock_async_class):
+        """非同期クライアントで複数地点を並行生成し、入力順で返すテスト"""
+        mock_async_client = MagicMock()
+        mock_async_client.messages.stream.side_effect = [
+            _async_text_stream("晴れて", "爽やか"),
+            RuntimeError("API error"),
+        ]
+        mock_async_class.return_value = mock_async_client
+
+        provider = AnthropicProvider(api_key="test-key")
+        results = asyncio.run(provider.agenerate_comments(self._batch_items(2)))
+
+        assert results[0] == "晴れて爽やか"
+        assert isinstance(results[1], RuntimeError)
+        assert mock_async_client.messages.stream.call_count == 2
+        mock_anthropic_class.return_value.messages.stream.assert_not_called()
+        call_kwargs = mock_async_client.messages.stream.call_args_list[0].kwargs
+        assert call_kwargs["system"] == provider._cached_system_blocks
 
 
 class TestPromptBuilding:
@@ -283,3 +975,144 @@ class TestPromptBuilding:
         assert "日焼け対策を" in prompt
         assert "15文字以内" in prompt
         assert "災害、危険" in prompt
+
+    def test_build_prompt_reuses_rendered_prompt(self):
+        """同じ入力のプロンプトはプロバイダーをまたいで組み立て済みのものを使い回すテスト"""
+        from src.llm.providers.base_provider import LLMProvider, _render_dynamic_prompt
+
+        class TestProvider(LLMProvider):
+            def generate_comment(self, weather_data, past_comments, constraints):
+                return ""
+
+            def generate(self, prompt, max_tokens=128, stop=None):
+                return ""
+
+        weather_data = MagicMock(location="東京", weather_description="晴れ", temperature=25.0)
+        comment_pair = MagicMock()
+        comment_pair.weather_comment.comment_text = "爽やかな朝です"
+        comment_pair.advice_comment.comment_text = "日焼け対策を"
+        constraints = {"max_length": 15, "ng_words": ["災害"], "time_period": "朝"}
+
+        _render_dynamic_prompt.cache_clear()
+        with patch(
+            "src.llm.providers.base_provider.render_comment_generation_prompt",
+            return_value="可変部分",
+        ) as render:
+            first = TestProvider()._build_prompt_parts(weather_data, comment_pair, constraints)
+            second = TestProvider()._build_prompt_parts(weather_data, comment_pair, constraints)
+            TestProvider()._build_prompt_parts(
+                weather_data, comment_pair, {**constraints, "time_period": "夜"}
+            )
+
+        assert first == second
+        assert render.call_count == 2
+        _render_dynamic_prompt.cache_clear()
+
+    def test_build_prompt_rejects_misplaced_static_prompt(self):
+        """固定部分が先頭にないプロンプトは ValueError になるテスト"""
+        from src.llm.providers.base_provider import LLMProvider
+
+        class TestProvider(LLMProvider):
+            def generate_comment(self, weather_data, past_comments, constraints):
+                return ""
+
+            def generate(self, prompt, max_tokens=128, stop=None):
+                return ""
+
+            def _build_prompt_parts(self, weather_data, past_comments, constraints):
+                return "", "可変部分"
+
+        with pytest.raises(ValueError):
+            TestProvider()._build_prompt(MagicMock(), MagicMock(), {})
+
+
+class TestCommentCache:
+    """プロバイダー単位のコメントキャッシュのテスト"""
+
+    @pytest.fixture
+    def provider(self):
+        """呼び出し回数を数えるテスト用プロバイダー"""
+        from src.llm.providers.base_provider import LLMProvider, cached_comment
+
+        class CountingProvider(LLMProvider):
+            model = "test-model"
+            calls = 0
+
+            @cached_comment
+            def generate_comment(self, weather_data, past_comments, constraints):
+                self.calls += 1
+                return f"コメント{self.calls}"
+
+            def generate(self, prompt):
+                return ""
+
+        return CountingProvider()
+
+    @pytest.fixture
+    def comment_cache(self):
+        """キャッシュを有効にし、テスト後に無効へ戻す"""
+        from src.llm.providers.base_provider import configure_comment_cache
+
+        configure_comment_cache()
+        yield
+        configure_comment_cache(max_entries=0)
+
+    @staticmethod
+    def _weather(temperature):
+        return MagicMock(location="東京", weather_description="晴れ", temperature=temperature)
+
+    def test_disabled_by_default(self, provider):
+        """既定ではキャッシュしない"""
+        constraints = {"time_period": "朝"}
+
+        provider.generate_comment(self._weather(25.0), None, constraints)
+        provider.generate_comment(self._weather(25.0), None, constraints)
+
+        assert provider.calls == 2
+
+    def test_temperature_bucket_hits(self, provider, comment_cache):
+        """丸めた気温が同じなら API を呼ばずに同じコメントを返す"""
+        constraints = {"time_period": "朝"}
+
+        first = provider.generate_comment(self._weather(25.2), None, constraints)
+        second = provider.generate_comment(
+            weather_data=self._weather(24.8), past_comments=None, constraints=constraints
+        )
+
+        assert first == second == "コメント1"
+        assert provider.calls == 1
+
+    def test_different_inputs_miss(self, provider, comment_cache):
+        """時間帯や気温帯が異なれば別のエントリになる"""
+        provider.generate_comment(self._weather(25.0), None, {"time_period": "朝"})
+        provider.generate_comment(self._weather(25.0), None, {"time_period": "夜"})
+        provider.generate_comment(self._weather(27.0), None, {"time_period": "朝"})
+
+        assert provider.calls == 3
+
+    def test_async_generation_is_cached(self, provider, comment_cache):
+        """非同期生成は同期生成と同じキャッシュを共有する"""
+        first = provider.generate_comment(self._weather(25.0), None, {"time_period": "朝"})
+        second = asyncio.run(
+            provider.agenerate_comment(self._weather(25.0), None, {"time_period": "朝"})
+        )
+
+        assert first == second == "コメント1"
+        assert provider.calls == 1
+
+    def test_persistent_cache_survives_restart(self, provider, tmp_path):
+        """SQLite に保存したコメントは再設定（再起動）後も再利用される"""
+        from src.llm.providers.base_provider import configure_comment_cache
+
+        path = str(tmp_path / "comments.db")
+        try:
+            configure_comment_cache(path=path)
+            provider.generate_comment(self._weather(25.0), None, {"time_period": "朝"})
+
+            configure_comment_cache(path=path)
+            result = provider.generate_comment(self._weather(25.0), None, {"time_period": "朝"})
+        finally:
+            configure_comment_cache(max_entries=0)
+
+        assert result == "コメント1"
+        assert provider.calls == 1
@@ -117,6 +117,28 @@ class TestLocation:
         assert location.matches_query("おおさか", fuzzy=True) == True
         assert location.matches_query("だいはん", fuzzy=True) == False  # 類似度が低い
 
+    def test_matches_query_fuzzy_length_prefilter(self):
+        """文字数差による足切りのテスト"""
+        location = Location(name="宮古島空港", normalized_name="宮古島空港")
+
+        with patch.object(Location, "_levenshtein_distance") as mock_distance:
+            assert location.matches_query("宮古嶋空港ターミナル", fuzzy=True) == False
+            mock_distance.assert_not_called()
+
+        assert location.matches_query("宮古嶋空港", fuzzy=True) == True
+
+    def test_matches_query_fuzzy_caches_similarity(self):
+        """同じ組み合わせの類似度がキャッシュされることのテスト"""
+        from src.data.location_manager import _fuzzy_similarity
+
+        _fuzzy_similarity.cache_clear()
+        location = Location(name="宮古島空港", normalized_name="宮古島空港")
+
+        assert location.matches_query("宮古嶋空港", fuzzy=True) == True
+        assert location.matches_query("宮古嶋空港", fuzzy=True) == True
+
+        assert _fuzzy_similarity.cache_info().hits == 1
+
     def test_levenshtein_distance(self):
         """レーベンシュタイン距離計算のテスト"""
         location = Location(name="東京", normalized_name="東京")
@@ -130,6 +152,21 @@ class TestLocation:
         # 完全に違う文字列
         assert location._levenshtein_distance("東京", "大阪") == 2
 
+        # 打ち切り距離を超える場合は max_distance + 1
+        assert location._levenshtein_distance("東京都庁", "大阪府庁", max_distance=1) == 2
+        assert location._levenshtein_distance("東京", "東大", max_distance=1) == 1
+
+        # rapidfuzz未導入時の純Python実装でも同じ結果
+        with patch("src.data.location_manager.RAPIDFUZZ_AVAILABLE", False):
+            assert location._levenshtein_distance("東京", "大阪") == 2
+            assert location._levenshtein_distance("東京都庁", "大阪府庁", max_distance=1) == 2
+
+    def test_location_has_no_instance_dict(self):
+        """__slots__によりインスタンス辞書を持たないことのテスト"""
+        location = Location(name="東京", normalized_name="東京")
+
+        assert not hasattr(location, "__dict__")
+
     def test_to_dict(self):
         """辞書変換のテスト"""
         location = Location(
@@ -197,6 +234,44 @@ class TestLocationManager:
                 # 異常なデータは除外される
                 assert len([name for name in location_names if len(name) > 20]) == 0
 
+    def test_load_from_parsed_cache(self):
+        """解析済み地点データのキャッシュ利用テスト"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "locations.csv")
+            with open(csv_path, "w", encoding="utf-8") as csv_file:
+                csv_file.write("地点名,緯度,経度\n東京,35.6762,139.6503\n")
+
+            cache_dir = os.path.join(tmp_dir, "cache")
+            first = LocationManager(csv_path, cache_dir=cache_dir)
+            assert len(os.listdir(cache_dir)) == 1
+
+            with patch("src.data.location_manager.csv.reader") as mock_reader:
+                second = LocationManager(csv_path, cache_dir=cache_dir)
+                mock_reader.assert_not_called()
+
+            assert [loc.to_dict() for loc in second.locations] == [
+                loc.to_dict() for loc in first.locations
+            ]
+            assert second.get_location("東京") is not None
+
+            # CSVが更新された場合は再解析される
+            with open(csv_path, "a", encoding="utf-8") as csv_file:
+                csv_file.write("大阪,34.6937,135.5023\n")
+            third = LocationManager(csv_path, cache_dir=cache_dir)
+            assert [loc.name for loc in third.locations] == ["東京", "大阪"]
+
+    def test_parallel_name_normalization(self):
+        """地点名の並列正規化が逐次処理と同じ結果になることのテスト"""
+        from src.data.location_manager import _normalize_location_names
+
+        names = ["東京１２３", " 大阪 ", "ｻｯﾎﾟﾛ", "那覇"]
+        expected = _normalize_location_names(names)
+
+        with patch("src.data.location_manager.PARALLEL_NORMALIZE_THRESHOLD", 0):
+            assert _normalize_location_names(names) == expected
+
+        assert expected == ["東京123", "大阪", "サッポロ", "那覇"]
+
     def test_search_location_exact_match(self):
         """完全一致検索のテスト"""
         manager = LocationManager()
@@ -242,6 +317,13 @@ class TestLocationManager:
         location = manager.get_location("存在しない地点")
         assert location is None
 
+    def test_get_location_uses_name_index(self):
+        """地点名インデックスによる完全一致取得のテスト"""
+        manager = LocationManager()
+
+        assert "東京" in manager.name_index
+        assert manager.get_location(" 東京 ") is manager.name_index["東京"]
+
     def test_get_locations_by_region(self):
         """地方別地点取得のテスト"""
         manager = LocationManager()
@@ -279,6 +361,20 @@ class TestLocationManager:
         # この実装では座標データがないため、空リストが返される
         assert isinstance(nearby, list)
 
+    def test_get_nearby_locations_sorted_by_distance(self):
+        """近隣地点が距離順に上位件数のみ返されることのテスト"""
+        manager = LocationManager()
+        manager.locations = [
+            Location(name="大阪", normalized_name="大阪", latitude=34.6937, longitude=135.5023),
+            Location(name="横浜", normalized_name="横浜", latitude=35.4437, longitude=139.6380),
+            Location(name="千葉", normalized_name="千葉", latitude=35.6074, longitude=140.1065),
+        ]
+
+        nearby = manager.get_nearby_locations((35.6762, 139.6503), radius_km=1000, max_results=2)
+
+        assert [loc.name for loc, _ in nearby] == ["横浜", "千葉"]
+        assert nearby[0][1] <= nearby[1][1]
+
     def test_get_all_locations(self):
         """全地点取得のテスト"""
         manager = LocationManager()
@@ -316,6 +412,54 @@ class TestLocationManager:
         if tokyo_key in manager.location_index:
             assert len(manager.location_index[tokyo_key]) > 0
 
+    def test_fuzzy_candidates_share_bigram(self):
+        """バイグラムインデックスによる候補絞り込みのテスト"""
+        manager = LocationManager()
+        manager.locations = [
+            Location(name="東京", normalized_name="東京"),
+            Location(name="大阪", normalized_name="大阪"),
+            Location(name="東京湾", normalized_name="東京湾"),
+        ]
+        manager._build_index()
+
+        assert manager._fuzzy_candidates("東京港") == [2]
+        assert manager._fuzzy_candidates("札幌") == []
+        # 文字数差だけで類似度が届かない地点は除外
+        assert manager._fuzzy_candidates("東京湾岸エリア") == []
+        assert manager.normalized_names == ["東京", "大阪", "東京湾"]
+        assert list(manager.name_lengths) == [2, 2, 3]
+
+    def test_fuzzy_search_without_rapidfuzz(self):
+        """rapidfuzz未導入時も同じあいまい検索結果になることのテスト"""
+        manager = LocationManager()
+        manager.locations = [
+            Location(name="宮古", normalized_name="宮古"),
+            Location(name="宮古島", normalized_name="宮古島"),
+            Location(name="大阪", normalized_name="大阪"),
+        ]
+        manager._build_index()
+
+        expected = [loc.name for loc in manager.search_location("宮古じま", fuzzy=True)]
+        with patch("src.data.location_manager.RAPIDFUZZ_AVAILABLE", False):
+            actual = [loc.name for loc in manager.search_location("宮古じま", fuzzy=True)]
+
+        assert actual == expected
+        assert "大阪" not in actual
+
+    def test_fuzzy_search_returns_all_duplicate_names(self):
+        """正規化名が重複する地点がすべて返されることのテスト"""
+        manager = LocationManager()
+        manager.locations = [
+            Location(name="宮古島空港", normalized_name="宮古島空港", latitude=24.78),
+            Location(name="大阪", normalized_name="大阪"),
+            Location(name="宮古島空港", normalized_name="宮古島空港", latitude=24.79),
+        ]
+        manager._build_index()
+
+        results = manager.search_location("宮古嶋空港", fuzzy=True)
+
+        assert [loc.latitude for loc in results] == [24.78, 24.79]
+
 
 class TestGlobalFunctions:
     """グローバル関数のテスト"""
@@ -345,6 +489,29 @@ class TestGlobalFunctions:
             assert "大阪" in location_names
             assert "名古屋" in location_names
 
+    def test_load_locations_from_csv_reuses_manager(self):
+        """同一CSVの再読み込みでLocationManagerが再利用されることのテスト"""
+        from src.data import location_manager
+
+        location_manager._get_cached_manager.cache_clear()
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", encoding="utf-8", delete=False
+        ) as csv_file:
+            csv_file.write("地点名,緯度,経度\n東京,35.6762,139.6503\n")
+
+        try:
+            with patch.object(
+                location_manager, "LocationManager", wraps=LocationManager
+            ) as mock_manager:
+                first = load_locations_from_csv(csv_file.name)
+                second = load_locations_from_csv(csv_file.name)
+
+            assert mock_manager.call_count == 1
+            assert [loc.name for loc in first] == [loc.name for loc in second] == ["東京"]
+        finally:
+            os.unlink(csv_file.name)
+            location_manager._get_cached_manager.cache_clear()
+
     def test_search_location_function(self):
         """検索関数のテスト"""
         results = search_location("東京")
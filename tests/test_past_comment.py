@@ -2,9 +2,18 @@
 過去コメントデータクラスのテスト
 """
 
+import json
+
 import pytest
 from datetime import datetime
-from src.data.past_comment import PastComment, PastCommentCollection, CommentType
+from unittest.mock import patch
+from src.data.past_comment import (
+    PastComment,
+    PastCommentCollection,
+    CommentType,
+    _fuzzy_weather_match,
+    _resolve_weather_bases,
+)
 
 
 class TestPastComment:
@@ -80,6 +89,40 @@ class TestPastComment:
         # あいまい検索
         assert comment.matches_weather_condition("快晴", fuzzy=True)
         assert comment.matches_weather_condition("sunny", fuzzy=True)
+        assert comment.matches_weather_condition("SUNNY", fuzzy=True)
+        assert not comment.matches_weather_condition("大雨", fuzzy=True)
+
+    def test_weather_condition_matching_is_cached(self):
+        """天気状況のあいまい判定結果がキャッシュされることのテスト"""
+        _fuzzy_weather_match.cache_clear()
+        comments = [
+            PastComment(
+                location=location,
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text="良い天気",
+                comment_type=CommentType.WEATHER_COMMENT,
+            )
+            for location in ["東京", "大阪", "福岡"]
+        ]
+
+        assert all(c.matches_weather_condition("快晴") for c in comments)
+        assert _fuzzy_weather_match.cache_info().hits == 2
+
+    def test_weather_condition_exact_match_skips_fuzzy(self):
+        """完全一致の場合はあいまい判定を行わないことのテスト"""
+        comment = PastComment(
+            location="東京",
+            datetime=datetime.now(),
+            weather_condition="晴れ",
+            comment_text="良い天気",
+            comment_type=CommentType.WEATHER_COMMENT,
+        )
+
+        with patch("src.data.past_comment._fuzzy_weather_match") as mock_match:
+            assert comment.matches_weather_condition("晴れ")
+            assert comment.calculate_similarity_score("晴れ") == 0.5
+            mock_match.assert_not_called()
 
     def test_similarity_calculation(self):
         """類似度計算のテスト"""
@@ -122,6 +165,100 @@ class TestPastComment:
         assert comment_dict["comment_type"] == "advice"
         assert comment_dict["temperature"] == 18.0
 
+    def test_comment_type_string_is_coerced(self):
+        """文字列で渡されたコメントタイプが列挙型に正規化されるかのテスト"""
+        def make(comment_type):
+            return PastComment(
+                location="福岡",
+                datetime=datetime(2024, 6, 5, 15, 0),
+                weather_condition="曇り",
+                comment_text="少し肌寒いです",
+                comment_type=comment_type,
+            )
+
+        assert make("advice").comment_type is CommentType.ADVICE
+        assert make("advice").to_dict()["comment_type"] == "advice"
+        assert make("invalid_type").comment_type is CommentType.UNKNOWN
+
+    def test_lowercase_fields_are_precomputed(self):
+        """小文字化済みの地点名・天気状況が初期化時に保持されるかのテスト"""
+        comment = PastComment(
+            location="Tokyo",
+            datetime=datetime(2024, 6, 5, 12, 0),
+            weather_condition="Sunny",
+            comment_text="良い天気",
+            comment_type=CommentType.WEATHER_COMMENT,
+        )
+
+        assert comment._location_lower == "tokyo"
+        assert comment._weather_condition_lower == "sunny"
+        assert comment.matches_weather_condition("晴れ")
+        assert "_weather_condition_lower" not in comment.to_dict()
+
+        collection = PastCommentCollection(comments=[comment])
+        assert len(collection.filter_by_location("TOKYO").comments) == 1
+
+    def test_from_dict_raw_data_copy(self):
+        """raw_data のコピー有無のテスト"""
+        data = {
+            "location": "東京",
+            "datetime": "2024-06-05T12:00:00",
+            "weather_condition": "晴れ",
+            "comment_text": "良い天気",
+            "comment_type": "weather_comment",
+            "count": 120,
+        }
+
+        copied = PastComment.from_dict(data)
+        assert copied.raw_data == data
+        assert copied.raw_data is not data
+
+        owned = PastComment.from_dict(data, copy_raw=False)
+        assert owned.raw_data is data
+        assert owned.raw_data["count"] == 120
+
+    def test_from_dict_without_validation(self):
+        """検証を省略した復元のテスト"""
+        comment = PastComment(
+            location="東京",
+            datetime=datetime(2024, 6, 5, 12, 0),
+            weather_condition="Sunny",
+            comment_text="良い天気",
+            comment_type=CommentType.WEATHER_COMMENT,
+            temperature=22.5,
+        )
+
+        restored = PastComment.from_dict(comment.to_dict(), validate=False)
+        assert restored.to_dict() == comment.to_dict()
+        assert restored.comment_type is CommentType.WEATHER_COMMENT
+        assert restored._weather_condition_lower == "sunny"
+
+        # 検証しない場合は不正な値でも例外にならない
+        data = {"location": "東京", "weather_condition": "晴れ", "comment_text": ""}
+        with pytest.raises(ValueError):
+            PastComment.from_dict(data)
+        assert PastComment.from_dict(data, validate=False).comment_text == ""
+
+    def test_repeated_strings_are_interned(self):
+        """同じ地点名・天気状況が1つの文字列オブジェクトに集約されるかのテスト"""
+        comments = [
+            PastComment.from_dict(
+                {
+                    "location": "".join(["東", "京"]),
+                    "datetime": "2024-06-05T12:00:00",
+                    "weather_condition": "".join(["晴", "れ"]),
+                    "comment_text": "良い天気",
+                    "comment_type": "weather_comment",
+                    "weather_code": "".join(["1", "00"]),
+                }
+            )
+            for _ in range(2)
+        ]
+
+        assert comments[0].location is comments[1].location
+        assert comments[0].weather_condition is comments[1].weather_condition
+        assert comments[0].weather_code is comments[1].weather_code
+
     def test_from_dict_creation(self):
         """辞書からの生成テスト"""
         data = {
@@ -140,6 +277,13 @@ class TestPastComment:
         assert comment.comment_type == CommentType.ADVICE
         assert comment.temperature == -2.0
 
+    def test_resolve_weather_bases(self):
+        """天気状況に含まれる基本天気の検出テスト"""
+        assert _resolve_weather_bases("大雨") == {"雨"}
+        assert _resolve_weather_bases("晴れのち小雪") == {"晴れ", "雪"}
+        assert _resolve_weather_bases("sunny and windy") == {"晴れ", "風"}
+        assert _resolve_weather_bases("不明") == frozenset()
+
 
 class TestPastCommentCollection:
     """PastCommentCollection クラスのテスト"""
@@ -265,6 +409,61 @@ class TestPastCommentCollection:
         assert len(advice_comments.comments) == 1
         assert advice_comments.comments[0].comment_text == "水分補給を"
 
+    def test_filters_follow_replaced_comment_list(self):
+        """comments の差し替え・追加後もフィルタ結果が追従するかのテスト"""
+        def make(location, comment_type):
+            return PastComment(
+                location=location,
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text="良い天気",
+                comment_type=comment_type,
+            )
+
+        collection = PastCommentCollection(
+            comments=[make("東京", CommentType.WEATHER_COMMENT), make("大阪", CommentType.ADVICE)]
+        )
+        assert len(collection.filter_by_location("東京", exact_match=True).comments) == 1
+
+        # リストの差し替え（S3 リポジトリの件数制限と同じ操作）
+        collection.comments = collection.comments[:1]
+        assert collection.filter_by_comment_type(CommentType.ADVICE).comments == []
+
+        # 末尾への追加
+        collection.comments.append(make("東京都", CommentType.ADVICE))
+        assert len(collection.filter_by_location("東京").comments) == 2
+        assert len(collection.filter_by_comment_type(CommentType.ADVICE).comments) == 1
+
+        # 同じ長さのままの要素の入れ替え
+        collection.comments[0] = make("大阪", CommentType.WEATHER_COMMENT)
+        assert collection.filter_by_location("東京", exact_match=True).comments == []
+        assert collection.comments_by_condition["晴れ"] == collection.comments
+
+    def test_comments_by_condition(self):
+        """天気状況ごとの分類と、comments の追加への追従のテスト"""
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime.now(),
+                weather_condition=condition,
+                comment_text=f"コメント{i}",
+                comment_type=CommentType.WEATHER_COMMENT,
+            )
+            for i, condition in enumerate(["晴れ", "雨", "晴れ"])
+        ]
+        collection = PastCommentCollection(comments=comments[:2])
+
+        assert collection.comments_by_condition == {"晴れ": [comments[0]], "雨": [comments[1]]}
+        assert collection.comments_by_condition is collection.comments_by_condition
+
+        collection.comments.append(comments[2])
+        assert collection.comments_by_condition["晴れ"] == [comments[0], comments[2]]
+        assert collection.filter_by_weather_condition("晴れ", fuzzy=False).comments == [
+            comments[0],
+            comments[2],
+        ]
+        assert collection.filter_by_weather_condition("曇り", fuzzy=False).comments == []
+
     def test_get_similar_comments(self):
         """類似コメント取得のテスト"""
         comments = [
@@ -311,6 +510,61 @@ class TestPastCommentCollection:
         assert similar[0].temperature == 25.0
         assert similar[1].temperature == 30.0
 
+    def test_get_similar_comments_skips_unreachable_weather_match(self):
+        """最小類似度に届かないコメントは天気状況の判定を省略するテスト"""
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text="暖かい",
+                comment_type=CommentType.WEATHER_COMMENT,
+                temperature=25.0,
+            ),
+            PastComment(
+                location="札幌",
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text="寒い",
+                comment_type=CommentType.WEATHER_COMMENT,
+                temperature=0.0,
+            ),
+        ]
+        collection = PastCommentCollection(comments=comments)
+
+        with patch(
+            "src.data.past_comment._fuzzy_weather_match", wraps=_fuzzy_weather_match
+        ) as mock_match:
+            similar = collection.get_similar_comments(
+                target_weather_condition="快晴",
+                target_temperature=25.0,
+                target_location="東京",
+                min_similarity=0.8,
+            )
+
+        assert [c.location for c in similar] == ["東京"]
+        assert mock_match.call_count == 1
+
+    def test_get_similar_comments_top_k_order(self):
+        """上位件数の切り出しと同スコア時の並び順のテスト"""
+        temperatures = [10.0, 25.0, 20.0, 25.0, 15.0]
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text=f"コメント{i}",
+                comment_type=CommentType.WEATHER_COMMENT,
+                temperature=temperature,
+            )
+            for i, temperature in enumerate(temperatures)
+        ]
+        collection = PastCommentCollection(comments=comments)
+
+        similar = collection.get_similar_comments("晴れ", 25.0, max_results=3)
+
+        assert [c.comment_text for c in similar] == ["コメント1", "コメント3", "コメント2"]
+
     def test_get_statistics(self):
         """統計情報取得のテスト"""
         comments = [
@@ -340,6 +594,81 @@ class TestPastCommentCollection:
         assert stats["character_stats"]["max_length"] == 15
         assert stats["character_stats"]["within_15_chars"] == 2
 
+    def test_get_statistics_returns_native_types(self):
+        """統計値が JSON 化可能なネイティブ型で、未出現タイプも0で含まれるかのテスト"""
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text=text,
+                comment_type=CommentType.WEATHER_COMMENT,
+            )
+            for text in ("晴れ", "よく晴れる一日", "洗濯日和です")
+        ]
+
+        stats = PastCommentCollection(comments=comments).get_statistics()
+
+        assert stats["type_distribution"] == {
+            "weather_comment": 3,
+            "advice": 0,
+            "unknown": 0,
+        }
+        char_stats = stats["character_stats"]
+        assert char_stats == {
+            "min_length": 2,
+            "max_length": 7,
+            "avg_length": 5.0,
+            "within_15_chars": 3,
+        }
+        assert type(char_stats["min_length"]) is int
+        assert type(char_stats["avg_length"]) is float
+        json.dumps(stats)
+
+    def test_get_statistics_location_top10(self):
+        """地点別集計が件数の多い上位10地点（同数は出現順）になるかのテスト"""
+        locations = ["札幌"] * 3 + ["那覇"] * 5 + [f"地点{i}" for i in range(12)]
+        comments = [
+            PastComment(
+                location=location,
+                datetime=datetime.now(),
+                weather_condition="晴れ",
+                comment_text="良い天気",
+                comment_type=CommentType.ADVICE,
+            )
+            for location in locations
+        ]
+
+        stats = PastCommentCollection(comments=comments).get_statistics()
+
+        assert list(stats["location_distribution"].items()) == [
+            ("那覇", 5),
+            ("札幌", 3),
+        ] + [(f"地点{i}", 1) for i in range(8)]
+        assert stats["type_distribution"] == {"weather_comment": 0, "advice": 20, "unknown": 0}
+
+    def test_export_json(self):
+        """JSON エクスポートが to_dict と同じ内容になるかのテスト"""
+        comments = [
+            PastComment(
+                location="東京",
+                datetime=datetime(2024, 6, 5, 12, 0),
+                weather_condition="晴れ",
+                comment_text="爽やかな朝",
+                comment_type=CommentType.WEATHER_COMMENT,
+                temperature=22.5,
+            )
+        ]
+        collection = PastCommentCollection(
+            comments=comments, loaded_at=datetime(2024, 6, 5, 13, 0)
+        )
+
+        exported = collection.export_json()
+
+        assert isinstance(exported, bytes)
+        assert json.loads(exported) == collection.to_dict()
+        assert "爽やかな朝".encode("utf-8") in exported
+
 
 class TestCommentType:
     """CommentType 列挙型のテスト"""
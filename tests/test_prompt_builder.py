@@ -0,0 +1,259 @@
+"""
+プロンプトビルダーのテスト
+"""
+
+import pytest
+from datetime import datetime
+
+from src.data.weather_data import WeatherCondition, WeatherForecast, WindDirection
+from src.llm.prompt_builder import CommentPromptBuilder
+
+
+@pytest.fixture
+def weather_data():
+    """テスト用の天気予報（夏の朝・晴れ）"""
+    return WeatherForecast(
+        location="東京",
+        datetime=datetime(2024, 7, 1, 8, 0),
+        temperature=28.0,
+        weather_code="100",
+        weather_condition=WeatherCondition.CLEAR,
+        weather_description="晴れ",
+        precipitation=0.0,
+        humidity=60.0,
+        wind_speed=2.0,
+        wind_direction=WindDirection.N,
+        wind_direction_degrees=0,
+    )
+
+
+class TestCommentPromptBuilder:
+    """CommentPromptBuilder のテスト"""
+
+    def test_static_prefix_comes_first(self, weather_data):
+        """入力によらない固定部分が先頭にあり、可変部分に気象データが入る"""
+        builder = CommentPromptBuilder()
+
+        static_prefix, dynamic_suffix = builder.build_prompt_parts(weather_data)
+
+        assert static_prefix == builder.templates.static_prefix
+        assert "{" not in static_prefix
+        assert "東京" in dynamic_suffix
+        assert "28.0°C" in dynamic_suffix
+        assert dynamic_suffix.endswith("天気コメント:")
+        assert builder.build_prompt(weather_data) == static_prefix + dynamic_suffix
+
+    def test_guidance_sections(self, weather_data):
+        """rich では天気・季節・時間帯の指示が追加される"""
+        prompt = CommentPromptBuilder().build_prompt(weather_data, verbosity="rich")
+
+        assert "晴天の爽やかさを表現" in prompt
+        assert "暑さ対策や夏の楽しみを含める" in prompt
+        assert "おはようの挨拶や一日の始まりの表現" in prompt
+        assert "2024-07-01 08:00\n" in prompt
+
+    def test_guidance_verbosity(self, weather_data):
+        """既定（minimal）では追加指示を省き、季節・時間帯の語だけを時刻に添える"""
+        builder = CommentPromptBuilder()
+
+        minimal = builder.build_prompt(weather_data)
+        standard = builder.build_prompt(weather_data, verbosity="standard")
+
+        assert "2024-07-01 08:00（夏・朝）" in minimal
+        assert "留意点" not in minimal
+        assert "## 季節の表現" not in minimal
+        assert "## 時間帯の表現" not in minimal
+        assert minimal.endswith("天気コメント:")
+        assert "## 天気別の留意点" in standard
+        assert "晴天の爽やかさを表現" in standard
+        assert "## 季節の表現" not in standard
+        assert "2024-07-01 08:00（夏・朝）" in standard
+        rich = builder.build_prompt(weather_data, verbosity="rich")
+        assert len(minimal) < len(standard) < len(rich)
+
+    def test_past_comments_formatting_is_reused(self, weather_data):
+        """同じ過去コメントからのプロンプト構築ではフォーマット結果を再利用する"""
+        from src.data.past_comment import PastComment
+
+        builder = CommentPromptBuilder()
+        past_comments = [
+            PastComment(
+                location="大阪",
+                datetime=datetime(2024, 7, 1, 8, 0),
+                weather_condition="晴れ",
+                comment_text="爽やかな朝です",
+                comment_type="weather_comment",
+            ),
+            "日差しに注意",
+        ]
+
+        first = builder._format_past_comments(past_comments, None)
+        weather_line, plain_line = first.split("\n")
+        assert weather_line.startswith("- 「爽やかな朝です」 (")
+        assert weather_line.endswith(", 地点:大阪)")
+        assert plain_line == "- 「日差しに注意」 (地点:不明)"
+
+        builder._render_past_comments = None
+        assert "爽やかな朝です" in builder.build_prompt(weather_data, past_comments)
+        assert builder._format_past_comments(past_comments, None) is first
+
+        builder.clear_format_cache()
+        assert not builder._format_cache
+
+    def test_extract_weather_info_partial_object(self, weather_data):
+        """属性が欠けた入力には既定値を補い、文字列の日時はそのまま使う"""
+        from types import SimpleNamespace
+
+        builder = CommentPromptBuilder()
+
+        assert builder._extract_weather_info(weather_data)["current_time"] == "2024-07-01 08:00"
+        info = builder._extract_weather_info(
+            SimpleNamespace(location="大阪", datetime="2024-12-01 18:00")
+        )
+        assert info == {
+            "location": "大阪",
+            "weather_description": "不明",
+            "temperature": "不明",
+            "humidity": "不明",
+            "wind_speed": "不明",
+            "current_time": "2024-12-01 18:00",
+        }
+
+    def test_weather_automaton_matches_regex(self, monkeypatch):
+        """天気名が多い場合の Aho-Corasick 判定は正規表現と同じ天気を選ぶ"""
+        pytest.importorskip("ahocorasick")
+        from src.llm.prompt_builder import AHOCORASICK_MIN_PATTERNS
+
+        names = ["雷雨", "霧雨", "小雨", "みぞれ", "雨", "大雨"] + [
+            f"天気{i}" for i in range(AHOCORASICK_MIN_PATTERNS)
+        ]
+        load_templates = CommentPromptBuilder._load_templates
+
+        def load_many_conditions(self):
+            templates = load_templates(self)
+            templates.weather_specific = {name: f"{name}の指示" for name in names}
+            return templates
+
+        monkeypatch.setattr(CommentPromptBuilder, "_load_templates", load_many_conditions)
+        builder = CommentPromptBuilder()
+        assert builder._weather_automaton is not None
+
+        for description in ["曇り時々雷雨", "小雨のち雨", "大雨", "晴れ", "みぞれまじりの霧雨"]:
+            match = builder._weather_re.search(description)
+            expected = f"{match.group(0)}の指示" if match else ""
+            assert builder._get_weather_specific_guidance(description) == expected
+
+    def test_custom_prompt_prepares_only_referenced_fields(self, weather_data):
+        """カスタムテンプレートは参照する変数だけを用意し、str.format と同じ結果を返す"""
+        from src.llm.prompt_builder import EXAMPLE_TEMPLATES
+
+        builder = CommentPromptBuilder()
+        past_comments = ["日差しに注意"]
+
+        template = EXAMPLE_TEMPLATES["detailed"]
+        prompt = builder.create_custom_prompt(template, weather_data, past_comments)
+        assert prompt == template.format(
+            **builder._extract_weather_info(weather_data),
+            past_comments_examples="- 「日差しに注意」 (地点:不明)",
+        )
+
+        builder._format_past_comments = None
+        assert builder.create_custom_prompt(
+            "{location}の{weather_description}（{note}）", weather_data, past_comments, note="夏"
+        ) == "東京の晴れ（夏）"
+        assert builder.create_custom_prompt("{unknown}", weather_data).startswith("15文字以内で")
+
+    def test_build_prompts_batch(self, weather_data):
+        """複数地点のプロンプトを地点ごとの build_prompt と同じ内容・順序で返す"""
+        from dataclasses import replace
+
+        builder = CommentPromptBuilder()
+        weather_list = [weather_data, replace(weather_data, location="大阪")]
+        past_comments = ["日差しに注意"]
+
+        prompts = builder.build_prompts_batch(weather_list, past_comments)
+
+        assert len(builder._suffix_cache) == 1
+        assert prompts == [builder.build_prompt(w, past_comments) for w in weather_list]
+        assert "大阪" in prompts[1]
+
+        builder.clear_format_cache()
+        prompt = builder.build_prompt(weather_data, past_comments, location="{location}の{0}")
+        assert "- 地点: {location}の{0}\n" in prompt
+        assert "\x00" not in prompt
+
+
+class TestCompileTemplate:
+    """compile_template のテスト"""
+
+    def test_matches_str_format(self):
+        """str.format と同じ結果を返す"""
+        from src.llm.prompt_builder import COMPILED_EXAMPLE_TEMPLATES, EXAMPLE_TEMPLATES
+
+        values = {
+            "location": "東京",
+            "weather_description": "晴れ",
+            "temperature": 25.0,
+            "current_time": "2024-07-01 08:00",
+            "past_comments_examples": "- 「100%晴れ」",
+        }
+        for name, template in EXAMPLE_TEMPLATES.items():
+            assert COMPILED_EXAMPLE_TEMPLATES[name](**values) == template.format(**values)
+
+    def test_literal_percent_and_missing_key(self):
+        """テンプレート中の % はそのまま残り、不足したキーは KeyError になる"""
+        from src.llm.prompt_templates import compile_template
+
+        render = compile_template("湿度{humidity}% {{固定}}")
+
+        assert render(humidity=60) == "湿度60% {固定}"
+        with pytest.raises(KeyError):
+            render()
+
+    def test_format_spec_falls_back(self):
+        """書式指定を含むテンプレートは str.format で描画する"""
+        from src.llm.prompt_templates import compile_template
+
+        assert compile_template("{temperature:.1f}℃")(temperature=25) == "25.0℃"
+
+
+class TestWeatherGuidance:
+    """天気別の指示のテスト"""
+
+    def test_first_weather_in_description_is_used(self):
+        """説明文中で最初に現れる天気の指示を返す"""
+        builder = CommentPromptBuilder()
+        weather_specific = builder.templates.weather_specific
+
+        assert builder._get_weather_specific_guidance("晴れ時々曇り") == weather_specific["晴れ"]
+        assert builder._get_weather_specific_guidance("雨のち晴れ") == weather_specific["雨"]
+        assert builder._get_weather_specific_guidance("霧") == ""
+
+
+class TestSeasonAndTime:
+    """季節・時間帯の判定のテスト"""
+
+    @pytest.mark.parametrize(
+        "current_time, expected",
+        [
+            ("2024-03-01 05:00", (3, 5)),
+            ("2024-12-31 23:59", (12, 23)),
+            ("不明", None),
+            ("2024-13-01 08:00", None),
+        ],
+    )
+    def test_parse_month_hour(self, current_time, expected):
+        """月と時を文字列から直接取り出す"""
+        from src.llm.prompt_builder import _parse_month_hour
+
+        assert _parse_month_hour(current_time) == expected
+
+    def test_guidance_by_month_and_hour(self):
+        """月・時から季節・時間帯の指示を返す"""
+        builder = CommentPromptBuilder()
+        templates = builder.templates
+
+        assert builder._get_seasonal_guidance(2) == templates.seasonal_adjustments["冬"]
+        assert builder._get_seasonal_guidance(9) == templates.seasonal_adjustments["秋"]
+        assert builder._get_time_specific_guidance(4) == templates.time_specific["夜"]
+        assert builder._get_time_specific_guidance(17) == templates.time_specific["夕方"]
@@ -37,6 +37,27 @@ class TestWeatherForecast:
         assert forecast.weather_description == "晴れ"
         assert forecast.precipitation == 0.0
 
+    def test_epoch_is_precomputed(self):
+        """予報日時のタイムスタンプが初期化時に計算されるかのテスト（naive は JST）"""
+        kwargs = dict(
+            location="東京",
+            temperature=20.5,
+            weather_code="100",
+            weather_condition=WeatherCondition.CLEAR,
+            weather_description="晴れ",
+            precipitation=0.0,
+            humidity=50.0,
+            wind_speed=5.0,
+            wind_direction=WindDirection.N,
+            wind_direction_degrees=0,
+        )
+        aware = WeatherForecast(datetime=datetime(2024, 1, 1, 3, 0, tzinfo=timezone.utc), **kwargs)
+        naive = WeatherForecast(datetime=datetime(2024, 1, 1, 12, 0), **kwargs)
+
+        assert aware._epoch == datetime(2024, 1, 1, 3, 0, tzinfo=timezone.utc).timestamp()
+        assert naive._epoch == aware._epoch
+        assert "_epoch" not in aware.to_dict()
+
     def test_weather_forecast_validation(self):
         """天気予報データの妥当性検証テスト"""
         # 異常な気温
@@ -271,6 +292,90 @@ class TestWeatherForecastCollection:
         assert summary["max_temperature"] > summary["min_temperature"]
         assert summary["total_precipitation"] > 0
 
+    def test_get_daily_summary_values(self):
+        """日次サマリーの集計値と、予報追加後の再集計テスト"""
+
+        def make(hour, temperature, precipitation):
+            return WeatherForecast(
+                location="東京",
+                datetime=datetime(2024, 1, 1, hour, 0, tzinfo=timezone.utc),
+                temperature=temperature,
+                weather_code="100",
+                weather_condition=WeatherCondition.CLEAR,
+                weather_description="晴れ",
+                precipitation=precipitation,
+                humidity=50.0,
+                wind_speed=5.0,
+                wind_direction=WindDirection.N,
+                wind_direction_degrees=0,
+            )
+
+        collection = WeatherForecastCollection(
+            location="東京", forecasts=[make(6, 10.0, 0.0), make(12, 20.0, 1.5)]
+        )
+
+        summary = collection.get_daily_summary()
+        assert summary == {
+            "max_temperature": 20.0,
+            "min_temperature": 10.0,
+            "avg_temperature": 15.0,
+            "total_precipitation": 1.5,
+            "max_precipitation": 1.5,
+            "forecast_count": 2,
+        }
+        assert type(summary["max_temperature"]) is float
+
+        collection.forecasts.append(make(18, 30.0, 4.5))
+        summary = collection.get_daily_summary()
+        assert summary["max_temperature"] == 30.0
+        assert summary["total_precipitation"] == 6.0
+        assert summary["forecast_count"] == 3
+
+        # 同じ長さのままの要素の入れ替え
+        collection.forecasts[2] = make(18, 5.0, 0.0)
+        summary = collection.get_daily_summary()
+        assert summary["max_temperature"] == 20.0
+        assert summary["total_precipitation"] == 1.5
+
+    def test_get_nearest_forecast_unsorted(self):
+        """並び順に依存せず最も近い予報・指定時刻の予報を取得できるかのテスト"""
+
+        def make(hour):
+            return WeatherForecast(
+                location="東京",
+                datetime=datetime(2024, 1, 1, hour, 0, tzinfo=timezone.utc),
+                temperature=10.0,
+                weather_code="100",
+                weather_condition=WeatherCondition.CLEAR,
+                weather_description="晴れ",
+                precipitation=0.0,
+                humidity=50.0,
+                wind_speed=5.0,
+                wind_direction=WindDirection.N,
+                wind_direction_degrees=0,
+            )
+
+        forecasts = [make(h) for h in (12, 3, 9, 6)]
+        collection = WeatherForecastCollection(location="東京", forecasts=forecasts)
+
+        target = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+        assert collection.get_nearest_forecast(target) is forecasts[2]
+        # 等距離の場合はリスト内で先にある予報を返す
+        target = datetime(2024, 1, 1, 7, 30, tzinfo=timezone.utc)
+        assert collection.get_nearest_forecast(target) is forecasts[2]
+        # 範囲外は端の予報
+        target = datetime(2024, 1, 2, 0, 0, tzinfo=timezone.utc)
+        assert collection.get_nearest_forecast(target) is forecasts[0]
+
+        assert collection.get_forecast_by_hour(6) is forecasts[3]
+        assert collection.get_forecast_by_hour(7) is None
+
+        collection.forecasts.append(make(7))
+        assert collection.get_forecast_by_hour(7) is collection.forecasts[-1]
+
+        # naive な日時は JST として扱う（JST 12:00 = UTC 3:00）
+        assert collection.get_nearest_forecast(datetime(2024, 1, 1, 12, 0)) is forecasts[1]
+
     def test_filter_by_time_range(self):
         """時間範囲フィルタリングテスト"""
         base_time = datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc)
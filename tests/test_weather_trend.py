@@ -0,0 +1,75 @@
+"""
+気象変化傾向データクラスのテスト
+"""
+
+import pytest
+from datetime import datetime, timezone
+from src.data.weather_data import WeatherCondition, WindDirection, WeatherForecast
+from src.config.comment_config import get_comment_config, reload_comment_config
+from src.data.weather_trend import TrendDirection, WeatherTrend
+
+
+def _make_forecast(hour, temperature, condition, precipitation=0.0):
+    """テスト用の天気予報を作成"""
+    return WeatherForecast(
+        location="東京",
+        datetime=datetime(2024, 1, 1, hour, 0, tzinfo=timezone.utc),
+        temperature=temperature,
+        weather_code="100",
+        weather_condition=condition,
+        weather_description="",
+        precipitation=precipitation,
+        humidity=50.0,
+        wind_speed=2.0,
+        wind_direction=WindDirection.N,
+        wind_direction_degrees=0,
+    )
+
+
+class TestWeatherTrend:
+    """WeatherTrend クラスのテスト"""
+
+    def test_from_forecasts_aggregates(self):
+        """気温・降水量・天気変化の集計テスト"""
+        forecasts = [
+            _make_forecast(9, 18.0, WeatherCondition.CLEAR),
+            _make_forecast(12, 22.0, WeatherCondition.CLOUDY, 0.5),
+            _make_forecast(15, 16.0, WeatherCondition.RAIN, 3.0),
+            _make_forecast(18, 19.0, WeatherCondition.RAIN, 1.5),
+        ]
+
+        trend = WeatherTrend.from_forecasts(forecasts)
+
+        assert trend.max_temperature == 22.0
+        assert trend.min_temperature == 16.0
+        assert trend.temperature_change == 1.0
+        assert trend.temperature_trend == TrendDirection.STABLE
+        assert trend.precipitation_total == 5.0
+        assert trend.has_weather_change is True
+        assert trend.weather_changes == [
+            (forecasts[1].datetime, "clear", "cloudy"),
+            (forecasts[2].datetime, "cloudy", "rain"),
+        ]
+        assert trend.weather_trend == TrendDirection.FLUCTUATING
+
+    def test_from_forecasts_requires_two_forecasts(self):
+        """予報が1つしかない場合のエラーテスト"""
+        with pytest.raises(ValueError):
+            WeatherTrend.from_forecasts([_make_forecast(9, 18.0, WeatherCondition.CLEAR)])
+
+    def test_weather_scores_follow_config_reload(self):
+        """天気スコアのキャッシュが設定の再読み込みで更新されるかのテスト"""
+        forecasts = [
+            _make_forecast(9, 18.0, WeatherCondition.CLEAR),
+            _make_forecast(12, 18.0, WeatherCondition.RAIN),
+        ]
+        try:
+            assert WeatherTrend.from_forecasts(forecasts).weather_trend == TrendDirection.WORSENING
+
+            config = reload_comment_config()
+            config.weather_scores[WeatherCondition.RAIN] = 9
+            assert WeatherTrend.from_forecasts(forecasts).weather_trend == TrendDirection.IMPROVING
+        finally:
+            reload_comment_config()
+
+        assert get_comment_config().weather_scores[WeatherCondition.RAIN] == 2